@@ -65,11 +65,17 @@ import numpy as np
 import warnings
 warnings.simplefilter('ignore', np.RankWarning) #suppress the warning
 from scipy import polyfit, polyval
-import scipy.stats
 import scipy.misc
-import scipy.interpolate
-from graph_tool.all import *
-import graph_tool.topology as gt
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+'''
+scipy.interpolate is imported where it is needed to keep the startup time low.
+The graphs are only accessed through their own methods, graph_tool is not imported here.
+'''
 
 class Analysis(object):
     '''
@@ -118,8 +124,8 @@ class Analysis(object):
                 return avgResult[0],-1
             
         except:
-            print 'WARNING: no histo peaks found: Analysis.findHistoPeaks'
-            print pdf
+            logger.warning('no histo peaks found: Analysis.findHistoPeaks')
+            logger.debug(pdf)
             return -1,-1
 
     def smooth(self,x,window_len=11,window='hanning'):
@@ -218,17 +224,18 @@ class Analysis(object):
                     x.append(-1)  
         avgLength=np.average(lengthArr)
         
-        print 'avg. Length: ' + str(avgLength)
+        logger.debug('avg. Length: ' + str(avgLength))
         try:
             self.__io.saveArray(lengthArr,self.__io.getHomePath()+'Plots/'+self.__io.getFileName()+'_LengthHist')
 
+            import scipy.interpolate
             f2 = scipy.interpolate.interp1d(x, lengthArr, kind='cubic')
             self.__io.saveArray(x,self.__io.getHomePath()+'Plots/'+self.__io.getFileName()+'_LengthX')
             self.__io.saveArray(f2(x),self.__io.getHomePath()+'Plots/'+self.__io.getFileName()+'_LengthY')
             
         except:
             pass
-        print "Avg.Length Scale Nodalroot"+str(self.__scale)
+        logger.debug("Avg.Length Scale Nodalroot"+str(self.__scale))
         return avgLength*self.__scale
         
     def getLateralLengthRTP(self,RTP,img,counter=None):
@@ -242,7 +249,7 @@ class Analysis(object):
             scipy.misc.imsave(self.__io.getHomePath()+'Result/' +str(j[1])+' '+str(j[0])+ 'DebugThickP.png', imgDebug)  
             self.__io.writeServerFile(self.__io.getHomePath(), 'dirt_out.csv',self.__io.getHomePath()+'Result/'+self.__io.getFileName()+'DebugThickP.png,' +str(self.__id[self.__currentIdx])+',0')   
         avgLength=np.average(lengthArr)
-        print 'avg. Length: ' + str(avgLength)
+        logger.debug('avg. Length: ' + str(avgLength))
         
         self.__io.saveArray(lengthArr,self.__io.getHomePath()+'Plots/'+self.__io.getFileName()+'_LateralLengthHisto')
         self.__io.saveArray(range(0,len(lengthArr)),self.__io.getHomePath()+'Plots/'+self.__io.getFileName()+'_LateralLengthX')
@@ -317,7 +324,7 @@ class Analysis(object):
             branchFreqency=float(len(path))/float(len(bpUnique))
         except:
             branchFreqency=-1
-        print 'Branching Frequency in given unit: ' +str(branchFreqency*self.__scale)
+        logger.debug('Branching Frequency in given unit: ' +str(branchFreqency*self.__scale))
         return branchFreqency*self.__scale
         
     def getDiametersAlongSinglePath(self,path,G,scale,counter=None):
@@ -381,9 +388,9 @@ class Analysis(object):
     def getWidthOverHeight(self,img2,xScale,yScale):
         # We compute here all mask based traits at once (long lives Spagetti code :-) )
         if len(img2) > 0: 
-            print 'IMG OK'
+            logger.debug('IMG OK')
         else:
-            print 'IMAGE IS NOT ACCESSIBLE'
+            logger.error('IMAGE IS NOT ACCESSIBLE')
             return 'nan','nan','nan','nan','nan','nan','nan','nan',['nan']*9,['nan']*9,'nan'
         h, w = np.shape(img2)
         xx=[]
@@ -422,11 +429,11 @@ class Analysis(object):
                 densityArray.append(float(normWhite)/float(normBlack))
             except:
                 densityArray.append(float(0.))
-                print 'empty image line in crown file -> placed 0. as density for this line'
+                logger.debug('empty image line in crown file -> placed 0. as density for this line')
                 pass
             
         rootDensity=np.average(densityArray)
-        print 'Avg. Root density: ' + str(rootDensity)
+        logger.debug('Avg. Root density: ' + str(rootDensity))
         
         ysmooth = yy
         smoothRegion=15
@@ -444,9 +451,9 @@ class Analysis(object):
         except:
          angleSimple=-1
          angleSimpleBottom=-1
-        print 'Stem Diameter: '+str(stemDia)
-        print 'Root Top Angle: '+str(angleSimple)
-        print 'Root Bottom Angle: '+str(angleSimpleBottom)
+        logger.debug('Stem Diameter: '+str(stemDia))
+        logger.debug('Root Top Angle: '+str(angleSimple))
+        logger.debug('Root Bottom Angle: '+str(angleSimpleBottom))
         
         #smooth the noisy data
         for i in range(smoothRegion,len(yy)-smoothRegion):
@@ -461,8 +468,8 @@ class Analysis(object):
         # compute the width parameters of the root
         medianWidth=np.median(ysmooth)
         maxWidth=np.max(ysmooth)
-        print 'Median. Root Width: ' + str(medianWidth)
-        print 'Max. Root Width: ' + str(maxWidth)
+        logger.debug('Median. Root Width: ' + str(medianWidth))
+        logger.debug('Max. Root Width: ' + str(maxWidth))
         #compute the cummulative width profile
         ysmoothCS=np.array(ysmooth).cumsum()
         ysmoothCS=ysmoothCS/np.max(ysmoothCS)
@@ -647,7 +654,7 @@ class Analysis(object):
         return np.fabs(alpha)
     
     def plotDiaRadius(self,paths,dia,thickestPath,nrOfClusters):
-        print 'do the kmeans :-)'
+        logger.debug('do the kmeans :-)')
         pts=[]
         for i in range(len(paths)):
             pts.append([paths[i],dia[i]])
@@ -702,7 +709,7 @@ class Analysis(object):
             try: 
                 X,Y=ransac.ransacFit(X,Y)
             except: 
-                print "ransac fitting failed. Using simple linear fitting"
+                logger.warning("ransac fitting failed. Using simple linear fitting")
         (ar,br)=polyfit(X,Y,1)
         return ar,br
 
@@ -749,6 +756,6 @@ class Analysis(object):
                 meanAdv=self.calculateAngleAtDist(path[:idx],lat,corrBranchpts,scale,rtpSkel,dist,None)
                 meanBas=self.calculateAngleAtDist(path[idx:],lat,corrBranchpts,scale,rtpSkel,dist,None)
                 break
-        print 'Adv and Bas Angle at 2cm:'+str(meanAdv)+' , '+str(meanBas)        
+        logger.debug('Adv and Bas Angle at 2cm:'+str(meanAdv)+' , '+str(meanBas))
         return meanAdv,meanBas
     
@@ -2,33 +2,148 @@
 Created on Feb 12, 2013
 
 @author: koalaspirit
+
+Tag recognition: recognizeTag reads the barcode first and only runs tesseract if
+there is none. Every call uses its own scratch files, so several images can be
+processed in the same folder at once. Results are cached by the content of the tag
+crop. TagReader runs many tags on a small pool of workers, each of which waits on one
+zbarimg or tesseract process.
 '''
 from pytesser import *
 import PIL as pil
 import numpy as np
 import subprocess
 import os
+import hashlib
+import tempfile
+import threading
 import scipy.misc
+import logging
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
+
+logger=logging.getLogger(__name__)
+
+zbarimg_exe_name = '/usr/local/bin/zbarimg'
+# number of results kept by the tag cache
+cacheSize=1024
+tagCache=OrderedDict()
+tagCacheLock=threading.Lock()
 
+def writeScratch(tagImg,scratchPath):
+    '''
+    Writes the tag to a new scratch file and returns its name
+    '''
+    fd,name=tempfile.mkstemp(suffix='.bmp',prefix='tag',dir=scratchPath)
+    os.close(fd)
+    scipy.misc.imsave(name,tagImg)
+    return name
 
-def getTextFromImage(tagImg,scratchPath,scratchText='temp'):
+def getTextFromImage(tagImg,scratchPath):
     
-    scipy.misc.imsave(scratchPath+'temp.bmp',tagImg)
-    set_scratch_text_name_root(scratchPath, 'temp.bmp')
-    text = image_file_to_string(scratchPath+'temp.bmp', cleanup = cleanup_scratch_flag, graceful_errors=True)
+    imgFile=writeScratch(tagImg,scratchPath)
+    textRoot=os.path.splitext(imgFile)[0]
+    try:
+        call_tesseract(imgFile, textRoot)
+        text = util.retrieve_text(textRoot)
+    finally:
+        util.perform_cleanup(imgFile, textRoot)
     text = text.translate(None, ",!.;:'{}[]-=()*&^%$#@!~`<>?/|\_+")
     text = ''.join(c for c in text if (c.isalnum() or ' ' or ','))
     text = ' '.join(text.split()) 
-    print 'Experiment code: '+text
+    logger.info('Experiment code: '+text)
     return text
 
 def getCodeFromImage(tagImg,scratchPath):
     
-    scipy.misc.imsave(scratchPath+'temp.bmp',tagImg)
-    args = ['/usr/local/bin/zbarimg','-q',scratchPath+'temp.bmp']
+    imgFile=writeScratch(tagImg,scratchPath)
+    args = [zbarimg_exe_name,'-q',imgFile]
+    code = ''
     try:
         code = subprocess.Popen(args, stdout=subprocess.PIPE).communicate()[0]
     except Exception as ex:
-        print 'Exception while running zbarimg', ex
-    print 'BarCode detected: '+str(code)
+        logger.warning('Exception while running zbarimg: '+str(ex))
+    finally:
+        os.remove(imgFile)
+    logger.info('BarCode detected: '+str(code))
     return code
+
+def tagKey(tagImg):
+    tagImg=np.ascontiguousarray(tagImg)
+    return hashlib.sha1(tagImg.tostring()+str(tagImg.shape)+str(tagImg.dtype)).hexdigest()
+
+def recognizeTag(tagImg,scratchPath):
+    '''
+    Returns the text of the tag. A barcode is preferred over the text reader, so
+    tesseract only runs if no barcode is found. Failures are not cached, the next
+    identical crop is read again.
+    '''
+    key=tagKey(tagImg)
+    with tagCacheLock:
+        if key in tagCache: return tagCache[key]
+    tagText=None
+    try: 
+        logger.debug('Check for barcode')
+        tagCode=getCodeFromImage(tagImg,scratchPath)
+        if len(tagCode) >2:
+            tagText=tagCode[8:len(tagCode)-1]
+        else:
+            logger.debug('bar code to short: '+tagCode)
+    except:
+        pass
+    if tagText is None:
+        try:
+            logger.debug('Check for text')
+            tagText=getTextFromImage(tagImg,scratchPath)
+        except:
+            return 'Tag text extraction Failed'
+    with tagCacheLock:
+        tagCache[key]=tagText
+        if len(tagCache)>cacheSize: tagCache.popitem(last=False)
+    return tagText
+
+class TagReader(object):
+    '''
+    classdocs
+    '''
+
+    def __init__(self,processes=2):
+        '''
+        Constructor
+        
+        processes is the number of zbarimg or tesseract processes that run at the same time
+        '''
+        self.__pool=ThreadPool(processes)
+        
+    def submit(self,tagImg,scratchPath):
+        '''
+        Returns immediately, get() of the returned object waits for the tag text. Tags of
+        several images can be submitted at once, at most processes of them are read at a time.
+        '''
+        return self.__pool.apply_async(recognizeTag,(tagImg,scratchPath))
+    
+    def close(self):
+        self.__pool.close()
+        self.__pool.join()
+
+def waitForTag(tag):
+    '''
+    tag is either a tag text or the result of TagReader.submit
+    '''
+    if hasattr(tag,'get'): return tag.get()
+    return tag
+
+reader=None
+readerLock=threading.Lock()
+
+def getReader():
+    '''
+    The tag reader shared by all images of a process. DIRT_OCR_PROCESSES sets its size (default 2).
+    '''
+    global reader
+    with readerLock:
+        if reader is None:
+            try: processes=int(os.environ.get('DIRT_OCR_PROCESSES','2'))
+            except ValueError: processes=2
+            reader=TagReader(max(1,processes))
+    return reader
@@ -56,11 +56,55 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 # external library imports
 '''
 import numpy as np
+import scipy.misc
+
+'''
+# internal library imports
+'''
+import Trace
 
 '''
 # standard python imports
 '''
 import os
+import time
+import gzip
+import threading
+import Queue
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+# outputs written besides output.csv under each artifact policy
+artifactPolicies={'none':[],
+                  'minimal':['mask'],
+                  'full':['mask','marker','crop','plot','picture']}
+# default png and gzip compression levels of each policy, full keeps the library defaults
+compressionLevels={'none':(6,9),'minimal':(1,1),'full':(6,9)}
+
+def artifactsFromEnvironment():
+    '''
+    DIRT_ARTIFACTS selects the policy (default full), DIRT_COMPRESSION overrides its compression level (0-9)
+    '''
+    policy=os.environ.get('DIRT_ARTIFACTS','full')
+    if policy not in artifactPolicies:
+        logger.warning('unknown artifact policy '+policy+', using full')
+        policy='full'
+    try: level=int(os.environ['DIRT_COMPRESSION'])
+    except (KeyError,ValueError): level=None
+    return policy,level
+
+def writePNG(name,img,level=6):
+    '''
+    Same scaling as scipy.misc.imsave, but with a zlib compression level
+    '''
+    scipy.misc.toimage(img).save(name,compress_level=level)
+
+def writeArray(name,arr,level=9):
+    with gzip.GzipFile(name,'wb',compresslevel=level) as fout:
+        np.savetxt(fout,arr,delimiter=',')
 
 
 class IO(object):
@@ -88,6 +132,10 @@ class IO(object):
         self.__path = homePath
         self.__name = name
         self.__serverPath=None
+        self.__writer=None
+        self.__stageFile=None
+        self.__profiler=None
+        self.setArtifacts('full')
         self.__parameters=['Image ID','Image name','Failed',
                            'Experiment number',
                     'circle ratio',
@@ -112,6 +160,44 @@ class IO(object):
         self.__currentID=idx
     def setHomePath(self,homePath): 
         self.__path = homePath
+    def setWriter(self,writer):
+        self.__writer=writer
+    def setStageFile(self,path):
+        '''
+        The stage file is truncated, None stops recording the stages
+        '''
+        self.__stageFile=path
+        if path is not None: open(path,'w').close()
+    def setProfiler(self,profiler):
+        '''
+        A profiler that is replaced writes its results
+        '''
+        if self.__profiler is not None: self.__profiler.close()
+        self.__profiler=profiler
+    def setArtifacts(self,policy,level=None):
+        '''
+        policy is one of the keys of artifactPolicies, level overrides the compression level of the policy
+        '''
+        self.__artifacts=policy
+        self.__pngLevel,self.__gzLevel=compressionLevels[policy]
+        if level is not None: self.__pngLevel=self.__gzLevel=level
+    def writes(self,kind):
+        '''
+        True if outputs of kind ('mask', 'marker', 'crop', 'plot' or 'picture') are written under the artifact policy
+        '''
+        return kind in artifactPolicies[self.__artifacts]
+    def getStageFile(self):
+        return self.__stageFile
+    def startStage(self,name):
+        '''
+        Appends the stage name and its start time to the stage file, which is read by the watchdog of runOnFolder.py,
+        and starts the stage span of the current trace
+        '''
+        Trace.current().startStage(name)
+        if self.__profiler is not None: self.__profiler.startStage(name)
+        if self.__stageFile is None: return
+        with open(self.__stageFile,'a') as fout:
+            fout.write(name+','+repr(time.time())+'\n')
     
     def scanDir(self,directory=0):
 
@@ -119,26 +205,28 @@ class IO(object):
         if directory==0: scanPath=self.__path
         else: scanPath = directory
         files = []
-        print os.getcwd()
+        debug=logger.isEnabledFor(logging.DEBUG)
+        if debug: logger.debug(os.getcwd())
         listing = os.listdir(scanPath)
         for infile in listing:
             if os.path.isdir(scanPath + infile) == True:
-                print infile + ' is not a file'
+                if debug: logger.debug(infile + ' is not a file')
             elif infile[0]=='.':
-                print infile + ' is not a file'
+                if debug: logger.debug(infile + ' is not a file')
             elif infile[len(infile)-4:]=='.ini':
-                print infile + ' is not a file'
+                if debug: logger.debug(infile + ' is not a file')
             elif infile[len(infile)-4:]=='.csv':
-                print infile + ' is not a file'
+                if debug: logger.debug(infile + ' is not a file')
             else:
-                print "current file is: " + infile
+                if debug: logger.debug("current file is: " + infile)
                 files.append(scanPath+'/'+infile) 
         return files
     
     def writeServerFile(self,serverFile,string):
         path=self.__serverPath
-        print "server file (working directory): "+str(os.getcwd())
-        print "server file (relative): "+str(path)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("server file (working directory): "+str(os.getcwd()))
+            logger.debug("server file (relative): "+str(path))
         try:
             if os.path.isfile(path+serverFile):
                 fout=open(path+serverFile, "a")
@@ -169,7 +257,14 @@ class IO(object):
         fout.write('\n')
         fout.close()
     def writeFile(self,para,traitsCrown,traitDict,all=False):
-        print "output directory: "+self.__path+"/output.csv"
+        try: size=os.path.getsize(self.__path+"/output.csv")
+        except OSError: size=0
+        with Trace.span('I/O'):
+            self.__writeFile(para,traitsCrown,traitDict,all)
+        Trace.count('bytes written',os.path.getsize(self.__path+"/output.csv")-size)
+        
+    def __writeFile(self,para,traitsCrown,traitDict,all=False):
+        logger.debug("output directory: "+self.__path+"/output.csv")
         try:
             if os.path.isfile(self.__path+"/output.csv"):
                 fout=open(self.__path+"/output.csv", "a")
@@ -201,14 +296,79 @@ class IO(object):
         fout.close()
         
     def saveArray(self,arr,name):
-        if self.__plots==False: return 0
+        if self.__plots==False or self.writes('plot')==False: return 0
         try:
-            np.savetxt(name+'.gz',arr,delimiter=',')
+            if self.__writer is None:
+                with Trace.span('I/O'): writeArray(name+'.gz',arr,self.__gzLevel)
+                Trace.count('bytes written',os.path.getsize(name+'.gz'))
+            else: self.__writer.put(('array',os.path.abspath(name+'.gz'),arr,self.__gzLevel,Trace.current()))
             try:
                 self.writeServerFile('dirt_out.csv',os.getcwd()+name[1:]+'.gz'+','+str(self.__id)+',1')
             except:
                 raise
         except:
             raise
+    
+    def saveImage(self,img,name,kind='mask'):
+        '''
+        Writes the image directly or hands it to the background writer if one is set.
+        Nothing is written if the artifact policy excludes kind.
+        '''
+        if self.writes(kind)==False: return
+        if self.__writer is None:
+            with Trace.span('I/O'): writePNG(name,img,self.__pngLevel)
+            Trace.count('bytes written',os.path.getsize(name))
+        else: self.__writer.put(('png',os.path.abspath(name),img,self.__pngLevel,Trace.current()))
+
+class ArtifactWriter(threading.Thread):
+    '''
+    Background thread that encodes and writes png images and plot arrays, so that the
+    compute thread does not wait for the disk. The queue is bounded to limit the memory
+    held by pending outputs: put blocks while it is full and the wait is recorded as
+    span 'writer back-pressure'. Queued data must not be modified afterwards. The written
+    bytes and the outputs that could not be written are recorded in the trace of the
+    image the output belongs to.
+    '''
+    
+    def __init__(self,maxPending=16):
+        '''
+        Constructor
+        '''
+        threading.Thread.__init__(self)
+        self.daemon=True
+        self.__queue=Queue.Queue(maxsize=maxPending)
+        self.__closed=False
+        self.start()
         
+    def put(self,job):
+        if self.__queue.full():
+            with job[-1].span('writer back-pressure'): self.__queue.put(job)
+        else: self.__queue.put(job)
         
+    def run(self):
+        while True:
+            job=self.__queue.get()
+            try:
+                if job is None: return
+                kind,name,data,level,trace=job
+                if kind=='png': writePNG(name,data,level)
+                else: writeArray(name,data,level)
+                trace.count('bytes written',os.path.getsize(name))
+            except Exception as e:
+                logger.error('output not saved: '+str(job[1])+': '+str(e))
+                job[-1].addError('not saved: '+str(job[1])+': '+str(e))
+                job[-1].count('outputs not saved',1)
+            finally:
+                self.__queue.task_done()
+                
+    def flush(self):
+        self.__queue.join()
+        
+    def close(self):
+        '''
+        Writes all pending outputs and stops the thread, can be called more than once
+        '''
+        if self.__closed: return
+        self.__closed=True
+        self.__queue.put(None)
+        self.join()
@@ -57,6 +57,12 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import mahotas as m
 import numpy as np
 import scipy.ndimage
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
 
 class Masking(object):
     '''
@@ -99,15 +105,15 @@ class Masking(object):
         return image > (thresh_image - offset)
     
     def calculateMask(self,img):
-        print 'Masking input'
+        logger.debug('Masking input')
         if len(np.unique(img))<=2:
-            print 'Binary input detected, no thresholding performed'
+            logger.debug('Binary input detected, no thresholding performed')
             idx1=np.where(img==np.unique(img)[0])
             idx2=np.where(img==np.unique(img)[1])
             img[idx1]=False
             img[idx2]=True
         else:
-            print 'Grey input detected'
+            logger.debug('Grey input detected')
             T=m.otsu(img,ignore_zeros=False)
             T=T*self.__scale
             img = self.threshold_adaptive(img, 80, 'gaussian',offset=-20,param=T)
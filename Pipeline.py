@@ -0,0 +1,149 @@
+'''
+Pipeline.py
+
+Staged processing of several images within one worker process. The next image is
+decoded by a reader thread while the current image is analysed, and png images and
+plot arrays are written by an IO.ArtifactWriter thread. Both stages are connected to
+the compute stage by bounded queues.
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# internal library imports
+'''
+import IO
+import main
+import Trace
+import watchdog as wd
+
+'''
+# standard python imports
+'''
+import os
+import threading
+import Queue
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+
+class ImageReader(threading.Thread):
+    '''
+    Decodes the images in the given order ahead of the compute stage.
+    At most prefetch decoded images are held in memory.
+    '''
+
+    def __init__(self,paths,prefetch=1):
+        '''
+        Constructor
+        '''
+        threading.Thread.__init__(self)
+        self.daemon=True
+        self.__paths=paths
+        self.__queue=Queue.Queue(maxsize=prefetch)
+        self.start()
+
+    def run(self):
+        for p in self.__paths:
+            try:
+                img=main.readImage(p)
+            except:
+                logger.error('Image not readable: '+p)
+                img=None
+            self.__queue.put((p,img))
+
+    def get(self):
+        return self.__queue.get()
+
+def runImages(jobs,prefetch=1,maxPending=16):
+    '''
+    jobs is a list of (key, image path, image ID, options) tuples, where options are
+    the main.py arguments after the image ID. Returns a list of (key, return code, report)
+    tuples, the report contains the stage durations and the trace file of the image.
+    The traces are written after the writer finished, so they count all written bytes. Failed
+    images get a trace as well, as in main.main, if they got as far as the stage file.
+    '''
+    cwd=os.getcwd()
+    writer=IO.ArtifactWriter(maxPending)
+    reader=ImageReader([os.path.abspath(j[1]) for j in jobs],prefetch)
+    results=[]
+    traces=[]
+    try:
+        for key,imgPath,imgID,opts in jobs:
+            path,img=reader.get()
+            if img is None:
+                results.append((key,1,{}))
+                continue
+            # stage file and trace of the previous image must not be reported for this one
+            main.io.setStageFile(None)
+            Trace.setCurrent(Trace.Trace())
+            try:
+                returnCode=main.main(main.optionsFromArgs([path,str(imgID)]+opts),img=img,writer=writer)
+            except:
+                logger.exception('ERROR in image '+path)
+                returnCode=1
+            finally:
+                main.io.setProfiler(None)
+                os.chdir(cwd)
+            stageFile=main.io.getStageFile()
+            if stageFile is not None:
+                report={'stages':wd.stageDurations(wd.readStages(stageFile))}
+                report['trace']=main.traceFile()
+                traces.append((Trace.current(),report['trace']))
+            else: report={}
+            results.append((key,returnCode,report))
+    finally:
+        # pending outputs are written also if a job raised
+        writer.close()
+    for trace,path in traces:
+        trace.write(path)
+    return results
@@ -66,11 +66,18 @@ import scipy.ndimage
 import Segmentation
 import Masking
 import DirtOcr as ocr
+import Trace
 
 '''
 # standard python imports
 '''
 import os
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
 
 class Preprocessing(object):
     '''
@@ -78,22 +85,26 @@ class Preprocessing(object):
     '''
 
 
-    def __init__(self,io):
+    def __init__(self,io,saveCrops=True):
         '''
         Constructor
+        
+        saveCrops: write the crown and excised root crops to the Crown and Lateral folders
         '''
         self.__io=io
+        self.__saveCrops=saveCrops
+        self.__crops=[]
         self.__labelHist=[]
         self.__id=io.getID()
         self.__currentIdx=io.getCurrentID()
-        self.__compsX=[]
-        self.__compsY=[]
+        self.__components=None
         self.__h=0
         self.__w=0
         self.__tagCrop=10
         
     def prepocess(self,img,rootCrown,scale=1.0,nrExRoot=1, marker=True, stemCorrection=False):
-        print 'starting to segment'
+        logger.info('starting to segment')
+        self.__crops=[]
         rIdx=-1
         self.__io.setServerPath('./')
         circleIdx= circleRatio= circleWidth= circleHeight= imgCircle = 0
@@ -101,27 +112,37 @@ class Preprocessing(object):
         orig=img.copy()
         mask=Masking.Masking(scale=scale)
         imgGrey = img.astype(np.uint8)
-        print 'make mask'
+        logger.debug('make mask')
+        self.__io.startStage('masking')
         imgBinary=mask.calculateMask(imgGrey)
-        print 'saving binary mask'
-        scipy.misc.imsave(self.__io.getHomePath()+'/Mask/' + self.__io.getFileName()+'.png', imgBinary)
+        Trace.count('foreground pixels',int(np.count_nonzero(imgBinary)))
+        logger.debug('saving binary mask')
+        self.__io.saveImage(imgBinary,self.__io.getHomePath()+'/Mask/' + self.__io.getFileName()+'.png')
         pathold=os.getcwd()
-        os.chdir(self.__io.getHomePath())
-        self.__io.writeServerFile('dirt_out.csv',self.__io.getHomePath()+'/Mask/'+self.__io.getFileName()+'.png,' +str(self.__io.getID())+',0')
-        os.chdir(pathold)
+        if self.__io.writes('mask'):
+            os.chdir(self.__io.getHomePath())
+            self.__io.writeServerFile('dirt_out.csv',self.__io.getHomePath()+'/Mask/'+self.__io.getFileName()+'.png,' +str(self.__io.getID())+',0')
+            os.chdir(pathold)
+        self.__io.startStage('labelling')
         imgLabel=self.calculateLabelHist(imgBinary)
+        '''
+        The detection functions only read the label image and search the bounding boxes of the component table
+        '''
+        imgLabel.flags.writeable=False
 
+        self.__io.startStage('marker detection')
         if marker== True: 
-            print 'Marker is True'
-            circleIdx, circleRatio, circleWidth, circleHeight, imgCircle =self.findCircle(imgLabel.copy())
+            logger.debug('Marker is True')
+            circleIdx, circleRatio, circleWidth, circleHeight, imgCircle =self.findCircle(imgLabel)
         else: 
-            print 'Marker is False'
+            logger.debug('Marker is False')
             circleIdx, circleRatio, circleWidth, circleHeight, imgCircle = -1, 1, 1, 1, None
         
-        rectIdx, _, _, _,imgTag, tagText =self.findTag(imgLabel.copy() , imgBinary, orig, rect_ratio=5.)
+        self.__io.startStage('tag detection')
+        rectIdx, _, _, _,imgTag, tagText =self.findTag(imgBinary, orig, rect_ratio=5.)
        
         if rectIdx >=0:
-            print 'tagIdx'+str(rectIdx)
+            logger.debug('tagIdx'+str(rectIdx))
             try: self.__labelHist[rectIdx] = 0
             except: pass
 
@@ -132,74 +153,56 @@ class Preprocessing(object):
         '''
         These two functions belong together and have to be called right after each other. I know, that is bad.
         '''
+        self.__io.startStage('root detection')
         if rootCrown==True:
-            rIdx,rIdxList,crownMin,crownMax,crownBottom,crownTop=self.findRoot(imgLabel.copy()) 
+            rIdx,rIdxList,crownMin,crownMax,crownBottom,crownTop=self.findRoot(imgLabel) 
             if stemCorrection== True: 
-                print 'Stem reconstruction is active '
-                imgRoot=self.correctForStem(imgLabel.copy(), [circleIdx,rectIdx,rIdx], crownMin, crownMax, crownBottom, crownTop, rIdx, rIdxList)
+                logger.debug('Stem reconstruction is active ')
+                imgRoot=self.correctForStem(imgLabel, [circleIdx,rectIdx,rIdx], crownMin, crownMax, crownBottom, crownTop, rIdx, rIdxList)
             else:
-                print 'No stem reconstruction active' 
-                imgReturn=np.zeros_like(imgLabel)
-                imgReturn[rIdxList]=1
-                imgRoot=imgReturn[crownMax:crownMin,crownBottom:crownTop]
+                logger.debug('No stem reconstruction active')
+                imgRoot=self.cropPixels(rIdxList,crownMax,crownMin,crownBottom,crownTop,imgLabel.dtype)
         
+        self.__io.startStage('excised root detection')
         if nrExRoot >1 and rootCrown==True:
 
             for i in range(nrExRoot): 
-                exRIdx,imgExRoot,centerPtx,centerPty=self.findExcisedRoot(imgLabel.copy(),[circleIdx,rectIdx,rIdx],crownMin,crownMax)
+                exRIdx,imgExRoot,centerPtx,centerPty=self.findExcisedRoot(imgLabel,[circleIdx,rectIdx,rIdx],crownMin,crownMax)
                 if exRIdx != -1:
-                    print 'found excised root '+str(i)
+                    logger.info('found excised root '+str(i))
                     try: 
-                        scipy.misc.imsave(self.__io.getHomePath()+'/Lateral/' + self.__io.getFileName()+'_'+str(centerPtx)+'_'+str(centerPty)+'.png', imgExRoot)
-                        print 'excised root '+str(i)+'saved'
+                        self.addCrop('Lateral',self.__io.getFileName()+'_'+str(centerPtx)+'_'+str(centerPty)+'.png', imgExRoot)
+                        logger.debug('excised root '+str(i)+' saved')
                     except:
-                        print 'NOT SAVED !!!'
-                        raise
-                    try: 
-                        pathold=os.getcwd()
-                        os.chdir(self.__io.getHomePath())
-                        self.__io.writeServerFile('dirt_out.csv',self.__io.getHomePath()+'/Lateral/'+self.__io.getFileName()+'_'+str(centerPtx)+'_'+str(centerPty)+'.png,' +str(self.__io.getID())+',0')
-                        print 'excised root '+str(i)+'saved Server'
-                        os.chdir(pathold)
-                    except: 
-                        print 'NOT SAVED !!!!'
+                        logger.error('NOT SAVED !!!')
                         raise
         elif nrExRoot ==1 and rootCrown==True: 
-            exRIdx,imgExRoot,centerPtx,centerPty=self.findExcisedRoot(imgLabel.copy(),[circleIdx,rectIdx,rIdx],crownMin,crownMax)
+            exRIdx,imgExRoot,centerPtx,centerPty=self.findExcisedRoot(imgLabel,[circleIdx,rectIdx,rIdx],crownMin,crownMax)
             if exRIdx != -1:
-                print 'found the excised root '
+                logger.info('found the excised root ')
                 try: 
-                    pathold=os.getcwd()
-                    os.chdir(self.__io.getHomePath())
-                    scipy.misc.imsave(self.__io.getHomePath()+'/Lateral/' + self.__io.getFileName()+'_'+str(centerPtx)+'_'+str(centerPty)+'.png', imgExRoot)
-                    print 'excised root saved' 
-                    self.__io.writeServerFile('dirt_out.csv',self.__io.getHomePath()+'/Lateral/'+self.__io.getFileName()+'_'+str(centerPtx)+'_'+str(centerPty)+'.png,' +str(self.__io.getID())+',0')
-                    print 'excised root saved Server'
-                    os.chdir(pathold)
-                except: print 'NOT SAVED !!!!'
+                    self.addCrop('Lateral',self.__io.getFileName()+'_'+str(centerPtx)+'_'+str(centerPty)+'.png', imgExRoot)
+                    logger.debug('excised root saved')
+                except: logger.error('NOT SAVED !!!!')
         elif nrExRoot ==1 and rootCrown==False:
-            exRIdx,imgExRoot,centerPtx,centerPty=self.findExcisedRoot(imgLabel.copy(),[circleIdx,rectIdx],0,1)
+            exRIdx,imgExRoot,centerPtx,centerPty=self.findExcisedRoot(imgLabel,[circleIdx,rectIdx],0,1)
             if exRIdx != -1:
-                print 'found the excised root '
+                logger.info('found the excised root ')
                 rIdx=-1
                 try: 
-                    pathold=os.getcwd()
-                    os.chdir(self.__io.getHomePath())
-                    scipy.misc.imsave(self.__io.getHomePath()+'/Lateral/' + self.__io.getFileName()+'_'+str(centerPtx)+'_'+str(centerPty)+'.png', imgExRoot)
-                    print 'excised root saved' 
-                    self.__io.writeServerFile('dirt_out.csv',self.__io.getHomePath()+'/Lateral/'+self.__io.getFileName()+'_'+str(centerPtx)+'_'+str(centerPty)+'.png,' +str(self.__io.getID())+',0')
-                    print 'excised root saved Server'
-                    os.chdir(pathold)
-                except: print 'NOT SAVED !!!!'
+                    self.addCrop('Lateral',self.__io.getFileName()+'_'+str(centerPtx)+'_'+str(centerPty)+'.png', imgExRoot)
+                    logger.debug('excised root saved')
+                except: logger.error('NOT SAVED !!!!')
             
         
+        self.__io.startStage('segmentation output')
         if marker==True:
-            scipy.misc.imsave(self.__io.getHomePath()+'/Mask/' + self.__io.getFileName()+'Circle.png', imgCircle)
-            scipy.misc.imsave(self.__io.getHomePath()+'/Mask/' + self.__io.getFileName()+'Tag.png', imgTag)
+            self.__io.saveImage(imgCircle,self.__io.getHomePath()+'/Mask/' + self.__io.getFileName()+'Circle.png','marker')
+            self.__io.saveImage(imgTag,self.__io.getHomePath()+'/Mask/' + self.__io.getFileName()+'Tag.png','marker')
         #pathold=os.getcwd()
         #os.chdir(self.__io.getHomePath())
         
-        if marker==True: 
+        if marker==True and self.__io.writes('marker'): 
             self.__io.writeServerFile('dirt_out.csv',self.__io.getHomePath()+'/Mask/'+self.__io.getFileName()+'Circle.png,' +str(self.__io.getID())+',0')
             
         #os.chdir(pathold)
@@ -208,34 +211,45 @@ class Preprocessing(object):
             If image is usable, then it gets segmented and copied. Otherwise we ignore it
             '''
             try:
-                print 'root image to be saved'
-                scipy.misc.imsave(self.__io.getHomePath()+'/Crown/' + self.__io.getFileName()+'.png', imgRoot)
+                logger.debug('root image to be saved')
+                self.addCrop('Crown',self.__io.getFileName()+'.png', imgRoot)
             except: 
-                print 'CROWN NOT SAVED'
+                logger.error('CROWN NOT SAVED')
                 raise
-            try:
-                pathold=os.getcwd()
-                os.chdir(self.__io.getHomePath()) 
-                self.__io.writeServerFile('dirt_out.csv',self.__io.getHomePath()+'/Crown/'+self.__io.getFileName()+'.png,' +str(self.__io.getID())+',0')
-                os.chdir(pathold)
-            except: print 'MASK NOT WRITTEN TO SERVER FILE'
         elif rIdx == -1 and exRIdx !=-1:
-            print "Only excised roots computed"
+            logger.info("Only excised roots computed")
         else: Failed=True
-        print "old path: "+pathold
+        logger.debug("old path: "+pathold)
         return  Failed,tagText,circleRatio, circleWidth, circleHeight
+    
+    def addCrop(self,folder,fileName,img):
+        '''
+        Keeps the crop for the analysis in this run. With saveCrops it is also written to the Crown or Lateral
+        folder and listed in dirt_out.csv, so that the analysis can be repeated without segmentation.
+        '''
+        self.__crops.append((folder,fileName,img))
+        if self.__saveCrops==False: return
+        self.__io.saveImage(img,self.__io.getHomePath()+'/'+folder+'/'+fileName,'crop')
+        pathold=os.getcwd()
+        os.chdir(self.__io.getHomePath())
+        self.__io.writeServerFile('dirt_out.csv',self.__io.getHomePath()+'/'+folder+'/'+fileName+',' +str(self.__io.getID())+',0')
+        os.chdir(pathold)
+    
+    def getCrops(self):
+        '''
+        Returns (folder, file name, image) of the crown and excised root crops found by prepocess
+        '''
+        return self.__crops
         
     def calculateLabelHist(self,imgBinary):
         seg=Segmentation.Segmentation(imgBinary,io=self.__io)    
         labeled,_=seg.labelAll()
-        x, y = np.shape(labeled)
-        val = labeled.flatten()
-
-        histo, _ = np.histogram(val, bins=np.max(labeled) + 1)
+        self.__components=seg.getComponentStats()
+        histo=self.__components['area'].copy()
         '''
         TEST: background can have less pixels than foreground if no markers are in the image
         '''
-        if len(np.unique(labeled))==2:
+        if len(histo)==2 and histo[0]>0:
             nrOfwhitePx=len(np.where(imgBinary==255)[1])
             comp1 = np.max(histo)
             if comp1==nrOfwhitePx:
@@ -251,28 +265,42 @@ class Preprocessing(object):
             if histo[i]<100:
                 histo[i]=0
         self.__labelHist = histo
-        
-        self.__compsX = [[] for i in range(len(self.__labelHist))]
-        self.__compsY = [[] for i in range(len(self.__labelHist))]
-
         self.__h, self.__w = np.shape(labeled)
-        for i in range(self.__w):
-            for j in range(self.__h):
-                self.__compsX[labeled[j][i]].append(i)
-                self.__compsY[labeled[j][i]].append(j)
         return labeled
+    
+    def componentBox(self,i):
+        '''
+        Returns xMin, xMax, yMin, yMax of component i, x is the column
+        '''
+        c=self.__components[i]
+        return c['colMin'],c['colMax'],c['rowMin'],c['rowMax']
+    
+    def componentPixels(self,labeled,i):
+        '''
+        Returns the row and column indices of component i like np.where(labeled==i), only the bounding box of i is searched
+        '''
+        if i<0 or i>=len(self.__components): return np.zeros(0,dtype=np.intp),np.zeros(0,dtype=np.intp)
+        xMin, xMax, yMin, yMax = self.componentBox(i)
+        rows,cols=np.nonzero(labeled[yMin:yMax+1,xMin:xMax+1]==i)
+        return rows+yMin,cols+xMin
+    
+    def cropPixels(self,idx,iMin,iMax,jMin,jMax,dtype):
+        '''
+        Returns the window [iMin:iMax,jMin:jMax] of an image that is 1 at the pixels idx and 0 elsewhere
+        '''
+        crop=np.zeros((max(iMax-iMin,0),max(jMax-jMin,0)),dtype=dtype)
+        sel=(idx[0]>=iMin)&(idx[0]<iMax)&(idx[1]>=jMin)&(idx[1]<jMax)
+        crop[idx[0][sel]-iMin,idx[1][sel]-jMin]=1
+        return crop
                 
     def findCircle(self, labeled):
-        print 'searching circle'
+        logger.debug('searching circle')
         ratio = []
         w,h=np.shape(labeled)
-        for i in range(len(self.__compsX)):
+        for i in range(len(self.__labelHist)):
             if self.__labelHist[i] > 0:
-                xMin = np.min(self.__compsX[i])
-                xMax = np.max(self.__compsX[i])
-                yMin = np.min(self.__compsY[i])
-                yMax = np.max(self.__compsY[i])
-                nonZ=len(self.__compsX[i])
+                xMin, xMax, yMin, yMax = self.componentBox(i)
+                nonZ=self.__components[i]['area']
                 allPx=(xMax-xMin)*(yMax-yMin)
                 squareToCircleRatio=float(nonZ)/float(allPx)
                 '''
@@ -292,7 +320,7 @@ class Preprocessing(object):
                                 determine tag ratio
                                 '''
                                 tagRatio=(float(xMax) - float(xMin)) / (float(yMax) - float(yMin))
-                                print 'Circle Ratio : '+str(tagRatio) +' ID: '+str(self.__currentIdx)
+                                logger.debug('Circle Ratio : '+str(tagRatio) +' ID: '+str(self.__currentIdx))
                                 ratio.append(np.abs(1-(float(xMax) - float(xMin)) / (float(yMax) - float(yMin))))
                         else: ratio.append(1000)  
                     else: ratio.append(1000) 
@@ -303,37 +331,28 @@ class Preprocessing(object):
         rect = np.min(ratio)
         rectIdx = list(ratio).index(rect)
         
-        xMin = np.min(self.__compsX[rectIdx])
-        xMax = np.max(self.__compsX[rectIdx])
-        yMin = np.min(self.__compsY[rectIdx])
-        yMax = np.max(self.__compsY[rectIdx])
+        xMin, xMax, yMin, yMax = self.componentBox(rectIdx)
        
         
-        print 'Circle Ratio: '+str(rect)
+        logger.info('Circle Ratio: '+str(rect))
         
-        idx = np.where(labeled==rectIdx)
         '''
         bounding box
         '''
-        iMin=np.min(idx[0])
-        jMin=np.min(idx[1])
-        iMax=np.max(idx[0])
-        jMax=np.max(idx[1])
-        
-        sel = labeled != rectIdx
-        labeled[sel]=0
+        iMin, iMax, jMin, jMax = yMin, yMax, xMin, xMax
+        imgCircle=labeled[iMin:iMax, jMin:jMax]
+        imgCircle=np.where(imgCircle==rectIdx,imgCircle,0)
         
         if rect > 0.2: 
-            print 'Error: No circle detectable'
+            logger.error('Error: No circle detectable')
             rect=1
             rectIdx=0
 
-        return rectIdx, rect, float(xMax) - float(xMin), float(yMax) - float(yMin),labeled[iMin:iMax, jMin:jMax]
+        return rectIdx, rect, float(xMax) - float(xMin), float(yMax) - float(yMin),imgCircle
                     
 
-    def findRoot(self, labeledToCopy):
-        print 'searching rootstock'
-        labeled=labeledToCopy.copy()
+    def findRoot(self, labeled):
+        logger.debug('searching rootstock')
         h,w=np.shape(labeled)
         found=False
         idx1=0
@@ -343,13 +362,13 @@ class Preprocessing(object):
         '''
         while found==False:
             idx1 = np.argmax(self.__labelHist)
-            idx = np.where(labeled==idx1)
+            idx = self.componentPixels(labeled,idx1)
             if (np.max(idx[0])+1) == w and (np.max(idx[1])+1)==h and (np.min(idx[0])) == 0 and (np.min(idx[1]))==0:
                 if count < len(self.__labelHist): 
                     found=False
                     count+=1
                 else: found=True
-                print 'Only 1 background component that is smaller than the foreground ??? Probably a bug in the Masking routine'
+                logger.warning('Only 1 background component that is smaller than the foreground ??? Probably a bug in the Masking routine')
             else:
                 found=True
     
@@ -361,26 +380,25 @@ class Preprocessing(object):
         iMax=np.max(idx[0])
         jMax=np.max(idx[1])
        
-        print 'xMin and xMax of Root Crown: '+str(iMin)+' '+str(iMax)
-        print 'yMin and yMax of Root Crown: '+str(jMin)+' '+str(jMax)
+        logger.debug('xMin and xMax of Root Crown: '+str(iMin)+' '+str(iMax))
+        logger.debug('yMin and yMax of Root Crown: '+str(jMin)+' '+str(jMax))
         
         
         return idx1,idx,iMax,iMin,jMin,jMax
     
-    def correctForStem(self,labeledToCopy,excludeIdx,left,right,bottom,top,rootIdx,rootIdxList):
+    def correctForStem(self,labeled,excludeIdx,left,right,bottom,top,rootIdx,rootIdxList):
         '''
-        We loop through detected objects to identify them. During recognition the labeled image has to be made free of noise.
-        Therefore we have to copy it.
+        We loop through detected objects to identify them. The labeled image is only read, the pixels of
+        an object are searched in its bounding box (see componentPixels).
         '''
-        print 'checking for stem part'
-        labeled=labeledToCopy.copy()
+        logger.debug('checking for stem part')
         idx2=-1
         counter=0
         again=True
         while again==True:
             counter+=1
             if counter>30: break
-            print 'stem part loop'
+            logger.debug('stem part loop')
             again=False
             nr_objects=len(self.__labelHist)
             if nr_objects>1:     
@@ -390,7 +408,7 @@ class Preprocessing(object):
                     self.__labelHist[comp] = 0      
                     comp = np.argmax(self.__labelHist)
                     if count>len(excludeIdx):
-                        print 'Error: Image is not usable'
+                        logger.error('Error: Image is not usable')
                         idx2=-1
                         break
                     else: count +=1
@@ -399,8 +417,7 @@ class Preprocessing(object):
             else:
                 idx2=-1
             
-            labeled=labeledToCopy.copy()
-            idx = np.where(labeled==idx2)
+            idx = self.componentPixels(labeled,idx2)
             '''
             bounding box
             '''
@@ -410,17 +427,15 @@ class Preprocessing(object):
                 iMax=np.max(idx[0])
                 jMax=np.max(idx[1])
                 
-                print 'xMin and xMax of stem part: '+str(iMin)+' '+str(iMax)
-                print 'yMin and yMax of stem part: '+str(jMin)+' '+str(jMax)
-                print 'yMax of crown: '+str(top)
-                print 'xMin of crown: '+str(bottom)
-                sel = labeled != idx2 
-                labeled[sel]=0
+                logger.debug('xMin and xMax of stem part: '+str(iMin)+' '+str(iMax))
+                logger.debug('yMin and yMax of stem part: '+str(jMin)+' '+str(jMax))
+                logger.debug('yMax of crown: '+str(top))
+                logger.debug('xMin of crown: '+str(bottom))
                 nonZ=len(idx[0])
                 boundingBoxSize=(iMax-iMin)*(jMax-jMin)
                 zeros=boundingBoxSize-nonZ
                 ratio=float(zeros)/float(nonZ)
-                print 'ratio: '+str(ratio)
+                logger.debug('ratio: '+str(ratio))
                      
                 if counter>=nr_objects:
                     again=False
@@ -430,18 +445,17 @@ class Preprocessing(object):
         nrOfObjPart=0
         if (right)>iMax*0.9: 
             
-            sel = labeled == (idx2)
             self.__labelHist[idx2] = 0
             self.__labelHist[rootIdx]=0
             imgReturn=np.zeros_like(labeled)
 
-            imgReturn[sel]=1
+            imgReturn[idx]=1
             imgReturn[rootIdxList]=1
             rep=int(np.fabs(iMax*0.9-right*1.1))
             for i in range(rep):
                 imgReturn[iMax*0.9:right*1.1,jMin:jMax]=scipy.ndimage.binary_dilation(imgReturn[iMax*0.9:right*1.1,jMin:jMax]).astype(np.int)
                 imgLabel,nrOfObjPart=scipy.ndimage.label(imgReturn[iMin:left,bottom:top])
-                print 'nrOfObj = '+str(nrOfObjPart)
+                logger.debug('nrOfObj = '+str(nrOfObjPart))
                 if nrOfObjPart == 1:
                     break
 
@@ -449,23 +463,18 @@ class Preprocessing(object):
                 return imgReturn[iMin:left,bottom:top]
             else:
                 self.__labelHist[rootIdx]=0 
-                imgReturn=np.zeros_like(labeled)
-                imgReturn[rootIdxList]=1
-                return imgReturn[right:left,bottom:top]
+                return self.cropPixels(rootIdxList,right,left,bottom,top,labeled.dtype)
         else:
             self.__labelHist[rootIdx]=0 
-            imgReturn=np.zeros_like(labeled)
-            imgReturn[rootIdxList]=1
-            return imgReturn[right:left,bottom:top]
+            return self.cropPixels(rootIdxList,right,left,bottom,top,labeled.dtype)
     
-    def findExcisedRoot(self, labeledToCopy,excludeIdx,minOfCrown,maxOfCrown):
+    def findExcisedRoot(self, labeled,excludeIdx,minOfCrown,maxOfCrown):
 
         '''
-        We loop through detected objects to identify them. During recognition the labeled image has to be made free of noise.
-        Therefore we have to copy it.
+        We loop through detected objects to identify them. The labeled image is only read, the pixels of
+        an object are searched in its bounding box (see componentPixels).
         '''
-        print 'searching excised root'
-        labeled=labeledToCopy.copy()
+        logger.debug('searching excised root')
         w,h=np.shape(labeled)
         idx2=-1
         counter=0
@@ -474,7 +483,7 @@ class Preprocessing(object):
         while again==True:
             counter+=1
             if counter>30: break
-            print 'excised root loop'
+            logger.debug('excised root loop')
             again=False
             nr_objects=len(self.__labelHist)
             if nr_objects>1:     
@@ -485,7 +494,7 @@ class Preprocessing(object):
                     self.__labelHist[comp] = 0      
                     comp = np.argmax(self.__labelHist)
                     if count>len(excludeIdx):
-                        print 'Error: Image is not usable'
+                        logger.error('Error: Image is not usable')
                         idx2=-1
                         break
                     else: count +=1
@@ -494,8 +503,7 @@ class Preprocessing(object):
             else:
                 idx2=-1
             
-            labeled=labeledToCopy.copy()
-            idx = np.where(labeled==idx2)
+            idx = self.componentPixels(labeled,idx2)
             
             '''
             bounding box
@@ -505,37 +513,33 @@ class Preprocessing(object):
                 jMin=np.min(idx[1])
                 iMax=np.max(idx[0])
                 jMax=np.max(idx[1])
-                print 'xMin and xMax of Excised Root: '+str(jMin)+' '+str(jMax)
-                print 'yMin and yMax of Excised Root: '+str(iMin)+' '+str(iMax)
-                print 'xMax of crown: '+str(maxOfCrown)
-                print 'xMin of crown: '+str(minOfCrown)
-                sel = labeled != idx2
-                labeled[sel]=0
+                logger.debug('xMin and xMax of Excised Root: '+str(jMin)+' '+str(jMax))
+                logger.debug('yMin and yMax of Excised Root: '+str(iMin)+' '+str(iMax))
+                logger.debug('xMax of crown: '+str(maxOfCrown))
+                logger.debug('xMin of crown: '+str(minOfCrown))
                 nonZ=len(idx[0])
                 boundingBoxSize=(iMax-iMin)*(jMax-jMin)
                 zeros=boundingBoxSize-nonZ
                 ratio=float(zeros)/float(nonZ)
-                print 'ratio: '+str(ratio)
+                logger.debug('ratio: '+str(ratio))
 
                 if counter>=nr_objects:
                     again=False
 
             except:
                 again=True
-        sel = labeled == idx2 
-        labeled[sel]=255     
-        return idx2,labeled[iMin:iMax, jMin:jMax],(iMax+iMin)/2,(jMax+jMin)/2,
+        imgExRoot=labeled[iMin:iMax, jMin:jMax]
+        imgExRoot=np.where(imgExRoot==idx2,imgExRoot,0)
+        imgExRoot[imgExRoot==idx2]=255
+        return idx2,imgExRoot,(iMax+iMin)/2,(jMax+jMin)/2,
         
-    def findTag(self, labeled, imgBinary, img, rect_ratio=0.33):
-        print 'searching tag'
+    def findTag(self, imgBinary, img, rect_ratio=0.33):
+        logger.debug('searching tag')
 
         ratio = []
-        for i in range(len(self.__compsX)):
+        for i in range(len(self.__labelHist)):
             if self.__labelHist[i] > 0:
-                xMin = np.min(self.__compsX[i])
-                xMax = np.max(self.__compsX[i])
-                yMin = np.min(self.__compsY[i])
-                yMax = np.max(self.__compsY[i])
+                xMin, xMax, yMin, yMax = self.componentBox(i)
                 '''
                 The Tag should cover at least 0.5% of the picture
                 '''
@@ -549,7 +553,7 @@ class Preprocessing(object):
                         '''
                         if yMin< (self.__h*0.5): 
                             tagRatio=(float(xMax) - float(xMin)) / (float(yMax) - float(yMin))
-                            print 'TagRatio detected: '+str(tagRatio)+' ID: '+str(self.__currentIdx)
+                            logger.debug('TagRatio detected: '+str(tagRatio)+' ID: '+str(self.__currentIdx))
                             ratio.append((float(xMax) - float(xMin)) / (float(yMax) - float(yMin)))
                         else: ratio.append(-1)
                     else: ratio.append(-1)
@@ -560,58 +564,37 @@ class Preprocessing(object):
         rect = np.max(ratio)
         if rect >=0:
             rectIdx = list(ratio).index(rect)
-            xMin = np.min(self.__compsX[rectIdx])
-            xMax = np.max(self.__compsX[rectIdx])
-            yMin = np.min(self.__compsY[rectIdx])
-            yMax = np.max(self.__compsY[rectIdx])
+            xMin, xMax, yMin, yMax = self.componentBox(rectIdx)
         else: 
             xMin=xMax=yMin=yMax = 0
             rectIdx =-1
 
-        print 'Tag Ratio: '+str(rect)
+        logger.info('Tag Ratio: '+str(rect))
         if rect ==-1: 
             rectIdx=-1
             iMin=iMax=jMin=jMax=0
         else:
-            idx = np.where(labeled==rectIdx)
             '''
             bounding box
             '''
-            iMin=np.min(idx[0])
-            jMin=np.min(idx[1])
-            iMax=np.max(idx[0])
-            jMax=np.max(idx[1])
+            iMin, iMax, jMin, jMax = yMin, yMax, xMin, xMax
         
-        sel = labeled != rectIdx
         if rect>=0: 
-            labeled[sel]=0
-            try:
-                print 'Check for text'
-                tagText=ocr.getTextFromImage(img[iMin+self.__tagCrop:iMax-self.__tagCrop, jMin+self.__tagCrop:jMax-self.__tagCrop],self.__io.getHomePath(),str(self.__id))
-            except:
-                tagText='Tag text extraction Failed'
-                pass
             '''
-            This order prefers the barcode over the text reader
+            The barcode is preferred over the text reader, tesseract only runs without barcode.
+            The tag is read in the background while the root is extracted, see ocr.waitForTag.
             '''
-            try: 
-                print 'Check for barcode'
-                tagCode=ocr.getCodeFromImage(img[iMin+self.__tagCrop:iMax-self.__tagCrop, jMin+self.__tagCrop:jMax-self.__tagCrop],self.__io.getHomePath())
-                if len(tagCode) >2:
-                    tagText=tagCode[8:len(tagCode)-1]
-                    print tagText
-                else:
-                    print 'bar code to short: '+tagCode
-            except:
-                pass
+            tagText=ocr.getReader().submit(img[iMin+self.__tagCrop:iMax-self.__tagCrop, jMin+self.__tagCrop:jMax-self.__tagCrop],self.__io.getHomePath())
+            logger.debug('tag submitted')
                 
-            self.__io.writeServerFile('dirt_out.csv',self.__io.getHomePath()+'/Mask/'+self.__io.getFileName()+'Tag.png,' +str(self.__io.getID())+',0')
+            if self.__io.writes('marker'):
+                self.__io.writeServerFile('dirt_out.csv',self.__io.getHomePath()+'/Mask/'+self.__io.getFileName()+'Tag.png,' +str(self.__io.getID())+',0')
             
             
         else:
             tagText= 'No label found'
         
-        print 'return value rectIdx: '+str(rectIdx)
+        logger.debug('return value rectIdx: '+str(rectIdx))
         return rectIdx, rect, float(xMax) - float(xMin), float(yMax) - float(yMin),imgBinary[iMin+self.__tagCrop:iMax-self.__tagCrop, jMin+self.__tagCrop:jMax-self.__tagCrop],tagText
 
     
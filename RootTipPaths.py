@@ -56,13 +56,28 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 # external library imports
 '''
 import numpy as np
-import scipy.optimize as sp
-import graph_tool.topology as gt
+'''
+scipy.optimize is imported where it is needed, because importing it takes seconds and
+runs that only compute mask traits do not need it. The same holds for graph_tool, see graphBackend.py.
+'''
+
+'''
+# internal library imports
+'''
+import Trace
+import Skeleton
+import graphBackend as gt
 
 '''
 # standard python imports
 '''
 import time
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
 
 class RootTipPaths(object):
     '''
@@ -111,6 +126,7 @@ class RootTipPaths(object):
     def model_func_dia(self,t, A, K, C, dia):
         return A * dia**(K * t) + C
     def fit_exp_nonlinear(self,t, y,dia):
+        import scipy.optimize as sp
         opt_parms, _ = sp.curve_fit(self.model_func, t, y, maxfev=100000)
         A, K, C = opt_parms
         fit_y = self.model_func(t, A, K, C)
@@ -122,8 +138,12 @@ class RootTipPaths(object):
         A = np.exp(A_log)
         fit_y = self.model_func(np.array(t), A, K, C)
         return fit_y  ,A,K,C 
-    def getRootTipPaths(self,thickestPath,G):
-        print('Calculating Root-Tip Paths')
+    def getRootTipPaths(self,thickestPath,G,cached=None):
+        '''
+        cached are the paths, the number of paths per vertex and the path edges of an earlier
+        run on the same graph (see getPathState), the shortest paths are not computed again then
+        '''
+        logger.info('Calculating Root-Tip Paths')
 
         CPVIDX=[]
         for i in thickestPath:
@@ -137,20 +157,30 @@ class RootTipPaths(object):
             #print '***** TIPS VAR ******'
             #print tips
             if tips ==-1:
-                print 'ERROR: No tips found'
+                logger.error('No tips found')
                 return -1
             try:
                 tips.remove(G.vertex_index(thickestPath[0]))
             except:
                 pass
+            Trace.count('tips',len(tips))
+            todo=tips
+            if cached is not None:
+                RTP,nrOfPaths,rtpEdges=cached
+                for v in G.vertices(): vprop[v]['nrOfPaths']=nrOfPaths[G.vertex_index[v]]
+                for s,t in rtpEdges: eprop[G.edge(s,t)]['RTP']=True
+                todo=[]
+            else: Trace.count('dijkstra calls',len(tips))
             
+            debug=logger.isEnabledFor(logging.DEBUG)
             percentOld=0
-            for idx,i in enumerate(tips):
+            for idx,i in enumerate(todo):
 
-                percent=(float(idx)/float(len(tips)))*100
-                if percentOld+5< percent: 
-                    print (str(np.round(percent,1))+'% '),
-                    percentOld=percent
+                if debug:
+                    percent=(float(idx)/float(len(tips)))*100
+                    if percentOld+5< percent: 
+                        logger.debug(str(np.round(percent,1))+'% ')
+                        percentOld=percent
                 try:
                     path,edges=gt.shortest_path(G, thickestPath[0], G.vertex(i) , weights=epropW, pred_map=None)
                     RTPTmp=[]
@@ -165,11 +195,11 @@ class RootTipPaths(object):
                     for j in edges:
                         eprop[j]['RTP']=True
                 except:
-                    print 'ERROR: in def getRootTipPaths(self,thickestPath,G): no dijkstra path at '+str(idx)+' in tips'
+                    logger.error('in def getRootTipPaths(self,thickestPath,G): no dijkstra path at '+str(idx)+' in tips')
                     pass
-            print 'Number of Root-Tip Paths: '+str(len(RTP))
+            logger.info('Number of Root-Tip Paths: '+str(len(RTP)))
             self.__RTP=RTP
-        print 'RTP done!'
+        logger.debug('RTP done!')
         return RTP,tips
     
     def getTips(self,thickestPath,G,counter=None):
@@ -179,9 +209,7 @@ class RootTipPaths(object):
         rootW=[]
         vprop=G.vertex_properties["vp"]
         for i in G.vertices():
-            count=0
-            for _ in i.out_neighbours():
-                count+=1
+            count=i.out_degree()
             if count == 3:
                 rootW.append(vprop[i]['coord'][1])
             if count<=1:
@@ -189,10 +217,46 @@ class RootTipPaths(object):
                     tips.append(G.vertex_index[i])
                     tipDia.append(vprop[i]['diameter'])
                     tipHeight.append(vprop[i]['coord'][0])
+        self.setTipStatistics(tipDia,tipHeight,rootW)
+        return tips
+    
+    def getTipsOfSkeleton(self,skelImg,skelDia,xScale,yScale,classes=None):
+        '''
+        Computes tip statistics from the skeleton image without a graph. Tips and junctions are
+        taken from Skeleton.classifyPixels over all skeleton components, the lowest skeleton pixel
+        stands in for the end of the thickest path. The values differ from those of getTips and are
+        written as the *_LUT traits. Returns the (row,column) indices of the tips.
+        '''
+        if classes is None: classes=Skeleton.classifyPixels(skelImg)
+        if xScale>0 and yScale>0: avgScale=(xScale+yScale)/2
+        else:
+            avgScale=1.
+            xScale=1.
+            yScale=1.
+        rows,cols=np.nonzero(classes==Skeleton.TIP)
+        skelRows,skelCols=np.nonzero(classes)
+        if len(skelRows)>0:
+            last=np.argmax(skelRows)
+            keep=(rows!=skelRows[last])|(cols!=skelCols[last])
+            rows,cols=rows[keep],cols[keep]
+        tipDia=list(np.asarray(skelDia)[rows,cols]*avgScale)
+        tipHeight=list(cols*xScale)
+        rootW=list(np.nonzero(classes==Skeleton.JUNCTION)[0]*yScale)
+        Trace.count('tips',len(rows))
+        self.setTipStatistics(tipDia,tipHeight,rootW)
+        return zip(rows,cols)
+    
+    def getTipStatistics(self):
+        '''
+        Returns median, mean and maximum tip diameter, rooting depth and root width of the last getTips or getTipsOfSkeleton call
+        '''
+        return self.__medianTipDiameter,self.__meanTipDiameter,self.__90TipDiameter,self.__rootingDepth,self.__rootWidth
+    
+    def setTipStatistics(self,tipDia,tipHeight,rootW):
         self.__medianTipDiameter=np.median(tipDia)
-        print 'Median Tip Diameter: '+str(self.__medianTipDiameter)
+        logger.debug('Median Tip Diameter: '+str(self.__medianTipDiameter))
         self.__meanTipDiameter=np.mean(tipDia)
-        print 'Mean Tip Diameter: '+str(self.__meanTipDiameter)
+        logger.debug('Mean Tip Diameter: '+str(self.__meanTipDiameter))
         self.__io.saveArray(tipDia,self.__io.getHomePath()+'Plots/'+self.__io.getFileName()+'_TipDiaHisto')
         self.__io.saveArray(tipDia,self.__io.getHomePath()+'Plots/'+self.__io.getFileName()+'_TipDiaHeightX')
         self.__io.saveArray(tipHeight,self.__io.getHomePath()+'Plots/'+self.__io.getFileName()+'_TipDiaHeightY')
@@ -223,17 +287,27 @@ class RootTipPaths(object):
                 self.__rootWidth=0
         except:
            pass
-        return tips
                 
-    def getRTPSkeleton(self,thickestPath,G,newRTp=False):
+    def getPathState(self,G):
+        '''
+        Returns the paths, the number of paths per vertex and the path edges after getRootTipPaths
+        '''
+        vprop=G.vertex_properties["vp"]
+        eprop=G.edge_properties["ep"]
+        nrOfPaths=[0]*G.num_vertices()
+        for v in G.vertices(): nrOfPaths[G.vertex_index[v]]=vprop[v]['nrOfPaths']
+        rtpEdges=[(G.vertex_index[e.source()],G.vertex_index[e.target()]) for e in G.edges() if eprop[e]['RTP']==True]
+        return self.__RTP,nrOfPaths,rtpEdges
+                
+    def getRTPSkeleton(self,thickestPath,G,newRTp=False,cached=None):
         eprop=G.edge_properties["ep"]
         if newRTp==True: self.__RTP=[]
         if len(self.__RTP) == 0: 
             startT=time.time()
-            RTP,tips = self.getRootTipPaths(thickestPath, G)
+            RTP,tips = self.getRootTipPaths(thickestPath, G, cached)
             self.__RTP=RTP
-            print 'RTPs computed in ' +str(time.time()-startT)+'s'
-        print 'calculating RTP Skeleton'
+            logger.info('RTPs computed in ' +str(time.time()-startT)+'s')
+        logger.debug('calculating RTP Skeleton')
 
         rtpSkel=G.copy()
         for e in G.edges():
@@ -56,15 +56,31 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 import numpy as np
 from scipy import ndimage
-import graph_tool.topology as gt
-import graph_tool.util as gu
-from graph_tool import Graph
 import mahotas as m
+'''
+The skeleton graph is built and traced through graphBackend, which imports graph_tool only
+when a graph is created, because importing it takes seconds and runs that only compute mask
+traits do not need it
+'''
+
+'''
+# internal library imports
+'''
+import Trace
+import Skeleton
+import stripLabel
+import graphBackend as gt
 
 '''
 # standard python import
 '''
 import time
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
 
 class Segmentation(object):
     '''
@@ -81,8 +97,11 @@ class Segmentation(object):
         self.__height, self.__width = np.shape(self.__img)
         self.__tips=tips
         self.__fail=False
+        self.__componentStats=None
     def getFail(self):
         return self.__fail
+    def setFail(self,fail):
+        self.__fail=fail
     def setTips(self,tips):
         '''
         BAD HACK. DO IT CLEAN IN THE REFACTORED VERSION
@@ -148,7 +167,7 @@ class Segmentation(object):
     def label(self, onlyOne=True):
 
         labeled, nr_objects = ndimage.label(self.__img)
-        print 'Number of components: ' + str(nr_objects)
+        logger.debug('Number of components: ' + str(nr_objects))
         #if nr_objects>2: return None
         if nr_objects==0: return None
         val=labeled.flatten()
@@ -178,8 +197,15 @@ class Segmentation(object):
     
 
     def labelAll(self):
-        labeled, nr_objects = ndimage.label(self.__img)
+        '''
+        Labels all components strip by strip (see stripLabel.py), the label image is a memory mapped
+        int32 array. The statistics of the components are available from getComponentStats afterwards.
+        '''
+        labeled, nr_objects, self.__componentStats = stripLabel.label(self.__img)
         return labeled, nr_objects
+    
+    def getComponentStats(self):
+        return self.__componentStats
 
     def findCircle(self,hist, labled):
         compsX = []
@@ -222,17 +248,21 @@ class Segmentation(object):
         return circleIdx, circleRatio, float(xMax) - float(xMin), float(yMax) - float(yMin)
     
     def findThickestPath(self,skelImg,skelDia,xScale,yScale):
-        print 'create skeleton graph'
-        skelGraph,skelSize=self.makeGraphFast(skelImg,skelDia,xScale,yScale)
-        rootVertex,_=self.findRootVertex(skelGraph)
-        epropW=skelGraph.edge_properties["w"]
-        
+        logger.info('create skeleton graph')
+        with Trace.span('graph build'):
+            skelGraph,skelSize=self.makeGraphFast(skelImg,skelDia,xScale,yScale)
         maxDia=np.max(skelDia)
         maxDia10=np.max(skelDia[0:len(skelDia)*0.1])
-        print 'max Diameter: '+ str(maxDia)
+        logger.debug('max Diameter: '+ str(maxDia))
+        path=self.findThickestPathInGraph(skelGraph)
+        return path,skelGraph,maxDia10,skelSize
+    
+    def findThickestPathInGraph(self,skelGraph):
+        rootVertex,_=self.findRootVertex(skelGraph)
+        epropW=skelGraph.edge_properties["w"]
         path=[]
         #remove all two-connected ones with 0 label
-        print 'trace path of thickest diameter'
+        logger.debug('trace path of thickest diameter')
         #find thickest path
         pathDetect=True
         if skelGraph.num_vertices() >0:
@@ -241,7 +271,9 @@ class Segmentation(object):
             while pathDetect==True:
                 lastVertex=self.findLastRootVertex(skelGraph)
                 try:
-                    path,_=gt.shortest_path(skelGraph, rootVertex, lastVertex , weights=epropW, pred_map=None)
+                    Trace.count('dijkstra calls')
+                    with Trace.span('thickest path'):
+                        path,_=gt.shortest_path(skelGraph, rootVertex, lastVertex , weights=epropW, pred_map=None)
                     pathDetect=False
                 except:
                     raise
@@ -251,17 +283,45 @@ class Segmentation(object):
                         skelGraph.remove_vertex(lastVertex)
                         lastVertex=self.findLastRootVertex(skelGraph)
 
-        return path,skelGraph,maxDia10,skelSize   
+        return path
+    
+    def scaleGraph(self,G,xScale,yScale):
+        '''
+        Converts a graph built by makeGraphFast in pixel units (xScale=yScale=1) to the given
+        scale. The result is the same as building the graph with xScale and yScale.
+        '''
+        if xScale>0 and yScale>0: avgScale=(xScale+yScale)/2
+        else: return G
+        vprop=G.vertex_properties["vp"]
+        eprop=G.edge_properties["ep"]
+        epropW=G.edge_properties["w"]
+        for v in G.vertices():
+            j,idx=vprop[v]['imgIdx']
+            vprop[v]['coord']=(float(j)*xScale,float(idx)*yScale)
+            vprop[v]['diameter']=vprop[v]['diameter']*avgScale
+        for e in G.edges():
+            va=e.source()
+            vb=e.target()
+            eprop[e]['coord1']=vprop[va]['coord']
+            eprop[e]['coord2']=vprop[vb]['coord']
+            eprop[e]['weight']=(vprop[va]['diameter']+vprop[vb]['diameter'])/2
+            # same step lengths as in makeGraphFast
+            if vprop[va]['imgIdx'][1]==vprop[vb]['imgIdx'][1]: step=2.
+            elif vprop[va]['imgIdx'][0]==vprop[vb]['imgIdx'][0]: step=1.
+            else: step=1.41
+            epropW[e]=step/(eprop[e]['weight']**2)
+        return G
                 
     def findThickestPathLateral(self,skelImg,skelDia,xScale,yScale):
-        print 'create skeleton graph'
-        skelGraph,_=self.makeGraphFast(skelImg,skelDia,xScale,yScale)
+        logger.info('create skeleton graph')
+        with Trace.span('graph build'):
+            skelGraph,_=self.makeGraphFast(skelImg,skelDia,xScale,yScale)
         rootVertex=self.findRootVertexLateral(skelGraph)
         epropW=skelGraph.edge_properties["w"]
 
         path=[]
         #remove all two-connected ones with 0 label
-        print 'trace path of thickest diameter'
+        logger.debug('trace path of thickest diameter')
         #find thickest path
         pathDetect=True
         if skelGraph.num_vertices() >0:
@@ -269,7 +329,9 @@ class Segmentation(object):
             while pathDetect==True:
                 lastVertex=self.findLastRootVertex(skelGraph)
                 try:
-                    path,_=gt.shortest_path(skelGraph, rootVertex, lastVertex , weights=epropW, pred_map=None)
+                    Trace.count('dijkstra calls')
+                    with Trace.span('thickest path'):
+                        path,_=gt.shortest_path(skelGraph, rootVertex, lastVertex , weights=epropW, pred_map=None)
                     pathDetect=False
                 except:
                     raise
@@ -282,9 +344,10 @@ class Segmentation(object):
         return path,skelGraph 
     
     def makeGraphFast(self,img,dia,xScale,yScale):
-        print('Building Graph Data Structure'),
+        logger.info('Building Graph Data Structure')
         start=time.time()
-        G = Graph(directed=False)
+        debug=logger.isEnabledFor(logging.DEBUG)
+        G = gt.Graph(directed=False)
         sumAddVertices=0
         
         vprop=G.new_vertex_property('object')
@@ -308,10 +371,11 @@ class Segmentation(object):
             Get foreground indices in the current line of the image and make vertices
             '''
             counter+=1
-            percent=(float(counter)/float(h))*100
-            if percentOld+10< percent: 
-                print (str(np.round(percent,1))+'% '),
-                percentOld=percent
+            if debug:
+                percent=(float(counter)/float(h))*100
+                if percentOld+10< percent: 
+                    logger.debug(str(np.round(percent,1))+'% ')
+                    percentOld=percent
 
             line1=np.where(i==True)
             if len(line1[0])>0:
@@ -346,7 +410,7 @@ class Segmentation(object):
                             eprop[e]={'coord1':vprop[va]['coord'], 'coord2':vprop[vb]['coord'],'weight':((vprop[va]['diameter']+vprop[vb]['diameter'])/2),'RTP':False}
                             epropW[e]=2./(eprop[e]['weight']**2)
                     except:
-                        print 'Boundary vertex at: '+str([v1,idx-1])+' image size: '+ str([w,h])
+                        if debug: logger.debug('Boundary vertex at: '+str([v1,idx-1])+' image size: '+ str([w,h]))
                         pass
                     
                     try:
@@ -357,7 +421,7 @@ class Segmentation(object):
                             eprop[e]={'coord1':vprop[va]['coord'], 'coord2':vprop[vb]['coord'],'weight':((vprop[va]['diameter']+vprop[vb]['diameter'])/2),'RTP':False}
                             epropW[e]=2./(eprop[e]['weight']**2)
                     except:
-                        print 'Boundary vertex at: '+str([v1+1,idx])+' image size: '+ str([w,h])
+                        if debug: logger.debug('Boundary vertex at: '+str([v1+1,idx])+' image size: '+ str([w,h]))
                         pass # just if we are out of bounds
                     
                     try:
@@ -372,7 +436,7 @@ class Segmentation(object):
                             epropW[e]=1./(eprop[e]['weight']**2)
                             if v1 not in addedVerticesLine2: addedVerticesLine2.append(v1)
                     except:
-                        print 'Boundary vertex at: '+str([v1,idx+1])+' image size: '+ str([w,h])
+                        if debug: logger.debug('Boundary vertex at: '+str([v1,idx+1])+' image size: '+ str([w,h]))
                         pass
                     
                     try:    
@@ -385,7 +449,7 @@ class Segmentation(object):
                             epropW[e]=1.41/(eprop[e]['weight']**2)
                             if v1+1 not in addedVerticesLine2: addedVerticesLine2.append(v1+1)
                     except:
-                        print 'Boundary vertex at: '+str([v1+1,idx+1])+' image size: '+ str([w,h])
+                        if debug: logger.debug('Boundary vertex at: '+str([v1+1,idx+1])+' image size: '+ str([w,h]))
                         pass
                     
                     try:
@@ -398,31 +462,33 @@ class Segmentation(object):
                             epropW[e]=1.41/(eprop[e]['weight']**2)
                             if v1-1 not in addedVerticesLine2: addedVerticesLine2.append(v1-1)
                     except:
-                        print 'Boundary vertex at: '+str([v1-1,idx+1])+' image size: '+ str([w,h])
-                        pass
-                    try:
-                        if img[idx][v1+1]==False and img[idx][v1-1]==False and img[idx+1][v1]==False and diagonalLeft==False and diagonalRight==False:
-                            print 'tip detected'
-                            if img[idx-1][v1-1]==False and img[idx-1][v1+1]==False and img[idx-1][v1]==False:
-                                print 'floating pixel'
-                    except:
+                        if debug: logger.debug('Boundary vertex at: '+str([v1-1,idx+1])+' image size: '+ str([w,h]))
                         pass
         
-        print'done!'                               
+        if debug:
+            classes=np.bincount(Skeleton.classifyPixels(img).ravel(),minlength=5)
+            logger.debug('skeleton pixels: '+str(classes[Skeleton.TIP])+' tips, '+str(classes[Skeleton.JUNCTION])+' junctions, '+str(classes[Skeleton.ISOLATED])+' floating pixels')
+        logger.debug('done!')
         G.edge_properties["ep"] = eprop
         G.edge_properties["w"] = epropW
         G.vertex_properties["vp"] = vprop            
-        print 'graph build in '+str(time.time()-start)
+        logger.info('graph build in '+str(time.time()-start))
         l = gt.label_largest_component(G)
         u = gt.GraphView(G, vfilt=l)
-        print '# vertices'
-        print(u.num_vertices())
-        print(G.num_vertices())
+        logger.debug('# vertices of the largest component: '+str(u.num_vertices())+' of '+str(G.num_vertices()))
         if u.num_vertices()!=G.num_vertices(): self.__fail=float((G.num_vertices()-u.num_vertices()))/float(G.num_vertices())
+        Trace.count('skeleton vertices',u.num_vertices())
+        Trace.count('skeleton edges',u.num_edges())
         return u,u.num_vertices()
  
     def makeGraph(self,img,dia,xScale,yScale):
-        print 'Building Graph Data Structure'
+        '''
+        Needs graph_tool, use makeGraphFast
+        '''
+        import graph_tool.topology as gt
+        import graph_tool.util as gu
+        from graph_tool import Graph
+        logger.info('Building Graph Data Structure')
         start=time.time()
         G = Graph(directed=False)
         vprop=G.new_vertex_property('object')
@@ -434,12 +500,12 @@ class Segmentation(object):
         ss = np.shape(test)
         cccc=0
         percentOld=0.0
-        print str(np.round(percentOld,1))+'%'
+        logger.debug(str(np.round(percentOld,1))+'%')
         for (i,j) in zip(test[1],test[0]):
                 cccc+=1
                 percent=(float(cccc)/float(ss[1]))*100
                 if percentOld+10< percent: 
-                    print str(np.round(percent,1))+'%'
+                    logger.debug(str(np.round(percent,1))+'%')
                     percentOld=percent
                 nodeNumber1 = (float(i)*yScale,float(j)*xScale)
                 if gu.find_vertex(G, vprop, {'imgIdx':(j,i),'coord':nodeNumber1, 'nrOfPaths':0, 'diameter':float(dia[j][i])*avgScale}):
@@ -522,36 +588,28 @@ class Segmentation(object):
                             eprop[e]={'coord1':vprop[v1]['coord'], 'coord2':vprop[v2]['coord'],'weight':((vprop[v1]['diameter']+vprop[v2]['diameter'])/2)**4,'RTP':False}
                 except: pass
 #                    
-        print '100.0%'
-        print 'selecting largest connected component'
+        logger.debug('100.0%')
+        logger.info('selecting largest connected component')
         G.edge_properties["ep"] = eprop
         G.edge_properties["w"] = epropW
         G.vertex_properties["vp"] = vprop
         l = gt.label_largest_component(G)
-        print(l.a)
+        logger.debug(l.a)
         u = gt.GraphView(G, vfilt=l)
-        print '# vertices'
-        print(u.num_vertices())
-        print(G.num_vertices())
-        print '# edges'
-        print(u.num_edges())
-        print 'building graph finished in: '+str(time.time()-start)+'s'
+        logger.debug('# vertices of the largest component: '+str(u.num_vertices())+' of '+str(G.num_vertices()))
+        logger.debug('# edges: '+str(u.num_edges()))
+        logger.info('building graph finished in: '+str(time.time()-start)+'s')
         return u 
     
     def findRootVertex(self,G):
-        print 'finding root vertex X'
+        logger.debug('finding root vertex X')
         h=self.__height
         vertexIndex = 0
         dTmp=0
         dMax=0
         vprop=G.vertex_properties["vp"]
         for v in G.vertices():
-            count=0
-            for _ in v.out_neighbours():
-                count+=1
-                if count >2:
-                    break 
-            if count>2:
+            if v.out_degree()>2:
                 dTmp=vprop[v]['diameter']
                 if vprop[v]['imgIdx'][1] < h:
                     dMax=dTmp
@@ -559,8 +617,19 @@ class Segmentation(object):
                     vertexIndex = v
         return vertexIndex,dMax
     
+    def findRootPixel(self,skelImg,skelDia,classes=None):
+        '''
+        Image version of findRootVertex: returns the (row,column) index and the diameter in pixels
+        of the highest junction pixel of the skeleton, or None and 0 without junctions
+        '''
+        if classes is None: classes=Skeleton.classifyPixels(skelImg)
+        rows,cols=np.nonzero(classes==Skeleton.JUNCTION)
+        if len(rows)==0: return None,0
+        i=np.argmin(rows)
+        return (rows[i],cols[i]),skelDia[rows[i]][cols[i]]
+    
     def findRootVertexLateral(self,G):
-        print 'finding root vertex X'
+        logger.debug('finding root vertex X')
         h=self.__height
         vertexIndex = 0
 
@@ -633,7 +702,7 @@ class Segmentation(object):
     
     
     def findHypocotylCluster(self,thickestPath,rtpSkel):
-        print 'find Cluster'
+        logger.info('find Cluster')
         branchingPaths=[]
         branchingPoints=[]
         radius=[]
@@ -666,7 +735,7 @@ class Segmentation(object):
                 
     def makeSegmentationPicture(self,thickestPath,G,crownImg,xScale,yScale,c1x,c1y,c2x,c2y,c3x=None,c3y=None):
 
-        print 'make cluster picture'
+        logger.info('make cluster picture')
         crownImg=m.as_rgb(crownImg,crownImg,crownImg)
         vprop=G.vertex_properties["vp"]
         for i in thickestPath:
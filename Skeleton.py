@@ -3,6 +3,10 @@ Skeleton.py
 
 Simple class to compute the medial axis (skeleton) and the distance map.
 
+The pixels of a skeleton are classified as tips, chains, junctions and isolated pixels by a
+lookup table of their 3x3 neighbourhood (classifyPixels), which needs no skeleton graph.
+pruneSpurs removes the short terminal branches that thinning leaves at noisy boundaries.
+
 The code is free for non-commercial use.
 Please contact the author for commercial use.
 
@@ -56,6 +60,123 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 import mahotas as m
 import numpy as np
 
+'''
+# internal library imports
+'''
+import Trace
+
+'''
+# standard python imports
+'''
+import os
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+BACKGROUND=0
+TIP=1
+CHAIN=2
+JUNCTION=3
+ISOLATED=4
+# (row,column) offset of the neighbour of every bit of the neighbourhood code, clockwise from north
+neighbourBits=[(-1,0),(-1,1),(0,1),(1,1),(1,0),(1,-1),(0,-1),(-1,-1)]
+
+def pixelClass(code):
+    '''
+    Class of a skeleton pixel with the given 8-bit neighbourhood code. The number of
+    background-foreground transitions around the pixel separates tips from chains and
+    junctions, so an end pixel with two adjacent neighbours is still a tip.
+    '''
+    ring=[(code>>i)&1 for i in range(8)]
+    if sum(ring)==0: return ISOLATED
+    crossings=sum([1 for i in range(8) if ring[i]==0 and ring[(i+1)%8]==1])
+    if crossings==1: return TIP
+    if crossings>2: return JUNCTION
+    return CHAIN
+
+pixelTable=np.array([pixelClass(code) for code in range(256)],dtype=np.uint8)
+
+def neighbourCodes(skelImg):
+    '''
+    Returns the 8-bit code of the 3x3 neighbourhood of every pixel, pixels outside the image are background
+    '''
+    h,w=np.shape(skelImg)
+    padded=np.zeros((h+2,w+2),dtype=np.uint8)
+    padded[1:h+1,1:w+1]=skelImg>0
+    code=np.zeros((h,w),dtype=np.uint8)
+    for bit,(dy,dx) in enumerate(neighbourBits):
+        code|=padded[1+dy:1+dy+h,1+dx:1+dx+w]*np.uint8(1<<bit)
+    return code
+
+def classifyPixels(skelImg):
+    '''
+    Returns an image with the class (TIP, CHAIN, JUNCTION, ISOLATED) of every skeleton pixel and BACKGROUND elsewhere
+    '''
+    classes=pixelTable[neighbourCodes(skelImg)]
+    classes[np.asarray(skelImg)==0]=BACKGROUND
+    return classes
+
+def spurFactor():
+    '''
+    Spur length relative to the radius at the junction below which spurs are pruned, set by
+    the environment variable DIRT_SPUR_PRUNING. 0 (default) switches the pruning off.
+    '''
+    try: return max(float(os.environ.get('DIRT_SPUR_PRUNING','0')),0.)
+    except ValueError:
+        logger.warning('invalid DIRT_SPUR_PRUNING: '+os.environ['DIRT_SPUR_PRUNING'])
+        return 0.
+
+def traceSpur(skelImg,classes,tip,maxLength):
+    '''
+    Follows the skeleton from a tip to the next junction. Returns the pixels of the branch and the
+    junction, the junction is None if the branch ends without one or is longer than maxLength.
+    '''
+    h,w=np.shape(skelImg)
+    branch=[tip]
+    visited=set(branch)
+    while len(branch)<=maxLength:
+        r,c=branch[-1]
+        nxt=[(r+dy,c+dx) for dy,dx in neighbourBits if 0<=r+dy<h and 0<=c+dx<w and skelImg[r+dy,c+dx] and (r+dy,c+dx) not in visited]
+        for p in nxt:
+            if classes[p]==JUNCTION: return branch,p
+        if len(nxt)==0: return branch,None
+        if max([max(abs(a[0]-b[0]),abs(a[1]-b[1])) for a in nxt for b in nxt])>1:
+            # the branch splits at the last pixel
+            return branch[:-1],branch[-1]
+        # of two adjacent candidates (a step of the skeleton) the 4-neighbour comes first
+        nxt.sort(key=lambda p: abs(p[0]-r)+abs(p[1]-c))
+        branch.append(nxt[0])
+        visited.add(nxt[0])
+    return branch,None
+
+def pruneSpurs(skelImg,dmap,factor=1.):
+    '''
+    Removes terminal branches that are at most factor times the radius of the distance map at their
+    junction long, i.e. spurs that do not leave the root they branch from. Branches are measured on
+    the input skeleton, so a pass does not shorten real roots step by step.
+    Returns the pruned skeleton and the number of removed spurs and pixels.
+    '''
+    skelImg=np.asarray(skelImg)>0
+    classes=classifyPixels(skelImg)
+    maxLength=int(factor*np.max(dmap)/2.)+1 if skelImg.any() else 0
+    spurs=[]
+    for tip in zip(*np.nonzero(classes==TIP)):
+        branch,junction=traceSpur(skelImg,classes,tip,maxLength)
+        if junction is not None and len(branch)>0 and len(branch)<=factor*dmap[junction]/2.:
+            spurs.append(branch)
+    pruned=skelImg.copy()
+    pixels=0
+    for branch in spurs:
+        rows,cols=zip(*branch)
+        pruned[list(rows),list(cols)]=False
+        pixels+=len(branch)
+    logger.info('pruned '+str(len(spurs))+' spurs with '+str(pixels)+' pixels')
+    Trace.count('spurs removed',len(spurs))
+    Trace.count('spur pixels removed',pixels)
+    return pruned,len(spurs),pixels
+
 class Skeleton(object):
     '''
     classdocs
@@ -0,0 +1,248 @@
+'''
+Trace.py
+
+Lightweight instrumentation of the pipeline. Every image gets a Trace that records
+named spans (wall-clock time of a stage or of a part of a stage) and counters such as
+pixels, skeleton vertices or bytes written. With a memory probe (see memoryProbe.py)
+the stage spans also hold the memory use of the stage. The trace is written as one json file per
+image to <working directory>/<ID>/tmp/trace.json and runOnFolder.py aggregates all
+traces of a batch into profile.json.
+
+The trace of the image in progress is the current trace of the process. Modules that
+do not hold the IO object record into it through the module functions span() and count().
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# internal library imports
+'''
+import watchdog as wd
+
+'''
+# standard python imports
+'''
+import json
+import time
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+
+class Trace(object):
+    '''
+    classdocs
+    '''
+
+    def __init__(self,name=None,ID=None,probe=None):
+        '''
+        Constructor
+        '''
+        self.__probe=probe
+        self.__name=name
+        self.__id=ID
+        self.__start=time.time()
+        self.__spans=[]
+        self.__counters=OrderedDict()
+        self.__errors=[]
+        self.__stage=None
+        self.__open=[]
+        self.__lock=threading.Lock()
+
+    def startStage(self,name):
+        '''
+        Stages follow each other, the previous stage ends when the next one starts
+        '''
+        now=time.time()
+        memory=None
+        if self.__probe is not None: memory=self.__probe.startStage(name)
+        if self.__stage is not None:
+            stageName,start=self.__stage
+            self.addSpan(stageName,None,start,now,memory)
+        self.__stage=(name,now) if name!='done' else None
+
+    def addSpan(self,name,parent,start,end,memory=None):
+        s=OrderedDict([('name',name),('parent',parent),('start',start-self.__start),('seconds',end-start)])
+        if memory is not None: s['memory']=memory
+        with self.__lock:
+            self.__spans.append(s)
+
+    @contextmanager
+    def span(self,name):
+        '''
+        Use as: with trace.span('graph build'): ...
+        '''
+        if len(self.__open)>0: parent=self.__open[-1]
+        elif self.__stage is not None: parent=self.__stage[0]
+        else: parent=None
+        self.__open.append(name)
+        start=time.time()
+        try:
+            yield
+        finally:
+            self.__open.pop()
+            self.addSpan(name,parent,start,time.time())
+
+    def count(self,name,value=1):
+        with self.__lock:
+            self.__counters[name]=self.__counters.get(name,0)+value
+
+    def addError(self,message):
+        '''
+        Failures that do not stop the image, e.g. outputs that could not be written
+        '''
+        with self.__lock:
+            self.__errors.append(message)
+
+    def getCounters(self):
+        return self.__counters
+
+    def getErrors(self):
+        return self.__errors
+
+    def getSpans(self):
+        return self.__spans
+
+    def toDict(self):
+        with self.__lock:
+            return OrderedDict([('image',self.__name),('id',self.__id),('spans',list(self.__spans)),('counters',OrderedDict(self.__counters)),('errors',list(self.__errors))])
+
+    def write(self,path):
+        self.startStage('done')
+        with open(path,'w') as fout:
+            json.dump(self.toDict(),fout,indent=1)
+
+'''
+# global defs
+'''
+currentTrace=Trace()
+
+def setCurrent(trace):
+    global currentTrace
+    currentTrace=trace
+
+def current():
+    return currentTrace
+
+def span(name):
+    return currentTrace.span(name)
+
+def count(name,value=1):
+    currentTrace.count(name,value)
+
+def readTrace(path):
+    if path is None: return None
+    try:
+        with open(path,'r') as fin:
+            return json.load(fin)
+    except (IOError,ValueError):
+        return None
+
+def spanKey(s):
+    '''
+    parts of a stage are named stage/part
+    '''
+    return s['name'] if s['parent'] is None else s['parent']+'/'+s['name']
+
+def spanTotals(trace):
+    '''
+    Seconds per span name of one trace, repeated spans are added up
+    '''
+    totals=OrderedDict()
+    for s in trace['spans']:
+        totals[spanKey(s)]=totals.get(spanKey(s),0.)+s['seconds']
+    return totals
+
+def peakMemory(trace):
+    '''
+    Largest peak rss in MB per stage of one trace recorded with a memory probe
+    '''
+    peaks=OrderedDict()
+    for s in trace['spans']:
+        if 'memory' in s: peaks[spanKey(s)]=max(peaks.get(spanKey(s),0.),s['memory']['peak rss MB'])
+    return peaks
+
+class BatchProfile(object):
+    '''
+    Aggregates the traces of all images of a batch run
+    '''
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+        self.__spans=OrderedDict()
+        self.__counters=OrderedDict()
+        self.__peaks={}
+        self.__images=0
+
+    def add(self,trace):
+        if trace is None: return
+        self.__images+=1
+        for key,peak in peakMemory(trace).items():
+            self.__peaks[key]=max(self.__peaks.get(key,0.),peak)
+        for key,seconds in spanTotals(trace).items():
+            if key not in self.__spans: self.__spans[key]=[]
+            self.__spans[key].append(seconds)
+        for name,value in trace['counters'].items():
+            if name not in self.__counters: self.__counters[name]=[]
+            self.__counters[name].append(value)
+
+    def toDict(self):
+        spans=OrderedDict()
+        for key,v in self.__spans.items():
+            spans[key]=OrderedDict([('images',len(v)),('total',sum(v)),('p50',wd.percentile(v,50)),('p95',wd.percentile(v,95)),('max',max(v))])
+            if key in self.__peaks: spans[key]['max peak rss MB']=self.__peaks[key]
+        counters=OrderedDict()
+        for name,v in self.__counters.items():
+            counters[name]=OrderedDict([('images',len(v)),('total',sum(v)),('mean',float(sum(v))/len(v)),('max',max(v))])
+        return OrderedDict([('images',self.__images),('spans',spans),('counters',counters)])
+
+    def write(self,path):
+        with open(path,'w') as fout:
+            json.dump(self.toDict(),fout,indent=1)
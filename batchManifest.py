@@ -0,0 +1,205 @@
+'''
+batchManifest.py
+
+Bookkeeping for resumable batch runs of runOnFolder.py. Every image is identified
+by a hash of its content and the options it is computed with, so the result of an
+image does not depend on its position in the folder listing. The manifest is an
+append-only csv file in the image folder; the last row of a key wins.
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# standard python imports
+'''
+import os
+import csv
+import time
+import shutil
+import hashlib
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+imageExtensions=['.jpg','.jpeg','.png','.tif','.tiff','.raw']
+manifestFields=['file','size','mtime','content hash','key','id','status','time','note']
+
+def isImage(fileName):
+    '''
+    Input is restricted to .jpg, .png, .tif and .raw images (see ReadME)
+    '''
+    if fileName[0]=='.': return False
+    return os.path.splitext(fileName)[1].lower() in imageExtensions
+
+def hashFile(filePath,blockSize=1024*1024):
+    h=hashlib.sha1()
+    with open(filePath,'rb') as fin:
+        block=fin.read(blockSize)
+        while len(block)>0:
+            h.update(block)
+            block=fin.read(blockSize)
+    return h.hexdigest()
+
+class BatchManifest(object):
+    '''
+    classdocs
+    '''
+
+    def __init__(self,dirName,manifestName='manifest.csv'):
+        '''
+        Constructor
+        '''
+        self.__dir=dirName
+        self.__path=dirName+manifestName
+        self.__hashes={}
+        self.__jobs={}
+        self.__duplicates=set()
+        self.__usedIDs=set()
+        self.load()
+
+    def load(self):
+        '''
+        Can be called again to pick up rows written by other processes
+        '''
+        if os.path.isfile(self.__path)==False: return
+        with open(self.__path,'U') as csvfile:
+            for row in csv.DictReader(csvfile):
+                try:
+                    self.__hashes[row['file']]=(int(row['size']),row['mtime'],row['content hash'])
+                    if row['status']=='duplicate':
+                        self.__duplicates.add(row['file'])
+                    else:
+                        self.__duplicates.discard(row['file'])
+                        self.__jobs[row['key']]={'id':int(row['id']),'status':row['status'],'file':row['file']}
+                        self.__usedIDs.add(int(row['id']))
+                except:
+                    logger.warning('invalid entry in manifest file: '+str(row))
+
+    def writeRow(self,fileName,key,imgID,status,note=''):
+        size,mtime,contentHash=self.__hashes[fileName]
+        newFile=os.path.isfile(self.__path)==False
+        with open(self.__path,'a') as fout:
+            writer=csv.writer(fout)
+            if newFile: writer.writerow(manifestFields)
+            writer.writerow([fileName,size,mtime,contentHash,key,imgID,status,int(time.time()),note])
+
+    def contentHash(self,fileName):
+        '''
+        The content hash is only recomputed if size or modification time of the file changed
+        '''
+        st=os.stat(self.__dir+fileName)
+        mtime=repr(st.st_mtime)
+        if fileName in self.__hashes:
+            size,oldMtime,h=self.__hashes[fileName]
+            if size==st.st_size and oldMtime==mtime: return h
+        h=hashFile(self.__dir+fileName)
+        self.__hashes[fileName]=(st.st_size,mtime,h)
+        return h
+
+    def newID(self):
+        imgID=0
+        while imgID in self.__usedIDs or os.path.exists(self.__dir+str(imgID)):
+            imgID+=1
+        self.__usedIDs.add(imgID)
+        return imgID
+
+    def jobKey(self,fileName,options):
+        '''
+        The key of a job combines the content hash of the image with the run options
+        '''
+        return hashlib.sha1(self.contentHash(fileName)+'|'+','.join([str(i) for i in options])).hexdigest()
+
+    def register(self,fileName,options,cleanup=True):
+        '''
+        Returns the key, the image ID and one of the states 'done', 'duplicate' or 'todo'.
+        With cleanup the output folder of a failed or incomplete run is removed, so that main.py starts from scratch.
+        '''
+        key=self.jobKey(fileName,options)
+        if key in self.__jobs:
+            job=self.__jobs[key]
+            if job['file']!=fileName and os.path.isfile(self.__dir+job['file']):
+                logger.info(fileName+' is identical to '+job['file'])
+                if fileName not in self.__duplicates:
+                    self.__duplicates.add(fileName)
+                    self.writeRow(fileName,key,job['id'],'duplicate')
+                return key,job['id'],'duplicate'
+            imgID=job['id']
+            if job['status']=='done' and self.isComplete(imgID):
+                return key,imgID,'done'
+            if cleanup: self.removeOutput(imgID)
+            if job['status']=='pending' and job['file']==fileName:
+                return key,imgID,'todo'
+        else:
+            imgID=self.newID()
+        self.__jobs[key]={'id':imgID,'status':'pending','file':fileName}
+        self.writeRow(fileName,key,imgID,'pending')
+        return key,imgID,'todo'
+
+    def removeOutput(self,imgID):
+        if os.path.isdir(self.__dir+str(imgID)):
+            logger.info('removing incomplete result of image '+str(imgID))
+            shutil.rmtree(self.__dir+str(imgID))
+
+    def isComplete(self,imgID):
+        return os.path.isfile(self.__dir+str(imgID)+'/output.csv')
+
+    def complete(self,key,returnCode,note=''):
+        '''
+        note is stored with the status, e.g. the stage that timed out
+        '''
+        job=self.__jobs[key]
+        if returnCode==0 and self.isComplete(job['id']): job['status']='done'
+        else: job['status']='failed'
+        self.writeRow(job['file'],key,job['id'],job['status'],note)
+        return job['status']
+
+    def getStatus(self,key):
+        return self.__jobs[key]['status']
@@ -0,0 +1,133 @@
+'''
+benchmarkGraph.py
+
+Compares the graph backends (see graphBackend.py) on the skeleton graphs of seeded synthetic
+root crowns of several sizes. The graph kernels of benchmarkKernels.py (graph build, thickest
+path, root tip paths) are timed with every backend that is installed, both backends get the
+same medial axis. The results are stored as json.
+
+Example: python benchmarkGraph.py --megapixels 1 4 16 --output graph.json
+         python benchmarkGraph.py --backends scipy
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# internal library imports
+'''
+import benchmarkKernels as bk
+import graphBackend
+import logConfig
+
+'''
+# python standard imports
+'''
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from collections import OrderedDict
+
+'''
+# global defs
+'''
+graphKernels=['makeGraphFast','findThickestPath','getRootTipPaths']
+
+def graphSize(inputs):
+    _,G=inputs.thickestPath()
+    return G.num_vertices(),G.num_edges()
+
+def runBackend(name,inputs,repeat=5):
+    graphBackend.setBackend(name)
+    result=OrderedDict()
+    result['vertices'],result['edges']=graphSize(inputs)
+    for kernel in graphKernels:
+        result[kernel]=bk.runKernel(kernel,inputs,repeat)
+    return result
+
+if __name__ == '__main__':
+    available=[b for b in graphBackend.backends if b!='graph_tool' or graphBackend.hasGraphTool()]
+    parser=argparse.ArgumentParser(description='Compares the graph backends of DIRT.')
+    parser.add_argument('--backends',nargs='+',default=available,choices=graphBackend.backends,help='backends to run, default all installed')
+    parser.add_argument('--megapixels',type=float,nargs='+',default=[1.,4.],help='resolutions of the synthetic crowns')
+    parser.add_argument('--seed',type=int,default=0,help='seed of the crowns')
+    parser.add_argument('--repeat',type=int,default=5,help='repetitions per kernel')
+    parser.add_argument('--output',default='graph.json',help='json file for the results')
+    args=parser.parse_args()
+    logConfig.configure(os.environ.get('DIRT_LOG_LEVEL','WARNING'))
+    missing=[b for b in args.backends if b not in available]
+    if len(missing)>0:
+        print 'backend not installed: '+', '.join(missing)
+        sys.exit(1)
+    
+    results=OrderedDict()
+    results['meta']=OrderedDict([('python',platform.python_version()),('machine',platform.node()),('seed',args.seed),
+                                 ('repeat',args.repeat),('time',time.time())])
+    results['crowns']=[]
+    for mp in args.megapixels:
+        inputs=bk.Inputs(mp,args.seed)
+        crown=OrderedDict([('megapixels',mp),('backends',OrderedDict())])
+        for name in args.backends:
+            crown['backends'][name]=runBackend(name,inputs,args.repeat)
+        results['crowns'].append(crown)
+    with open(args.output,'w') as fout:
+        json.dump(results,fout,indent=1)
+    
+    print ' '
+    print '%6s %-20s %9s'%('MP','kernel','vertices')+''.join(['%12s'%(b+' [s]') for b in args.backends])+('%8s'%'ratio' if len(args.backends)==2 else '')
+    for crown in results['crowns']:
+        first=crown['backends'][args.backends[0]]
+        for kernel in graphKernels:
+            times=[crown['backends'][b][kernel]['min'] for b in args.backends]
+            line='%6.1f %-20s %9d'%(crown['megapixels'],kernel,first['vertices'])+''.join(['%12.4f'%t for t in times])
+            if len(times)==2: line+='%8.2f'%(times[1]/times[0] if times[0]>0 else float('inf'))
+            print line
+    print 'Results written to '+args.output
@@ -0,0 +1,267 @@
+'''
+benchmarkKernels.py
+
+Micro benchmarks of the compute kernels of DIRT on seeded synthetic root crowns (see
+syntheticRoots.py). Every kernel gets fresh copies of its inputs for every repetition,
+only the kernel call itself is timed. The results are stored as json and can be compared
+against a saved baseline; kernels that are slower than the baseline by more than the
+tolerance are reported and the exit code is 1.
+
+Example: python benchmarkKernels.py --output new.json [--baseline base.json] [--tolerance 0.1]
+         python benchmarkKernels.py --kernels skel makeGraphFast --megapixels 4
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# external library imports
+'''
+import numpy as np
+
+'''
+# internal library imports
+'''
+import IO
+import Masking
+import Preprocessing
+import Segmentation
+import Skeleton
+import RootTipPaths
+import Analysis
+import kmeans as km
+import ransac
+import syntheticRoots as sr
+import logConfig
+
+'''
+# python standard imports
+'''
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+from collections import OrderedDict
+
+class Inputs(object):
+    '''
+    Inputs of the kernels, computed once per run from the synthetic image. Stages
+    that are inputs of later kernels are cached.
+    '''
+
+    def __init__(self,megapixels=1.,seed=0):
+        '''
+        Constructor
+        '''
+        self.seed=seed
+        self.grey,self.truth=sr.drawRootCrown(megapixels,seed)
+        self.io=IO.IO(tempfile.mkdtemp(prefix='dirtbench')+'/',ID=0,plots=False)
+        self.io.setFileName('benchmark')
+        self.__cache={}
+
+    def cached(self,name,func):
+        if name not in self.__cache: self.__cache[name]=func()
+        return self.__cache[name]
+
+    def mask(self):
+        return self.cached('mask',lambda: Masking.Masking().calculateMask(self.grey.copy()))
+
+    def crown(self):
+        '''
+        labeled crop of the largest component, as threadCrown gets it
+        '''
+        return self.cached('crown',lambda: Segmentation.Segmentation(self.mask().copy(),self.io).label())
+
+    def skeleton(self):
+        return self.cached('skeleton',lambda: Skeleton.Skeleton(self.crown()).skel(self.crown().copy()))
+
+    def segmentation(self):
+        return Segmentation.Segmentation(self.crown().copy(),self.io)
+
+    def thickestPath(self):
+        '''
+        The graph is modified by getRootTipPaths and therefore not cached
+        '''
+        skel,dia=self.skeleton()
+        path,G,_,_=self.segmentation().findThickestPath(skel,dia,1.,1.)
+        return path,G
+
+def calculateMask(inputs):
+    img=inputs.grey.copy()
+    return lambda: Masking.Masking().calculateMask(img)
+
+def calculateLabelHist(inputs):
+    img=inputs.mask().copy()
+    prep=Preprocessing.Preprocessing(inputs.io)
+    return lambda: prep.calculateLabelHist(img)
+
+def skel(inputs):
+    img=inputs.crown().copy()
+    return lambda: Skeleton.Skeleton(img).skel(img)
+
+def classifyPixels(inputs):
+    skelImg,_=inputs.skeleton()
+    return lambda: Skeleton.classifyPixels(skelImg)
+
+def pruneSpurs(inputs):
+    skelImg,dia=inputs.skeleton()
+    return lambda: Skeleton.pruneSpurs(skelImg,dia)
+
+def makeGraphFast(inputs):
+    skelImg,dia=inputs.skeleton()
+    seg=inputs.segmentation()
+    return lambda: seg.makeGraphFast(skelImg,dia,1.,1.)
+
+def findThickestPath(inputs):
+    skelImg,dia=inputs.skeleton()
+    seg=inputs.segmentation()
+    return lambda: seg.findThickestPath(skelImg,dia,1.,1.)
+
+def getRootTipPaths(inputs):
+    path,G=inputs.thickestPath()
+    rtp=RootTipPaths.RootTipPaths(inputs.io)
+    return lambda: rtp.getRootTipPaths(path,G)
+
+def getWidthOverHeight(inputs):
+    img=inputs.crown().copy()
+    analysis=Analysis.Analysis(inputs.io,1.)
+    return lambda: analysis.getWidthOverHeight(img,1.,1.)
+
+def kmeans(inputs,n=2000):
+    rng=np.random.RandomState(inputs.seed)
+    pts=np.vstack([rng.normal(10.,2.,(n/2,2)),rng.normal(20.,3.,(n-n/2,2))]).tolist()
+    cl=km.kMeans(pts)
+    random.seed(inputs.seed)
+    return lambda: cl.kmeans(2,0.01)
+
+def ransacFit(inputs,n=500):
+    rng=np.random.RandomState(inputs.seed)
+    X=rng.uniform(0.,100.,n)
+    Y=2.*X+1.+rng.normal(0.,1.,n)
+    outliers=rng.randint(0,n,n/10)
+    Y[outliers]+=rng.uniform(-50.,50.,len(outliers))
+    np.random.seed(inputs.seed)
+    return lambda: ransac.ransacFit(list(X),list(Y))
+
+'''
+# global defs
+'''
+kernels=OrderedDict([('calculateLabelHist',calculateLabelHist),('calculateMask',calculateMask),('skel',skel),('classifyPixels',classifyPixels),('pruneSpurs',pruneSpurs),
+                     ('makeGraphFast',makeGraphFast),('findThickestPath',findThickestPath),('getRootTipPaths',getRootTipPaths),
+                     ('getWidthOverHeight',getWidthOverHeight),('kmeans',kmeans),('ransacFit',ransacFit)])
+
+def runKernel(name,inputs,repeat=5):
+    times=[]
+    for _ in range(repeat):
+        run=kernels[name](inputs)
+        start=time.time()
+        run()
+        times.append(time.time()-start)
+    return OrderedDict([('min',min(times)),('median',sorted(times)[len(times)/2]),('times',times)])
+
+def compare(results,baseline,tolerance=0.1):
+    '''
+    Returns (kernel, baseline time, time, ratio, verdict) rows, the minimum of the repetitions is compared
+    '''
+    rows=[]
+    for name,r in results['kernels'].items():
+        if name not in baseline['kernels']: continue
+        old=baseline['kernels'][name]['min']
+        ratio=r['min']/old if old>0 else float('inf')
+        if ratio>1.+tolerance: verdict='slower'
+        elif ratio<1.-tolerance: verdict='faster'
+        else: verdict='same'
+        rows.append((name,old,r['min'],ratio,verdict))
+    return rows
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description='Micro benchmarks of the DIRT kernels.')
+    parser.add_argument('--kernels',nargs='+',default=list(kernels.keys()),choices=list(kernels.keys()),help='kernels to run, default all')
+    parser.add_argument('--megapixels',type=float,default=1.,help='resolution of the synthetic image')
+    parser.add_argument('--seed',type=int,default=0,help='seed of the inputs')
+    parser.add_argument('--repeat',type=int,default=5,help='repetitions per kernel')
+    parser.add_argument('--output',default='kernels.json',help='json file for the results')
+    parser.add_argument('--baseline',default=None,help='json file of an earlier run to compare with')
+    parser.add_argument('--tolerance',type=float,default=0.1,help='relative change that counts as slower or faster')
+    args=parser.parse_args()
+    logConfig.configure(os.environ.get('DIRT_LOG_LEVEL','WARNING'))
+    
+    inputs=Inputs(args.megapixels,args.seed)
+    results=OrderedDict()
+    results['meta']=OrderedDict([('python',platform.python_version()),('numpy',np.__version__),('machine',platform.node()),
+                                 ('megapixels',args.megapixels),('seed',args.seed),('repeat',args.repeat),('time',time.time())])
+    results['kernels']=OrderedDict()
+    for name in args.kernels:
+        results['kernels'][name]=runKernel(name,inputs,args.repeat)
+    with open(args.output,'w') as fout:
+        json.dump(results,fout,indent=1)
+    
+    print ' '
+    print '%-20s %10s %10s'%('kernel','min [s]','median [s]')
+    for name,r in results['kernels'].items():
+        print '%-20s %10.4f %10.4f'%(name,r['min'],r['median'])
+    print 'Results written to '+args.output
+    if args.baseline is None: sys.exit(0)
+    
+    with open(args.baseline,'r') as fin:
+        baseline=json.load(fin)
+    if baseline['meta'].get('megapixels')!=args.megapixels or baseline['meta'].get('seed')!=args.seed:
+        print 'WARNING: the baseline was computed with other inputs'
+    print ' '
+    print '%-20s %10s %10s %8s %8s'%('kernel','base [s]','new [s]','ratio','')
+    rows=compare(results,baseline,args.tolerance)
+    for name,old,new,ratio,verdict in rows:
+        print '%-20s %10.4f %10.4f %8.2f %8s'%(name,old,new,ratio,verdict)
+    if 'slower' in [r[4] for r in rows]:
+        print 'FAIL: kernels are slower than the baseline by more than '+str(int(args.tolerance*100))+'%'
+        sys.exit(1)
+    print 'PASS'
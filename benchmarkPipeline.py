@@ -0,0 +1,178 @@
+'''
+benchmarkPipeline.py
+
+Times the full pipeline of main.py on a corpus of synthetic root crowns (see
+syntheticRoots.py) and checks the computed traits against the ground truth of the
+drawn images. The report benchmark.json holds the time of every image, the stage
+durations from its trace and the result of every check.
+
+Example: python benchmarkPipeline.py <output folder> [--megapixels 1 4] [--seeds 0 1 2] [--excised 1]
+         python benchmarkPipeline.py <output folder> --corpus <folder with images and .json ground truth>
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# internal library imports
+'''
+import main
+import Trace
+import syntheticRoots as sr
+import logConfig
+
+'''
+# python standard imports
+'''
+import os
+import csv
+import sys
+import glob
+import json
+import time
+import shutil
+import argparse
+import traceback
+from collections import OrderedDict
+
+'''
+# global defs
+'''
+repoDir=os.path.dirname(os.path.abspath(__file__))
+# trait, ground truth key, relative or absolute tolerance, tolerance
+checks=[('RTP_COUNT','tips','relative',0.3),
+        ('STA_MED','branch angle','absolute',15.),
+        ('DIA_STM','stem diameter px','relative',0.25),
+        ('TD_MED','lateral diameter mm','relative',0.5),
+        ('x pixel','marker diameter px','relative',0.05)]
+
+def readOutput(path):
+    '''
+    last row of output.csv as dictionary
+    '''
+    row=None
+    with open(path,'U') as csvfile:
+        for row in csv.DictReader(csvfile): pass
+    return row
+
+def checkTraits(row,truth):
+    results=[]
+    for trait,key,kind,tol in checks:
+        if key not in truth: continue
+        expected=float(truth[key])
+        try: measured=float(row[trait])
+        except (KeyError,TypeError,ValueError): measured=None
+        if measured is None or measured!=measured: ok=False
+        elif kind=='relative': ok=abs(measured-expected)<=tol*abs(expected)
+        else: ok=abs(measured-expected)<=tol
+        results.append(OrderedDict([('trait',trait),('expected',expected),('measured',measured),('tolerance',kind+' '+str(tol)),('ok',ok)]))
+    return results
+
+def runImage(imgPath,imgID,workDir,traitsFile):
+    '''
+    Runs main.main in this process and returns the report of the image
+    '''
+    truth=sr.readTruth(imgPath)
+    opts=main.optionsFromArgs([imgPath,str(imgID),'1.0',str(truth.get('excised roots',0)),'1','1',str(truth['marker diameter mm']),'0','0','0',workDir,traitsFile])
+    cwd=os.getcwd()
+    start=time.time()
+    try:
+        returnCode=main.main(opts)
+    except:
+        traceback.print_exc()
+        returnCode=1
+    finally:
+        os.chdir(cwd)
+    report=OrderedDict([('image',os.path.basename(imgPath)),('megapixels',truth.get('megapixels')),('seconds',time.time()-start),('return code',returnCode)])
+    trace=Trace.readTrace(os.path.join(workDir,str(imgID),'tmp','trace.json'))
+    if trace is not None:
+        report['stages']=OrderedDict([(s['name'],s['seconds']) for s in trace['spans'] if s['parent'] is None])
+        report['counters']=trace['counters']
+    row=None
+    if returnCode==0:
+        try: row=readOutput(os.path.join(workDir,str(imgID),'output.csv'))
+        except IOError: pass
+    report['checks']=checkTraits(row or {},truth)
+    return report
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description='Times main.py on synthetic root crowns and checks the traits against the ground truth.')
+    parser.add_argument('dir',help='output folder for the corpus, the results and benchmark.json')
+    parser.add_argument('--corpus',default=None,help='use the images of this folder instead of drawing a new corpus')
+    parser.add_argument('--megapixels',type=float,nargs='+',default=[1.],help='image resolutions of the drawn corpus')
+    parser.add_argument('--seeds',type=int,nargs='+',default=[0,1,2],help='one image per seed and resolution')
+    parser.add_argument('--excised',type=int,default=0,help='number of excised roots per image')
+    parser.add_argument('--traits',default=os.path.join(repoDir,'traits.csv'),help='trait file')
+    args=parser.parse_args()
+    logConfig.configure(os.environ.get('DIRT_LOG_LEVEL','WARNING'))
+    outDir=os.path.abspath(args.dir)+'/'
+    if args.corpus is None:
+        images=sr.writeCorpus(outDir+'corpus',args.megapixels,args.seeds,nrExcised=args.excised)
+    else:
+        images=sorted(glob.glob(os.path.join(os.path.abspath(args.corpus),'*.png')))
+    workDir=outDir+'work/'
+    if os.path.exists(workDir): shutil.rmtree(workDir)
+    os.makedirs(workDir)
+    reports=[runImage(p,i,workDir,os.path.abspath(args.traits)) for i,p in enumerate(images)]
+    with open(outDir+'benchmark.json','w') as fout:
+        json.dump(reports,fout,indent=1)
+    failed=0
+    print ' '
+    print '%-32s %6s %10s %8s'%('image','MP','time [s]','checks')
+    for r in reports:
+        passed=len([c for c in r['checks'] if c['ok']])
+        if r['return code']!=0 or passed<len(r['checks']): failed+=1
+        print '%-32s %6s %10.2f %4d/%-3d'%(r['image'],str(r['megapixels']),r['seconds'],passed,len(r['checks']))
+        for c in r['checks']:
+            if c['ok']==False: print '    %s: expected %s, measured %s (%s)'%(c['trait'],c['expected'],c['measured'],c['tolerance'])
+    print ' '
+    print 'Report written to '+outDir+'benchmark.json'
+    if failed>0:
+        print str(failed)+' images FAILED'
+        sys.exit(1)
+    print 'PASS'
@@ -0,0 +1,189 @@
+'''
+benchmarkScaling.py
+
+Scaling study of the pipeline stages. One root image, or a synthetic root crown (see
+syntheticRoots.py), is resampled to a sweep of resolutions and main.py computes every
+size in a fresh process with the memory probe switched on. For every stage the time and
+the peak memory are fitted as power laws of the pixel count, the number of skeleton
+vertices and the number of tips. An exponent of 1 means linear scaling, stages with
+exponents well above 1 are marked as super-linear. The results are written to scaling.json.
+
+Example: python benchmarkScaling.py <output folder> [--image root.jpg --marker 25.4] [--megapixels 1 2 4 8 16 32]
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# external library imports
+'''
+import numpy as np
+from PIL import Image
+
+'''
+# internal library imports
+'''
+import Trace
+import syntheticRoots as sr
+
+'''
+# python standard imports
+'''
+import os
+import sys
+import json
+import shutil
+import argparse
+import subprocess
+from collections import OrderedDict
+
+'''
+# global defs
+'''
+repoDir=os.path.dirname(os.path.abspath(__file__))
+# counters of the trace the stages are fitted against
+measures=[('pixels','pixels'),('skeleton vertices','vertices'),('tips','tips')]
+
+def resample(imgPath,megapixels,outPath):
+    img=Image.open(imgPath).convert('L')
+    w,h=img.size
+    f=np.sqrt(megapixels*1e6/float(w*h))
+    img.resize((max(1,int(w*f)),max(1,int(h*f))),Image.BILINEAR).save(outPath)
+
+def fitExponent(x,y):
+    '''
+    slope of log(y) over log(x), None if there are less than two distinct positive sizes
+    '''
+    pairs=[(a,b) for a,b in zip(x,y) if a is not None and b is not None and a>0 and b>0]
+    if len(set([a for a,_ in pairs]))<2: return None
+    return float(np.polyfit(np.log([a for a,_ in pairs]),np.log([b for _,b in pairs]),1)[0])
+
+def runSize(imgPath,imgID,marker,workDir,traitsFile):
+    '''
+    main.py in a new process, so that the peak memory of one size does not hide the next one
+    '''
+    env=dict(os.environ)
+    env['DIRT_MEMORY_PROBE']='1'
+    args=[sys.executable,os.path.join(repoDir,'main.py'),imgPath,str(imgID),'1.0','0','1','1',str(marker),'0','0','0',workDir,traitsFile]
+    with open(os.path.join(workDir,str(imgID)+'.log'),'w') as log:
+        returnCode=subprocess.call(args,stdout=log,stderr=subprocess.STDOUT,env=env)
+    return returnCode,Trace.readTrace(os.path.join(workDir,str(imgID),'tmp','trace.json'))
+
+def fitStages(runs,superLinear=1.15):
+    '''
+    runs are (megapixels, trace) pairs. Returns the exponents of time and peak memory per stage.
+    '''
+    stages=[]
+    for _,trace in runs:
+        for key in Trace.spanTotals(trace).keys():
+            if key not in stages: stages.append(key)
+    result=OrderedDict()
+    for key in stages:
+        times=[Trace.spanTotals(t).get(key) for _,t in runs]
+        peaks=[Trace.peakMemory(t).get(key) for _,t in runs]
+        fit=OrderedDict()
+        for counter,short in measures:
+            x=[t['counters'].get(counter) for _,t in runs]
+            fit['time/'+short]=fitExponent(x,times)
+            fit['memory/'+short]=fitExponent(x,peaks)
+        fit['super-linear']=fit['time/pixels'] is not None and fit['time/pixels']>superLinear
+        fit['seconds']=times
+        fit['peak rss MB']=peaks
+        result[key]=fit
+    return result
+
+def formatExponent(e):
+    if e is None: return '%8s'%'-'
+    return '%8.2f'%e
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description='Fits the scaling of time and memory of every stage over a resolution sweep.')
+    parser.add_argument('dir',help='output folder for the resampled images, the results and scaling.json')
+    parser.add_argument('--image',default=None,help='root image, default is a synthetic root crown')
+    parser.add_argument('--marker',type=float,default=25.4,help='marker diameter in mm of the root image')
+    parser.add_argument('--megapixels',type=float,nargs='+',default=[1.,2.,4.,8.,16.],help='resolutions of the sweep')
+    parser.add_argument('--seed',type=int,default=0,help='seed of the synthetic root crown')
+    parser.add_argument('--traits',default=os.path.join(repoDir,'traits.csv'),help='trait file')
+    args=parser.parse_args()
+    outDir=os.path.abspath(args.dir)+'/'
+    workDir=outDir+'work/'
+    if os.path.exists(workDir): shutil.rmtree(workDir)
+    os.makedirs(workDir)
+    
+    runs=[]
+    for imgID,mp in enumerate(sorted(args.megapixels)):
+        imgPath=workDir+'scaling_%gMP.png'%mp
+        if args.image is None:
+            arr,truth=sr.drawRootCrown(mp,args.seed)
+            Image.fromarray(arr).save(imgPath)
+            marker=truth['marker diameter mm']
+        else:
+            resample(args.image,mp,imgPath)
+            marker=args.marker
+        print 'computing '+str(mp)+' MP'
+        returnCode,trace=runSize(imgPath,imgID,marker,workDir,os.path.abspath(args.traits))
+        if returnCode!=0 or trace is None:
+            print 'WARNING: '+str(mp)+' MP failed, see '+workDir+str(imgID)+'.log'
+            continue
+        runs.append((mp,trace))
+    if len(runs)<2:
+        print 'At least two sizes have to succeed to fit the scaling'
+        sys.exit(1)
+    
+    fits=fitStages(runs)
+    with open(outDir+'scaling.json','w') as fout:
+        json.dump(OrderedDict([('megapixels',[mp for mp,_ in runs]),('counters',[t['counters'] for _,t in runs]),('stages',fits)]),fout,indent=1)
+    
+    print ' '
+    print 'exponents of the power law fits, time ~ size^e'
+    print '%-40s %8s %8s %8s %8s'%('stage','t/pixels','t/verts','t/tips','m/pixels')
+    for key,fit in fits.items():
+        mark='  super-linear' if fit['super-linear'] else ''
+        print '%-40s %s %s %s %s%s'%(key,formatExponent(fit['time/pixels']),formatExponent(fit['time/vertices']),formatExponent(fit['time/tips']),formatExponent(fit['memory/pixels']),mark)
+    print ' '
+    print 'Report written to '+outDir+'scaling.json'
@@ -0,0 +1,124 @@
+'''
+benchmarkStartup.py
+
+Reports the import time of the external libraries and the DIRT modules, each measured
+in a fresh interpreter, and checks the startup of main.py against the target for runs
+that only compute mask traits. These runs must not load graph_tool, scipy.optimize,
+scipy.interpolate or matplotlib.
+
+Example: python benchmarkStartup.py [--repeat 3] [--target 1.0]
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# python standard imports
+'''
+import os
+import sys
+import argparse
+import subprocess
+
+'''
+# global defs
+'''
+modules=['numpy','scipy','scipy.misc','scipy.ndimage','scipy.interpolate','scipy.optimize','scipy.sparse.csgraph','mahotas','PIL.Image',
+         'graph_tool.all','graphBackend','IO','Masking','Segmentation','Skeleton','Preprocessing','Analysis','RootTipPaths',
+         'DirtOcr','fixImageOrientation','main']
+heavyModules=['graph_tool','scipy.optimize','scipy.interpolate','matplotlib','pylab']
+repoDir=os.path.dirname(os.path.abspath(__file__))
+
+def runPython(code,python=sys.executable):
+    proc=subprocess.Popen([python,'-c',code],stdout=subprocess.PIPE,stderr=subprocess.PIPE,cwd=repoDir)
+    out,err=proc.communicate()
+    if proc.returncode!=0: raise ImportError(err.strip().split('\n')[-1])
+    return out.strip().split('\n')
+
+def importTime(module,repeat=3):
+    '''
+    best of repeat cold imports, every import runs in a new interpreter
+    '''
+    code='import time\nt=time.time()\nimport '+module+'\nprint repr(time.time()-t)'
+    return min([float(runPython(code)[-1]) for _ in range(repeat)])
+
+def startupTime(repeat=3):
+    '''
+    import time of main.py and the heavy modules that it loaded
+    '''
+    code='import time,sys\nt=time.time()\nimport main\nprint repr(time.time()-t)\n'
+    code+='print ",".join([m for m in '+repr(heavyModules)+' if m in sys.modules])'
+    best=None
+    loaded=''
+    for _ in range(repeat):
+        out=runPython(code)
+        if best is None or float(out[-2])<best: best=float(out[-2])
+        loaded=out[-1]
+    return best,[m for m in loaded.split(',') if len(m)>0]
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description='Measures the import time of the DIRT modules.')
+    parser.add_argument('--repeat',type=int,default=3,help='number of measurements per module, the fastest counts')
+    parser.add_argument('--target',type=float,default=1.0,help='startup target in seconds for mask trait runs')
+    args=parser.parse_args()
+    print '%-24s %10s'%('module','import [s]')
+    for module in modules:
+        try: print '%-24s %10.3f'%(module,importTime(module,args.repeat))
+        except ImportError as e: print '%-24s %10s  %s'%(module,'failed',str(e))
+    try: t,loaded=startupTime(args.repeat)
+    except ImportError as e:
+        print 'main.py cannot be imported: '+str(e)
+        sys.exit(1)
+    print ' '
+    print 'main.py startup: %.3fs (target %.3fs)'%(t,args.target)
+    if len(loaded)>0: print 'heavy modules loaded at startup: '+', '.join(loaded)
+    if t<=args.target and len(loaded)==0:
+        print 'PASS'
+    else:
+        print 'FAIL'
+        sys.exit(1)
@@ -0,0 +1,122 @@
+'''
+compareStripLabel.py
+
+Compares stripLabel.label with ndimage.label on random masks. For every mask, strip height
+and connectivity the label images, the number of components and the statistics table
+(area, bounding box, centroid) have to be identical. The exit code is 1 on a difference.
+
+Example: python compareStripLabel.py [--masks 50] [--rows 1 2 3 7 16] [--seed 0]
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# external library imports
+'''
+import numpy as np
+from scipy import ndimage
+
+'''
+# internal library imports
+'''
+import stripLabel
+
+'''
+# standard python imports
+'''
+import sys
+import argparse
+
+def randomMask(rng):
+    '''
+    Random mask of random size and density, every fourth mask is smoothed to get larger components
+    '''
+    h,w=rng.randint(1,120),rng.randint(1,120)
+    if rng.rand()<0.25: return ndimage.gaussian_filter(rng.rand(h,w),2)>0.5
+    return rng.rand(h,w)<rng.uniform(0.2,0.8)
+
+def compare(mask,rows,structure):
+    '''
+    Returns a list of the differences between stripLabel.label and ndimage.label
+    '''
+    ref,n=ndimage.label(mask,structure)
+    lab,nr,stats=stripLabel.label(mask,rows=rows,structure=structure)
+    if nr!=n: return ['number of components '+str(nr)+' instead of '+str(n)]
+    if (np.asarray(lab)!=ref).any(): return ['label image']
+    diff=[]
+    area=np.bincount(ref.ravel(),minlength=n+1)
+    for i in range(n+1):
+        if area[i]==0: continue
+        rr,cc=np.nonzero(ref==i)
+        s=stats[i]
+        if s['area']!=area[i]: diff.append('area of '+str(i))
+        if (s['rowMin'],s['rowMax'],s['colMin'],s['colMax'])!=(rr.min(),rr.max(),cc.min(),cc.max()): diff.append('bounding box of '+str(i))
+        if abs(s['rowMean']-rr.mean())>1e-9 or abs(s['colMean']-cc.mean())>1e-9: diff.append('centroid of '+str(i))
+    return diff
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description='Compares stripLabel.label with ndimage.label on random masks.')
+    parser.add_argument('--masks',type=int,default=50,help='number of random masks')
+    parser.add_argument('--rows',type=int,nargs='+',default=[1,2,3,7,16],help='strip heights in rows')
+    parser.add_argument('--seed',type=int,default=0)
+    args=parser.parse_args()
+    rng=np.random.RandomState(args.seed)
+    failed=0
+    for m in range(args.masks):
+        mask=randomMask(rng)
+        for rows in args.rows:
+            for connectivity in (4,8):
+                structure=ndimage.generate_binary_structure(2,1 if connectivity==4 else 2)
+                diff=compare(mask,rows,structure)
+                if diff:
+                    failed+=1
+                    print 'mask '+str(m)+' '+str(mask.shape)+', '+str(rows)+' rows, '+str(connectivity)+'-connectivity: '+', '.join(diff)
+    print str(args.masks*len(args.rows)*2)+' comparisons, '+str(failed)+' with differences'
+    if failed>0: sys.exit(1)
+    print 'PASS'
@@ -54,8 +54,11 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 
 from PIL import Image, ImageFile
+import logging
 
-__all__ = ['fix_orientation']
+logger=logging.getLogger(__name__)
+
+__all__ = ['fix_orientation', 'get_orientation']
 
 # PIL's Error "Suspension not allowed here" work around:
 # s. http://mail.python.org/pipermail/image-sig/1999-August/000816.html
@@ -77,11 +80,38 @@ ORIENTATIONS = {
     8: ("Rotated 270 degrees", -270)
 }
 
+# Lossless transposes for the rotations above. Image.rotate keeps the size of the
+# image and would cut off the corners of a non-square image rotated by 90 degrees.
+TRANSPOSES = {
+    180: Image.ROTATE_180,
+    -90: Image.ROTATE_270,
+    -270: Image.ROTATE_90
+}
+
+def get_orientation(img):
+    """
+    Returns the rotation in degrees stored in the EXIF data of a jpg or the tags of a tiff
+    Image instance, 0 if there is none. Only the header is read.
+    """
+    try:
+        orientation = img._getexif()[EXIF_ORIENTATION_TAG]
+    except (TypeError, AttributeError, KeyError):
+        try:
+            orientation = img.tag[EXIF_ORIENTATION_TAG]
+            if isinstance(orientation, tuple): orientation = orientation[0]
+        except (TypeError, AttributeError, KeyError, IndexError):
+            logger.debug("Image file has no EXIF data.")
+            orientation = -1
+    if orientation in [3,6,8]:
+        return ORIENTATIONS[orientation][1]
+    return 0
+
 def fix_orientation(img, save_over=False):
     """
     `img` can be an Image instance or a path to an image file.
     `save_over` indicates if the original image file should be replaced by the new image.
     * Note: `save_over` is only valid if `img` is a file path.
+    Without `save_over` the file is not touched and the rotated image is only held in memory.
     """
     path = None
     if not isinstance(img, Image.Image):
@@ -89,15 +119,9 @@ def fix_orientation(img, save_over=False):
         img = Image.open(path)
     elif save_over:
         raise ValueError("You can't use `save_over` when passing an Image instance.  Use a file path instead.")
-    try:
-        orientation = img._getexif()[EXIF_ORIENTATION_TAG]
-    except (TypeError, AttributeError, KeyError):
-        print "WARNING: Image file has no EXIF data."
-        orientation=-1
-        pass
-    if orientation in [3,6,8]:
-        degrees = ORIENTATIONS[orientation][1]
-        img = img.rotate(degrees)
+    degrees = get_orientation(img)
+    if degrees != 0:
+        img = img.transpose(TRANSPOSES[degrees])
         if save_over and path is not None:
             try:
                 img.save(path, quality=100)
@@ -108,4 +132,4 @@ def fix_orientation(img, save_over=False):
                 img.save(path, quality=100)
         return (img, degrees)
     else:
-        return (img, 0)
\ No newline at end of file
+        return (img, 0)
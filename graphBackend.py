@@ -0,0 +1,494 @@
+'''
+graphBackend.py
+
+The skeleton graph of DIRT is used through a small part of the graph_tool interface:
+vertices, edges, property maps, shortest paths and the largest connected component.
+This module provides that part twice, with graph_tool and with a pure numpy/scipy
+implementation (SparseGraph) that keeps the graph in python lists and computes paths and
+components on a CSR adjacency matrix with scipy.sparse.csgraph. Segmentation.py,
+RootTipPaths.py and stageCache.py create and trace their graphs through this module.
+
+The environment variable DIRT_GRAPH_BACKEND selects graph_tool or scipy. The default
+is graph_tool if it is installed and scipy otherwise. Graphs of both backends can exist
+at the same time, the functions dispatch on the type of the graph.
+
+The scipy backend computes the full Dijkstra tree of a source once and answers all
+later paths from the same source with the same weights from its predecessors, so the
+root tip paths of a crown cost a single Dijkstra run.
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# external library imports
+'''
+import numpy as np
+'''
+graph_tool and scipy.sparse.csgraph are imported when a graph is created or traced, because
+importing them takes seconds and runs that only compute mask traits do not need them
+'''
+
+'''
+# internal library imports
+'''
+import Trace
+
+'''
+# standard python imports
+'''
+import os
+import imp
+import pickle
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+backends=['graph_tool','scipy']
+selected=None
+defaults={'object':None,'bool':False,'int':0,'int32_t':0,'int64_t':0,'float':0.,'double':0.}
+
+def hasGraphTool():
+    try:
+        imp.find_module('graph_tool')
+        return True
+    except ImportError:
+        return False
+
+def backend():
+    '''
+    Name of the backend of new graphs, read once from DIRT_GRAPH_BACKEND (graph_tool, scipy or auto)
+    '''
+    global selected
+    if selected is None:
+        name=os.environ.get('DIRT_GRAPH_BACKEND','auto')
+        if name=='auto': name='graph_tool' if hasGraphTool() else 'scipy'
+        setBackend(name)
+    return selected
+
+def setBackend(name):
+    global selected
+    if name not in backends: raise ValueError('unknown graph backend: '+str(name))
+    selected=name
+    logger.debug('graph backend: '+name)
+
+class Vertex(object):
+    '''
+    Vertex descriptor of a SparseGraph, compares equal to its index
+    '''
+    __slots__=('graph','idx')
+    
+    def __init__(self,graph,idx):
+        '''
+        Constructor
+        '''
+        self.graph=graph
+        self.idx=idx
+        
+    def __int__(self):
+        return self.idx
+    
+    __index__=__int__
+    
+    def __eq__(self,other):
+        try: return self.idx==int(other)
+        except TypeError: return False
+        
+    def __ne__(self,other):
+        return self.__eq__(other)==False
+    
+    def __lt__(self,other):
+        return self.idx<int(other)
+    
+    def __le__(self,other):
+        return self.idx<=int(other)
+    
+    def __hash__(self):
+        return hash(self.idx)
+    
+    def __repr__(self):
+        return str(self.idx)
+    
+    def out_neighbours(self):
+        return self.graph.neighbours(self.idx)
+    
+    def out_degree(self):
+        return self.graph.degree(self.idx)
+    
+class Edge(object):
+    '''
+    Edge descriptor of a SparseGraph. The index stays valid in copies of the graph.
+    '''
+    __slots__=('graph','idx')
+    
+    def __init__(self,graph,idx):
+        '''
+        Constructor
+        '''
+        self.graph=graph
+        self.idx=idx
+        
+    def __int__(self):
+        return self.idx
+    
+    def __eq__(self,other):
+        return isinstance(other,Edge) and self.idx==other.idx
+    
+    def __ne__(self,other):
+        return self.__eq__(other)==False
+    
+    def __hash__(self):
+        return hash(self.idx)
+    
+    def __repr__(self):
+        return str(self.graph.endpoints(self.idx))
+    
+    def source(self):
+        return Vertex(self.graph,self.graph.endpoints(self.idx)[0])
+    
+    def target(self):
+        return Vertex(self.graph,self.graph.endpoints(self.idx)[1])
+
+class PropertyMap(object):
+    '''
+    Values of vertices or edges by index. Every write increments the version, so computations
+    that depend on the values (the Dijkstra trees of a weight map) notice changes.
+    '''
+    
+    def __init__(self,valueType='object',values=None):
+        '''
+        Constructor
+        '''
+        self.__type=valueType
+        self.__default=defaults.get(valueType)
+        self.__values={} if values is None else values
+        self.__version=0
+        
+    def __getitem__(self,key):
+        return self.__values.get(int(key),self.__default)
+    
+    def __setitem__(self,key,value):
+        self.__values[int(key)]=value
+        self.__version+=1
+        
+    def getVersion(self):
+        return self.__version
+    
+    def copy(self):
+        '''
+        The values are not copied, as in graph_tool for object properties
+        '''
+        return PropertyMap(self.__type,dict(self.__values))
+    
+    def subset(self,indices):
+        '''
+        Returns a map whose entry i is the entry indices[i] of this map
+        '''
+        values={}
+        for new,old in enumerate(indices):
+            if old in self.__values: values[new]=self.__values[old]
+        return PropertyMap(self.__type,values)
+
+class VertexIndex(object):
+    '''
+    Works as property map (G.vertex_index[v]) and as function (G.vertex_index(v))
+    '''
+    def __getitem__(self,v):
+        return int(v)
+    
+    def __call__(self,v):
+        return int(v)
+
+class SparseGraph(object):
+    '''
+    Undirected graph with the part of the graph_tool interface used by DIRT. Removed edges keep
+    their index, so edge descriptors and edge property maps stay valid across copies.
+    '''
+
+    def __init__(self,directed=False):
+        '''
+        Constructor
+        '''
+        if directed: raise ValueError('the scipy graph backend supports undirected graphs only')
+        self.__sources=[]
+        self.__targets=[]
+        self.__alive=[]
+        self.__adjacency=[]
+        self.__edges=0
+        self.__version=0
+        self.__trees={}
+        self.vertex_properties={}
+        self.edge_properties={}
+        self.vertex_index=VertexIndex()
+        
+    def __getstate__(self):
+        state=self.__dict__.copy()
+        state['_SparseGraph__trees']={}
+        return state
+        
+    def num_vertices(self):
+        return len(self.__adjacency)
+    
+    def num_edges(self):
+        return self.__edges
+    
+    def new_vertex_property(self,valueType):
+        return PropertyMap(valueType)
+    
+    def new_edge_property(self,valueType):
+        return PropertyMap(valueType)
+    
+    def add_vertex(self,n=1):
+        '''
+        Returns the new vertex for n=1 and a list of the new vertices otherwise
+        '''
+        first=len(self.__adjacency)
+        self.__adjacency.extend([] for _ in xrange(n))
+        self.__version+=1
+        if n==1: return Vertex(self,first)
+        return [Vertex(self,i) for i in xrange(first,first+n)]
+    
+    def add_edge(self,source,target):
+        s=int(source)
+        t=int(target)
+        e=len(self.__sources)
+        self.__sources.append(s)
+        self.__targets.append(t)
+        self.__alive.append(True)
+        self.__adjacency[s].append(e)
+        if t!=s: self.__adjacency[t].append(e)
+        self.__edges+=1
+        self.__version+=1
+        return Edge(self,e)
+    
+    def remove_edge(self,edge):
+        e=int(edge)
+        if self.__alive[e]==False: return
+        self.__alive[e]=False
+        self.__adjacency[self.__sources[e]].remove(e)
+        if self.__targets[e]!=self.__sources[e]: self.__adjacency[self.__targets[e]].remove(e)
+        self.__edges-=1
+        self.__version+=1
+        
+    def vertex(self,v):
+        i=int(v)
+        if i<0 or i>=len(self.__adjacency): raise ValueError('invalid vertex index: '+str(i))
+        return Vertex(self,i)
+    
+    def edge(self,source,target):
+        '''
+        Returns an edge between source and target or None
+        '''
+        s=int(source)
+        t=int(target)
+        for e in self.__adjacency[s]:
+            if (self.__sources[e]==s and self.__targets[e]==t) or (self.__sources[e]==t and self.__targets[e]==s):
+                return Edge(self,e)
+        return None
+    
+    def endpoints(self,e):
+        return self.__sources[e],self.__targets[e]
+    
+    def vertices(self):
+        return (Vertex(self,i) for i in xrange(len(self.__adjacency)))
+    
+    def edges(self):
+        return (Edge(self,e) for e in xrange(len(self.__sources)) if self.__alive[e])
+    
+    def neighbours(self,v):
+        for e in self.__adjacency[v]:
+            yield Vertex(self,self.__targets[e] if self.__sources[e]==v else self.__sources[e])
+            
+    def degree(self,v):
+        return len(self.__adjacency[v])
+    
+    def copy(self):
+        G=SparseGraph()
+        G.__sources=list(self.__sources)
+        G.__targets=list(self.__targets)
+        G.__alive=list(self.__alive)
+        G.__adjacency=[list(a) for a in self.__adjacency]
+        G.__edges=self.__edges
+        for name,p in self.vertex_properties.items(): G.vertex_properties[name]=p.copy()
+        for name,p in self.edge_properties.items(): G.edge_properties[name]=p.copy()
+        return G
+    
+    def subgraph(self,vfilt):
+        '''
+        Returns a compact copy of the vertices where vfilt is True and the edges between them
+        '''
+        keep=np.flatnonzero(np.asarray(vfilt,dtype=bool))
+        newIdx=-np.ones(self.num_vertices(),dtype=np.int64)
+        newIdx[keep]=np.arange(len(keep))
+        newIdx=newIdx.tolist()
+        G=SparseGraph()
+        G.add_vertex(len(keep))
+        edges=[]
+        for e in xrange(len(self.__sources)):
+            s=newIdx[self.__sources[e]]
+            t=newIdx[self.__targets[e]]
+            if self.__alive[e] and s>=0 and t>=0:
+                G.add_edge(s,t)
+                edges.append(e)
+        keep=keep.tolist()
+        for name,p in self.vertex_properties.items(): G.vertex_properties[name]=p.subset(keep)
+        for name,p in self.edge_properties.items(): G.edge_properties[name]=p.subset(edges)
+        return G
+    
+    def adjacency(self,weights=None):
+        '''
+        Returns the upper triangle of the weighted adjacency matrix in CSR format and the
+        edge of every entry. Of parallel edges the lightest is kept, as it is the one a
+        shortest path takes.
+        '''
+        from scipy import sparse
+        n=self.num_vertices()
+        edges=np.flatnonzero(np.asarray(self.__alive,dtype=bool))
+        src=np.asarray(self.__sources,dtype=np.int64)[edges]
+        tgt=np.asarray(self.__targets,dtype=np.int64)[edges]
+        if weights is None: w=np.ones(len(edges))
+        else: w=np.array([weights[e] for e in edges.tolist()],dtype=np.float64)
+        lo=np.minimum(src,tgt)
+        hi=np.maximum(src,tgt)
+        order=np.lexsort((w,hi,lo))
+        lo,hi,w,edges=lo[order],hi[order],w[order],edges[order]
+        first=np.ones(len(lo),dtype=bool)
+        first[1:]=(lo[1:]!=lo[:-1])|(hi[1:]!=hi[:-1])
+        first&=lo!=hi
+        lo,hi,w,edges=lo[first],hi[first],w[first],edges[first]
+        return sparse.csr_matrix((w,(lo,hi)),shape=(n,n)),edges
+    
+    def predecessors(self,source,weights=None):
+        '''
+        Returns the predecessors of the Dijkstra tree of source. Trees are kept until the
+        graph or the weights change.
+        '''
+        stamp=(self.__version,None if weights is None else weights.getVersion())
+        key=(source,id(weights))
+        if key in self.__trees and self.__trees[key][0]==stamp: return self.__trees[key][1]
+        from scipy.sparse import csgraph
+        A,_=self.adjacency(weights)
+        Trace.count('dijkstra trees')
+        _,pred=csgraph.dijkstra(A,directed=False,indices=source,return_predecessors=True)
+        pred=pred.tolist()
+        self.__trees[key]=(stamp,pred)
+        return pred
+
+def Graph(directed=False):
+    '''
+    Returns an empty graph of the selected backend
+    '''
+    if backend()=='scipy': return SparseGraph(directed)
+    from graph_tool import Graph as GTGraph
+    return GTGraph(directed=directed)
+
+def shortest_path(G,source,target,weights=None,pred_map=None):
+    '''
+    Returns the vertices and the edges of the shortest path, both empty if target is not reachable
+    '''
+    if isinstance(G,SparseGraph)==False:
+        import graph_tool.topology as gt
+        return gt.shortest_path(G,source,target,weights=weights,pred_map=pred_map)
+    s=int(source)
+    t=int(target)
+    pred=G.predecessors(s,weights)
+    if t!=s and pred[t]<0: return [],[]
+    path=[t]
+    while path[-1]!=s: path.append(pred[path[-1]])
+    path.reverse()
+    return [G.vertex(i) for i in path],[G.edge(a,b) for a,b in zip(path[:-1],path[1:])]
+
+def label_largest_component(G):
+    '''
+    Returns the vertex filter of the largest connected component
+    '''
+    if isinstance(G,SparseGraph)==False:
+        import graph_tool.topology as gt
+        return gt.label_largest_component(G)
+    if G.num_vertices()==0: return np.zeros(0,dtype=bool)
+    from scipy.sparse import csgraph
+    A,_=G.adjacency()
+    _,labels=csgraph.connected_components(A,directed=False)
+    return labels==np.argmax(np.bincount(labels))
+
+def GraphView(G,vfilt):
+    '''
+    graph_tool filters G, the scipy backend returns a compact copy with new vertex indices
+    '''
+    if isinstance(G,SparseGraph): return G.subgraph(vfilt)
+    import graph_tool.topology as gt
+    return gt.GraphView(G,vfilt=vfilt)
+
+def prune(G):
+    '''
+    Returns a compact copy of a graph view
+    '''
+    if isinstance(G,SparseGraph): return G
+    from graph_tool import Graph as GTGraph
+    return GTGraph(G,prune=True)
+
+def extension(G=None):
+    if isinstance(G,SparseGraph) or (G is None and backend()=='scipy'): return '.graph.pkl'
+    return '.gt'
+
+def save(G,path):
+    if isinstance(G,SparseGraph)==False: return G.save(path,fmt='gt')
+    with open(path,'wb') as fout:
+        pickle.dump(G,fout,pickle.HIGHEST_PROTOCOL)
+
+def load(path):
+    '''
+    Loads a graph of the selected backend
+    '''
+    if backend()=='graph_tool':
+        from graph_tool import load_graph
+        return load_graph(path)
+    with open(path,'rb') as fin:
+        return pickle.load(fin)
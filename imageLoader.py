@@ -0,0 +1,178 @@
+'''
+imageLoader.py
+
+Decoding of the root images. Images are decoded straight to 8 bit grey values, jpg
+images can be decoded at a reduced scale with the draft mode of PIL, and uncompressed
+tiff images and raw scans are memory-mapped instead of being read into memory. The
+dimensions of an image are read from its header without decoding the pixels.
+
+A raw scan is a file with the extension .raw that holds 8 bit pixels row by row, next
+to a text file with the same name and the extension .hdr that holds width, height and
+the number of channels (1 or 3, default 1).
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# external library imports
+'''
+import numpy as np
+from PIL import Image
+
+'''
+# internal library imports
+'''
+from fixImageOrientation import get_orientation, TRANSPOSES
+
+'''
+# standard python imports
+'''
+import os
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+rawExtensions=['.raw']
+# rows of a memory-mapped colour image that are converted to grey at once
+bandRows=256
+# np.rot90 turns of the rotations in fixImageOrientation.ORIENTATIONS
+rotations={0:0,180:2,-90:-1,-270:1}
+
+def isRaw(path):
+    return os.path.splitext(path)[1].lower() in rawExtensions
+
+def readRawHeader(path):
+    '''
+    Returns width, height and number of channels of a raw scan
+    '''
+    with open(os.path.splitext(path)[0]+'.hdr','r') as fin:
+        values=[int(i) for i in fin.read().split()]
+    if len(values)==2: values.append(1)
+    return values[0],values[1],values[2]
+
+def dimensions(path):
+    '''
+    Returns width and height. PIL only parses the header when an image is opened, the pixel data is not decoded
+    '''
+    if isRaw(path):
+        w,h,_=readRawHeader(path)
+        return w,h
+    return Image.open(path).size
+
+def rawLayout(img):
+    '''
+    Returns the file offset and the number of channels if the pixels of an opened tiff
+    are stored uncompressed and contiguous, None otherwise
+    '''
+    if img.format!='TIFF' or img.mode not in ['L','RGB']: return None
+    channels=1 if img.mode=='L' else 3
+    w,h=img.size
+    offset=None
+    row=0
+    for codec,box,start,args in img.tile:
+        if codec!='raw' or args[0]!=img.mode or box[0]!=0 or box[2]!=w or box[1]!=row: return None
+        if len(args)>1 and args[1] not in [0,w*channels]: return None
+        if offset is None: offset=start
+        elif start!=offset+row*w*channels: return None
+        row=box[3]
+    if offset is None or row!=h: return None
+    return offset,channels
+
+def memoryMap(path,offset,w,h,channels):
+    '''
+    Copy-on-write, changes of the array never reach the file
+    '''
+    shape=(h,w) if channels==1 else (h,w,channels)
+    return np.memmap(path,dtype=np.uint8,mode='c',offset=offset,shape=shape)
+
+def toGrey(arr):
+    '''
+    ITU-R 601-2 luma as in PIL's convert('L'). A colour image is converted in bands of
+    rows, so a memory-mapped image is never read into memory at once.
+    '''
+    if arr.ndim==2: return arr
+    grey=np.empty(arr.shape[:2],dtype=np.uint8)
+    for r in range(0,arr.shape[0],bandRows):
+        band=arr[r:r+bandRows].astype(np.uint32)
+        grey[r:r+bandRows]=(band[:,:,0]*299+band[:,:,1]*587+band[:,:,2]*114+500)//1000
+    return grey
+
+def subsample(arr,scale):
+    if scale>=1.: return arr
+    step=max(1,int(round(1./scale)))
+    return arr[::step,::step]
+
+def readGrey(path,scale=1.0,orientation=True):
+    '''
+    Returns the image as 8 bit grey values with the EXIF orientation applied.
+    With scale<1 a reduced resolution is returned: jpg images are decoded at the
+    reduced scale by the decoder, memory-mapped images are subsampled.
+    '''
+    if isRaw(path):
+        w,h,channels=readRawHeader(path)
+        return toGrey(subsample(memoryMap(path,0,w,h,channels),scale))
+    img=Image.open(path)
+    degrees=get_orientation(img) if orientation else 0
+    layout=rawLayout(img)
+    if layout is not None:
+        logger.debug('memory-mapping '+path)
+        w,h=img.size
+        arr=toGrey(subsample(memoryMap(path,layout[0],w,h,layout[1]),scale))
+        return np.rot90(arr,rotations[degrees])
+    if scale<1.:
+        w,h=img.size
+        size=(max(1,int(w*scale)),max(1,int(h*scale)))
+        # only jpg supports draft, the decoder picks the next power of two above size
+        img.draft('L',size)
+        if img.size!=size: img=img.convert('L').resize(size,Image.BILINEAR)
+    img=img.convert('L')
+    if degrees!=0: img=img.transpose(TRANSPOSES[degrees])
+    return np.array(img)
@@ -0,0 +1,79 @@
+'''
+logConfig.py
+
+Configuration of the log output of all DIRT modules. The level is taken from the
+environment variable DIRT_LOG_LEVEL (DEBUG, INFO, WARNING or ERROR, default INFO),
+so that main.py processes started by runOnFolder.py use the level of the batch run.
+Debug messages of the pixel loops are only formatted if the level is DEBUG.
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# standard python imports
+'''
+import os
+import sys
+import logging
+
+'''
+# global defs
+'''
+logFormat='%(asctime)s %(process)d %(levelname)s %(name)s: %(message)s'
+
+def configure(level=None):
+    if level is None: level=os.environ.get('DIRT_LOG_LEVEL','INFO')
+    numeric=getattr(logging,str(level).upper(),None)
+    if isinstance(numeric,int)==False: numeric=logging.INFO
+    root=logging.getLogger()
+    for h in list(root.handlers): root.removeHandler(h)
+    handler=logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(logFormat))
+    root.addHandler(handler)
+    root.setLevel(numeric)
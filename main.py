@@ -12,7 +12,7 @@ The software is written in:
 - python 2.7 (https://www.python.org)
 
 The software depends on:
-- the graphtools package (http://graph-tool.skewed.de) 
+- the graphtools package (http://graph-tool.skewed.de), optional (see graphBackend.py)
 - the mahotas package (http://luispedro.org/software/mahotas)
 - the numpy package (http://sourceforge.net/projects/numpy/)
 - the scipy package (http://www.scipy.org/SciPy)
@@ -95,7 +95,13 @@ import Preprocessing
 import Skeleton
 import Analysis
 import RootTipPaths
-from fixImageOrientation import *
+import Trace
+import profiler
+import memoryProbe
+import logConfig
+import imageLoader
+import stageCache
+import DirtOcr as ocr
 
 '''
 # standard python imports
@@ -105,13 +111,18 @@ import pickle
 import csv
 import sys
 import time
+import signal
 from collections import OrderedDict
+import logging
 
 '''
 #global defs
 '''
+logger=logging.getLogger(__name__)
 allCrown=[]
 allPara=[]
+# crops of the segmentation in this run, None if the segmentation was skipped
+allCrops=None
 f=[]
 imgID=None
 io=IO.IO()
@@ -128,7 +139,7 @@ def init(fpath,io):
     if os.path.exists(fpath)==False: 
         os.mkdir(fpath)
     os.chdir(fpath)
-    print os.getcwd()
+    logger.debug(os.getcwd())
     io.setServerPath(os.getcwd())
     if os.path.exists('./tmp/') == False:
         os.mkdir('./tmp/')
@@ -174,28 +185,26 @@ def readTraits(myFilePath='./traits.csv'):
                 try:
                     traitDict[row[0]]=bool(int(row[1]))
                 except:
-                    print 'invalid entry in trait file: '+ str(row)
+                    logger.warning('invalid entry in trait file: '+ str(row))
                     pass
     
     return 
     
+def optionsFromArgs(args):
+    '''
+    args are the 12 command line arguments of main.py (see printHeader)
+    '''
+    opt=[]
+    opt.append([0,os.path.dirname(args[0])+'/'])
+    opt.append([0,os.path.basename(args[0])])
+    for i in args[1:]:
+        opt.append([0,i])
+    return opt
+
 def readOptions():
     global options
     if len(sys.argv)==13:
-        options.append([0,os.path.dirname(sys.argv[1])+'/'])
-        options.append([0,os.path.basename(sys.argv[1])])
-        options.append([0,sys.argv[2]])
-        options.append([0,sys.argv[3]])
-        options.append([0,sys.argv[4]])
-        options.append([0,sys.argv[5]])
-        options.append([0,sys.argv[6]])
-        options.append([0,sys.argv[7]])
-        options.append([0,sys.argv[8]])
-        options.append([0,sys.argv[9]])
-        options.append([0,sys.argv[10]])
-        options.append([0,sys.argv[11]])
-        options.append([0,sys.argv[12]])
-
+        options.extend(optionsFromArgs(sys.argv[1:]))
     else:
         with open('./options.csv','U') as csvfile: 
             filedata= csv.reader(csvfile)
@@ -207,35 +216,65 @@ def readOptions():
 
 def ifAnyKeyIsTrue(listOfKeys):
     for i in listOfKeys:
-        if traitDict[i]==True:
+        if traitDict.get(i)==True:
             return True
     return False
 
-def threadSegmentation(filepath,imgFile,imgID,maxExRoot,rootCrown,marker):
+def medialAxis(cache,imgL):
+    '''
+    Medial axis and distance map of the labelled crop, spurs are pruned if DIRT_SPUR_PRUNING is set (see Skeleton.pruneSpurs)
+    '''
+    skelImg,dia=stageCache.medialAxis(cache,Skeleton.Skeleton(imgL),imgL)
+    factor=Skeleton.spurFactor()
+    if factor>0:
+        with Trace.span('spur pruning'):
+            skelImg,_,_=Skeleton.pruneSpurs(skelImg,dia,factor)
+    return skelImg,dia
+
+def readImage(imgPath):
+    '''
+    Decodes the image once to 8 bit grey values and fixes the orientation of tiff and jpg
+    files in memory, the image file itself is not changed.
+    '''
+    return imageLoader.readGrey(imgPath)
+
+def traceFile():
+    return os.path.join(os.path.dirname(io.getStageFile()),'trace.json')
+
+def threadSegmentation(filepath,imgFile,imgID,maxExRoot,rootCrown,marker,img=None):
     
     global io
     global scale
     global stemCorrection
+    global allCrops
     
+    allCrops=[]
     stemCorrection=bool(int(options[8][1]))
     io.setFileName(imgFile)
     io.setidIdx(imgID)
-    prep=Preprocessing.Preprocessing(io)
-    print 'segmenting file: '+imgFile +'\n'
-
-    if os.path.isfile(options[0][1]+imgFile):
-        # fix orientation of the image in tiff and Jpg files
-        fix_orientation(options[0][1]+imgFile, save_over=True)
-        img= scipy.misc.imread(options[0][1]+imgFile,flatten=True)
+    prep=Preprocessing.Preprocessing(io,saveCrops=io.writes('crop'))
+    logger.info('segmenting file: '+imgFile +'\n')
+
+    if img is not None:
+        logger.info('using prefetched image')
+    elif os.path.isfile(options[0][1]+imgFile):
+        io.startStage('decode')
+        img=readImage(options[0][1]+imgFile)
             
     else:
-        print 'Image not readable'
+        logger.error('Image not readable')
         img=[]
 
     if len(img)>0: 
+        Trace.count('pixels',img.size)
         currT=time.time()       
         Failed,tagExtract,circleRatio, circleWidth, circleHeight = prep.prepocess(img,rootCrown,scale=float(options[3][1]),nrExRoot=maxExRoot,marker=marker,stemCorrection=stemCorrection)
-        print 'Segmentation finished in '+str(time.time()-currT)+'s'
+        logger.info('Segmentation finished in '+str(time.time()-currT)+'s')
+        allCrops=prep.getCrops()
+        # the tag was read while the root was extracted
+        with Trace.span('tag recognition'):
+            tagExtract=ocr.waitForTag(tagExtract)
+        logger.info('Tag: '+str(tagExtract))
         if Failed == False:
             xScale=scale/float(circleWidth)
             yScale=scale/float(circleHeight)
@@ -258,6 +297,16 @@ def threadSegmentation(filepath,imgFile,imgID,maxExRoot,rootCrown,marker):
                     allPara.append(para)
             else: allPara.append(para)
 
+def loadCrops(folder):
+    '''
+    Returns (path, image) pairs of the crops in the Crown or Lateral folder. The crops of a segmentation
+    in this run are handed over in memory, otherwise (segmentation switch 0) the image is None and has
+    to be read from the path.
+    '''
+    if allCrops is not None:
+        return [(io.getHomePath()+'/'+name,img) for (f,name,img) in allCrops if f==folder]
+    return [(i,None) for i in io.scanDir()]
+
 def threadCrown(filepath):
     global io
     
@@ -265,80 +314,103 @@ def threadCrown(filepath):
     crownT=OrderedDict()
     imgL=[]
     stemCorrection=bool(int(options[8][1]))
+    cache=stageCache.fromEnvironment()
     
-    print io.getHomePath()
+    logger.debug(io.getHomePath())
     oldHome=io.getHomePath()
     os.chdir(io.getHomePath())
     io.setHomePath('./Crown/')
-    f=io.scanDir()
-    for (counter,i) in enumerate(f):
+    f=loadCrops('Crown')
+    for (counter,(i,img)) in enumerate(f):
         io.setFileName(os.path.basename(i))
         io.setidIdx(imgID)
         
-        print 'processing Crown file: '+i
+        logger.info('processing Crown file: '+i)
         xScale=allPara[counter][7]
         yScale=allPara[counter][8]
         analysis=Analysis.Analysis(io,(xScale+yScale)/2)
         rtp=RootTipPaths.RootTipPaths(io)
         
         
-        try:
-            img=scipy.misc.imread(i,flatten=True)
-        except:
-            print 'Image not readable'
-            img=-1
+        io.startStage('crown labelling')
+        if img is None:
+            try:
+                img=imageLoader.readGrey(i)
+            except:
+                logger.error('Image not readable')
+                img=[]
             
         if len(img)>0:
+            Trace.count('crown pixels',img.size)
             seg=Segmentation.Segmentation(img,io)
             imgL=seg.label()
-            print 'compute root profile'
+            logger.debug('compute root profile')
             currT=time.time()
+            io.startStage('mask traits')
             if ifAnyKeyIsTrue(['AVG_DENSITY','WIDTH_MED','WIDTH_MAX','DIA_STM_SIMPLE','D10','D20','D30','D40','D50','D60','D70','D80','D90','DS10','DS20','DS30','DS40','DS50','DS60','DS70','DS80','DS90','AREA','ANG_TOP','ANG_BTM']):
                 crownT['AVG_DENSITY'],crownT['WIDTH_MED'],crownT['WIDTH_MAX'],crownT['D10'],crownT['D20'],crownT['D30'],crownT['D40'],crownT['D50'],crownT['D60'],crownT['D70'],crownT['D80'],crownT['D90'],crownT['DS10'],crownT['DS20'],crownT['DS30'],crownT['DS40'],crownT['DS50'],crownT['DS60'],crownT['DS70'],crownT['DS80'],crownT['DS90'],crownT['AREA'],crownT['DIA_STM_SIMPLE'],crownT['ANG_TOP'],crownT['ANG_BTM']=analysis.getWidthOverHeight(imgL,xScale,yScale)
-                print 'Mask traits computed '+str(time.time()-currT)+'s'
+                logger.info('Mask traits computed '+str(time.time()-currT)+'s')
             
+            testSkel=None
             if ifAnyKeyIsTrue(['DIA_STM','TD_MED','TD_AVG','STA_RANGE','STA_DOM_I','STA_DOM_II','STA_25_I','STA_25_II','STA_50_I','STA_50_II','STA_75_I','STA_75_II','STA_90_I','STA_90_II','RTA_DOM_I','RTA_DOM_II','STA_MIN','STA_MAX','STA_MED','RTA_RANGE','RTA_MIN','RTA_MAX','RTA_MED','NR_RTP_SEG_I','NR_RTP_SEG_II','ADVT_COUNT','BASAL_COUNT','ADVT_ANG','BASAL_ANG','HYP_DIA','TAP_DIA','MAX_DIA_90','DROP_50','CP_DIA25','CP_DIA50','CP_DIA75','CP_DIA90','SKL_DEPTH','SKL_WIDTH']):
                 currT=time.time()
-                skel=Skeleton.Skeleton(imgL)
-                testSkel,testDia=skel.skel(imgL)
-                print 'Medial axis computed '+str(time.time()-currT)+'s'
+                io.startStage('medial axis')
+                testSkel,testDia=medialAxis(cache,imgL)
+                logger.info('Medial axis computed '+str(time.time()-currT)+'s')
                 currT=time.time()
-                path,skelGraph,crownT['DIA_STM'],skelSize=seg.findThickestPath(testSkel,testDia,xScale,yScale)
+                io.startStage('central path')
+                path,skelGraph,crownT['DIA_STM'],skelSize,graphKey=stageCache.thickestPath(cache,seg,testSkel,testDia,xScale,yScale)
                 allPara[counter][10]=skelSize
-                print 'Central path computed '+str(time.time()-currT)+'s'
+                logger.info('Central path computed '+str(time.time()-currT)+'s')
                 
             if ifAnyKeyIsTrue(['TD_MED','TD_AVG','STA_RANGE','STA_DOM_I','STA_DOM_II','STA_25_I','STA_25_II','STA_50_I','STA_50_II','STA_75_I','STA_75_II','STA_90_I','STA_90_II','RTA_DOM_I','RTA_DOM_II','STA_MIN','STA_MAX','STA_MED','RTA_RANGE','RTA_MIN','RTA_MAX','RTA_MED','NR_RTP_SEG_I','NR_RTP_SEG_II','ADVT_COUNT','BASAL_COUNT','ADVT_ANG','BASAL_ANG','HYP_DIA','TAP_DIA','MAX_DIA_90','DROP_50','CP_DIA25','CP_DIA50','CP_DIA75','CP_DIA90','SKL_DEPTH','SKL_WIDTH','RTP_COUNT']):
-                print 'Compute RTP skeleton'
+                logger.debug('Compute RTP skeleton')
                 currT=time.time()
-                rtpSkel,crownT['RTP_COUNT'], crownT['TD_MED'],crownT['TD_AVG'],crownT['MAX_DIA_90'], rtps, tips, crownT['SKL_WIDTH'], crownT['SKL_DEPTH'] =rtp.getRTPSkeleton(path,skelGraph,True)
+                io.startStage('RTP')
+                rtpSkel,crownT['RTP_COUNT'], crownT['TD_MED'],crownT['TD_AVG'],crownT['MAX_DIA_90'], rtps, tips, crownT['SKL_WIDTH'], crownT['SKL_DEPTH'] =stageCache.rtpSkeleton(cache,graphKey,rtp,path,skelGraph)
                 seg.setTips(tips)
-                print 'RTP Skeleton computed '+str(time.time()-currT)+'s'
+                logger.info('RTP Skeleton computed '+str(time.time()-currT)+'s')
+            
+            # tip statistics of the skeleton pixel classes, they differ from the graph values (see RootTipPaths.getTipsOfSkeleton)
+            if ifAnyKeyIsTrue(['TD_MED_LUT','TD_AVG_LUT','MAX_DIA_90_LUT','SKL_DEPTH_LUT','SKL_WIDTH_LUT']):
+                currT=time.time()
+                if testSkel is None:
+                    io.startStage('medial axis')
+                    testSkel,testDia=medialAxis(cache,imgL)
+                io.startStage('skeleton tips')
+                rtp.getTipsOfSkeleton(testSkel,testDia,xScale,yScale)
+                crownT['TD_MED_LUT'],crownT['TD_AVG_LUT'],crownT['MAX_DIA_90_LUT'],crownT['SKL_WIDTH_LUT'],crownT['SKL_DEPTH_LUT']=rtp.getTipStatistics()
+                logger.info('Skeleton tip statistics computed '+str(time.time()-currT)+'s')
             
             allPara[len(allPara)-1][2]=seg.getFail()
             
             
             if ifAnyKeyIsTrue(['RDISTR_X','RDISTR_Y']):
-                print 'Compute spatial root distribution'
+                logger.debug('Compute spatial root distribution')
                 currT=time.time()
+                io.startStage('symmetry')
                 crownT['RDISTR_X'],crownT['RDISTR_Y']=analysis.getSymmetry(rtps,rtpSkel)
-                print 'Symmetry computed '+str(time.time()-currT)+'s'
+                logger.info('Symmetry computed '+str(time.time()-currT)+'s')
             
             if rtpSkel!=-1:
                 if ifAnyKeyIsTrue(['NR_RTP_SEG_I','NR_RTP_SEG_II','ADVT_COUNT','BASAL_COUNT','ADVT_ANG','BASAL_ANG','HYP_DIA','TAP_DIA']):
-                    print 'searching for hypocotyl'
+                    logger.debug('searching for hypocotyl')
                     currT=time.time()
+                    io.startStage('root classes')
                     branchRad,nrPaths=seg.findHypocotylCluster(path,rtpSkel)
-                    print 'hypocotyl computed '+str(time.time()-currT)+'s'
-                    print 'starting kmeans'
+                    logger.info('hypocotyl computed '+str(time.time()-currT)+'s')
+                    logger.debug('starting kmeans')
                     try:
                         currT=time.time()
-                        c1x,c1y,c2x,c2y = analysis.plotDiaRadius(nrPaths, branchRad,path,2)
+                        with Trace.span('clustering'):
+                            c1x,c1y,c2x,c2y = analysis.plotDiaRadius(nrPaths, branchRad,path,2)
     
-                        print '2 clusters computed in '+str(time.time()-currT)+'s'
+                        logger.info('2 clusters computed in '+str(time.time()-currT)+'s')
     
                         currT=time.time()
-                        segImg=seg.makeSegmentationPicture(path,rtpSkel,img,xScale,yScale,c1x,c1y,c2x,c2y)
-                        scipy.misc.imsave(io.getHomePath()+'/Result/' +io.getFileName()+ 'Seg2.png', segImg)
+                        if io.writes('picture'):
+                            segImg=seg.makeSegmentationPicture(path,rtpSkel,img,xScale,yScale,c1x,c1y,c2x,c2y)
+                            io.saveImage(segImg,io.getHomePath()+'/Result/' +io.getFileName()+ 'Seg2.png','picture')
                         crownT['ADVT_COUNT'],crownT['BASAL_COUNT'],crownT['NR_RTP_SEG_I'],crownT['NR_RTP_SEG_II'], crownT['HYP_DIA'], crownT['TAP_DIA'] =analysis.countRootsPerSegment(c1y,c2y,c1x,c2x)
                     except:
                         c1x=None
@@ -347,117 +419,120 @@ def threadCrown(filepath):
                         c2y=None
                         pass
                     crownT['DROP_50']=analysis.RTPsOverDepth(path,rtpSkel)
-                    print 'count roots per segment'
-                    print 'Root classes computed in '+str(time.time()-currT)+'s'
+                    logger.debug('count roots per segment')
+                    logger.info('Root classes computed in '+str(time.time()-currT)+'s')
                 
                 if ifAnyKeyIsTrue(['ADVT_ANG','BASAL_ANG','STA_RANGE','STA_DOM_I','STA_DOM_II','STA_25_I','STA_25_II','STA_50_I','STA_50_II','STA_75_I','STA_75_II','STA_90_I','STA_90_II','RTA_DOM_I','RTA_DOM_II','STA_MIN','STA_MAX','STA_MED','RTA_RANGE','RTA_MIN','RTA_MAX','RTA_MED']):
                     currT=time.time()
+                    io.startStage('laterals')
                     lat,corrBranchpts=seg.findLaterals(rtps, rtpSkel,(xScale+yScale)/2, None)
-                    print 'seg.findLaterals computed in '+str(time.time()-currT)+'s'
-                    print 'Compute angles at 2cm'
+                    logger.info('seg.findLaterals computed in '+str(time.time()-currT)+'s')
+                    io.startStage('angles')
+                    logger.debug('Compute angles at 2cm')
                     currT=time.time()
                     if c1x!=None and c1y!=None and c2x!=None and c2y!=None: crownT['ADVT_ANG'],crownT['BASAL_ANG']=analysis.anglesPerClusterAtDist(c1y, c2y, rtpSkel, path, lat, corrBranchpts, (xScale+yScale)/2, dist=20)
                     else: 
                         crownT['ADVT_ANG']='nan'
                         crownT['BASAL_NG']='nan'
-                    print 'angles at 2cm computed in '+str(time.time()-currT)+'s'
+                    logger.info('angles at 2cm computed in '+str(time.time()-currT)+'s')
                     
                     if ifAnyKeyIsTrue(['STA_25_I','STA_25_II','STA_50_I','STA_50_II','STA_75_I','STA_75_II','STA_90_I','STA_90_II']):    
                         try:
-                            print 'compute quantile angles'
+                            logger.debug('compute quantile angles')
                             currT=time.time()
                             a25,a50,a75,a90=analysis.calculateAngleQuantiles(path,lat,corrBranchpts,rtpSkel)
-                            print 'angles computed in '+str(time.time()-currT)+'s'
+                            logger.info('angles computed in '+str(time.time()-currT)+'s')
                         except:
                             a25=['nan']
                             a50=['nan']
                             a75=['nan']
                             a90=['nan']
-                            print 'ERROR: No quantile angles calculated'
+                            logger.error('No quantile angles calculated')
                     
                     if ifAnyKeyIsTrue(['RTA_RANGE','RTA_MIN','RTA_MAX','RTA_MED']):
                         try:
-                            print 'compute angles'
+                            logger.debug('compute angles')
                             currT=time.time()
                             crownT['RTA_MED'],crownT['RTA_MIN'],crownT['RTA_MAX'],crownT['RTA_RANGE'],anglesN=analysis.calculateAngles(path,lat,corrBranchpts,rtpSkel)
-                            print 'RTA angle characteristics computed in '+str(time.time()-currT)+'s'
+                            logger.info('RTA angle characteristics computed in '+str(time.time()-currT)+'s')
                         except:
-                            print 'ERROR: No RTA angles calculated'
+                            logger.error('No RTA angles calculated')
                         
                     if ifAnyKeyIsTrue(['STA_RANGE','STA_MIN','STA_MAX','STA_MED']):    
                         try:
-                            print 'compute STA angles'
+                            logger.debug('compute STA angles')
                             currT=time.time()
                             crownT['STA_RANGE'],crownT['STA_MED'],crownT['STA_MIN'],crownT['STA_MAX'],angles=analysis.getLateralAngles(path,lat,corrBranchpts,rtpSkel)
-                            print 'STA angles characteristics computed in '+str(time.time()-currT)+'s'
+                            logger.info('STA angles characteristics computed in '+str(time.time()-currT)+'s')
                         except:
-                            print 'ERROR: No STA angles calculated'
+                            logger.error('No STA angles calculated')
                             
                     if ifAnyKeyIsTrue(['CP_DIA25','CP_DIA50','CP_DIA75','CP_DIA90']): 
                         try:
-                            print 'compute diameter quantils'
+                            logger.debug('compute diameter quantils')
                             currT=time.time()
                             crownT['CP_DIA25'],crownT['CP_DIA50'],crownT['CP_DIA75'],crownT['CP_DIA90']=analysis.getDiameterQuantilesAlongSinglePath(path,rtpSkel)
-                            print 'Tap diameters computed in '+str(time.time()-currT)+'s'
+                            logger.info('Tap diameters computed in '+str(time.time()-currT)+'s')
                         except:
-                            print 'ERROR: No quantile diameters calculated'
+                            logger.error('No quantile diameters calculated')
     
                     if ifAnyKeyIsTrue(['STA_DOM_I','STA_DOM_II']):
                         try:
-                            print 'compute STA dominant angles'
+                            logger.debug('compute STA dominant angles')
                             currT=time.time()
                             crownT['STA_DOM_I'],crownT['STA_DOM_II']=analysis.findHistoPeaks(angles)
-                            print 'STA dominant angles computed in '+str(time.time()-currT)+'s'
+                            logger.info('STA dominant angles computed in '+str(time.time()-currT)+'s')
                         except:
-                            print 'ERROR: No dominant angles calculated (STA)'
+                            logger.error('No dominant angles calculated (STA)')
                     
                     if ifAnyKeyIsTrue(['STA_25_I','STA_25_II']): 
                         try:
                             currT=time.time() 
                             crownT['STA_25_I'],crownT['STA_25_II']=analysis.findHistoPeaks(a25)
-                            print 'STA 25 angles computed in '+str(time.time()-currT)+'s'
+                            logger.info('STA 25 angles computed in '+str(time.time()-currT)+'s')
                         except:
-                            print 'ERROR: No dominant angles25 calculated'
+                            logger.error('No dominant angles25 calculated')
                     
                     if ifAnyKeyIsTrue(['STA_50_I','STA_50_II']): 
                         try:
                             currT=time.time()
                             crownT['STA_50_I'],crownT['STA_50_II']=analysis.findHistoPeaks(a50)
-                            print 'STA 50 angles computed in '+str(time.time()-currT)+'s'
+                            logger.info('STA 50 angles computed in '+str(time.time()-currT)+'s')
                         except:
-                            print 'ERROR: No dominant angles50 calculated'
+                            logger.error('No dominant angles50 calculated')
                     
                     if ifAnyKeyIsTrue(['STA_75_I','STA_75_II']): 
                         try:
                             currT=time.time()     
                             crownT['STA_75_I'],crownT['STA_75_II']=analysis.findHistoPeaks(a75)
-                            print 'STA 75 angles computed in '+str(time.time()-currT)+'s'
+                            logger.info('STA 75 angles computed in '+str(time.time()-currT)+'s')
                         except:
-                            print 'ERROR: No dominant angles75 calculated'
+                            logger.error('No dominant angles75 calculated')
                     
                     if ifAnyKeyIsTrue(['STA_90_I','STA_90_II']): 
                         try:
                             currT=time.time()    
                             crownT['STA_90_I'],crownT['STA_90_II']=analysis.findHistoPeaks(a90)
-                            print 'STA 90 angles computed in '+str(time.time()-currT)+'s'
+                            logger.info('STA 90 angles computed in '+str(time.time()-currT)+'s')
                         except: 
-                            print 'ERROR: No dominant angles90 calculated'
+                            logger.error('No dominant angles90 calculated')
                     
                     if ifAnyKeyIsTrue(['RTA_DOM_I','RTA_DOM_II']):    
                         try:   
                             currT=time.time() 
                             crownT['RTA_DOM_I'],crownT['RTA_DOM_II']=analysis.findHistoPeaks(anglesN)
-                            print 'angles computed in '+str(time.time()-currT)+'s'
+                            logger.info('angles computed in '+str(time.time()-currT)+'s')
                         except: 
-                            print 'ERROR: No dominant RTA angles calculated'
+                            logger.error('No dominant RTA angles calculated')
     io.setHomePath(oldHome)            
     if maxExRoot >= 1:
         rtpSkel=-1
         os.chdir(io.getHomePath())
         io.setHomePath('./Lateral/')
-        f=io.scanDir()
-        for (counter,i) in enumerate(f):
-            print 'processing lateral file: '+i
+        f=loadCrops('Lateral')
+        for (counter,(i,img)) in enumerate(f):
+            logger.info('processing lateral file: '+i)
+            io.startStage('excised root analysis')
             
             if maxExRoot>0:
                 xScale=allPara[counter/maxExRoot][7]
@@ -474,20 +549,19 @@ def threadCrown(filepath):
             analysis=Analysis.Analysis(io,(xScale+yScale)/2)
             
             
-            try:
-                img=scipy.misc.imread(i,flatten=True)
-            except:
-                print 'Image not readable'
-                img=[]
-                pass
+            if img is None:
+                try:
+                    img=imageLoader.readGrey(i)
+                except:
+                    logger.error('Image not readable')
+                    img=[]
             if len(img)>0:
     
                 seg=Segmentation.Segmentation(img,io=io)
                 imgL=seg.label()
     
                 if imgL!=None:
-                    skel=Skeleton.Skeleton(imgL)
-                    testSkel,testDia=skel.skel(imgL)
+                    testSkel,testDia=medialAxis(None,imgL)
                     path,skelGraph=seg.findThickestPathLateral(testSkel,testDia,xScale,yScale)
                     if ifAnyKeyIsTrue(['LT_AVG_LEN','NODAL_LEN','LT_BRA_FRQ','NODAL_AVG_DIA','LT_AVG_ANG','LT_ANG_RANGE','LT_MIN_ANG','LT_MAX_ANG','LT_DIST_FIRST','LT_MED_DIA','LT_AVG_DIA']):
                         rtpSkel,_,crownT['LT_MED_DIA'],crownT['LT_AVG_DIA'],_,rtps,_,_,_=rtp.getRTPSkeleton(path,skelGraph,True)
@@ -510,8 +584,8 @@ def threadCrown(filepath):
     io.setHomePath(oldHome)     
     #os.chdir('../')
    
-def printHeader():
-    if os.path.exists('./options.csv')==False and len(sys.argv)!=13:
+def printHeader(checkUsage=True):
+    if checkUsage and os.path.exists('./options.csv')==False and len(sys.argv)!=13:
         print '------------------------------------------------------------' 
         print 'DIRT 1.1 - An automatic highthroughput root phenotyping platform'
         print '(c) 2014 Alexander Bucksch - bucksch@uga.edu'
@@ -540,32 +614,62 @@ def printHeader():
         
         sys.exit()
     else:
-        print '------------------------------------------------------------' 
-        print 'DIRT 1.1 - An automatic highthroughput root phenotyping platform'
-        print '(c) 2014 Alexander Bucksch - bucksch@uga.edu'
-        print 'Web application by Abhiram Das - abhiram.das@gmail.com'
-        print ' '
-        print 'http://dirt.iplantcollaborative.org'
-        print ' '
-        print 'University of Georgia'
-        print '------------------------------------------------------------'
-        print ' '
-        print 'Initializing folder structure'  
+        logger.info('------------------------------------------------------------')
+        logger.info('DIRT 1.1 - An automatic highthroughput root phenotyping platform')
+        logger.info('(c) 2014 Alexander Bucksch - bucksch@uga.edu')
+        logger.info('Web application by Abhiram Das - abhiram.das@gmail.com')
+        logger.info(' ')
+        logger.info('http://dirt.iplantcollaborative.org')
+        logger.info(' ')
+        logger.info('University of Georgia')
+        logger.info('------------------------------------------------------------')
+        logger.info(' ')
+        logger.info('Initializing folder structure')
        
-def main(opt=None): 
+def main(opt=None,img=None,writer=None): 
+    '''
+    opt: options as returned by readOptions, img: an already decoded image,
+    writer: an IO.ArtifactWriter shared by several images, by default every image
+    has its own writer, which is flushed also if the image fails
+    
+    The trace of the image is written to tmp/trace.json of the image folder. Outputs
+    that could not be written are listed as errors in the trace.
+    The environment variable DIRT_PROFILE selects a profiler (see profiler.py),
+    DIRT_MEMORY_PROBE records the memory use of every stage (see memoryProbe.py),
+    DIRT_ARTIFACTS and DIRT_COMPRESSION select the outputs besides output.csv (see IO.py),
+    DIRT_STAGE_CACHE is the folder of the cached crown intermediates (see stageCache.py).
+    '''
     
+    if writer is not None: return analyse(opt,img,writer)
+    writer=IO.ArtifactWriter()
+    try:
+        return analyse(opt,img,writer)
+    finally:
+        # the trace is written once the outputs are on disk, so it counts all written bytes
+        writer.close()
+        io.setProfiler(None)
+        if io.getStageFile() is not None: Trace.current().write(traceFile())
+
+def analyse(opt,img,writer):
+    '''
+    Segmentation and analysis of one image, see main
+    '''
     global io
     global ID
     global scale 
     global allPara
     global allLat
     global allCrown
+    global allCrops
     global options
     global maxExRoot
     
-    printHeader()
+    printHeader(opt is None)
     
     allStart=time.time()
+    allPara=[]
+    allCrown=[]
+    allCrops=None
     
     if opt is None:
         options = readOptions()  
@@ -578,41 +682,58 @@ def main(opt=None):
     rootCrown=int(options[5][1])
     maxExRoot=int(options[4][1])
     io.__init__(options[0][1],ID=ID,plots=bool(int(options[9][1])))
+    io.setArtifacts(*IO.artifactsFromEnvironment())
+    io.setWriter(writer)
     init(options[11][1]+str(ID)+'/',io)
+    io.setStageFile(os.path.abspath(io.getHomePath()+'/tmp/stages.csv'))
+    trace=Trace.Trace(options[1][1],ID,memoryProbe.fromEnvironment())
+    Trace.setCurrent(trace)
+    io.setProfiler(profiler.fromEnvironment(io.getHomePath()))
     
     #Run analysis
     if int(options[6][1]) == 0:
         io.setHomePath(options[11][1]+str(ID)+'/')
-        print os.getcwd()
+        logger.debug(os.getcwd())
         infile=open(io.getHomePath()+'/tmp/para.sav','rb')
         allPara=pickle.load(infile)
         infile.close()
-        print 'Saved parameters loaded'
+        logger.info('Saved parameters loaded')
         infile.close()
         
     elif int(options[6][1]) == 1:
-        threadSegmentation(options[11][1],options[1][1],ID,int(options[4][1]),rootCrown,float(options[7][1])>0.0)
+        threadSegmentation(options[11][1],options[1][1],ID,int(options[4][1]),rootCrown,float(options[7][1])>0.0,img)
         outfile=open(io.getHomePath()+'/tmp/para.sav','wb')
         pickle.dump(allPara,outfile)
         outfile.close()
-    else: print'The segmentation switch must be 0 or 1'
+    else: logger.error('The segmentation switch must be 0 or 1')
     
     if int(options[5][1]) != 0 or int(options[4][1]) != 0: 
         
-        print 'Start Root Analysis'
+        logger.info('Start Root Analysis')
         threadCrown(options[11][1]+str(ID)+'/')
-        print "Exiting Root Analysis"
+        logger.info("Exiting Root Analysis")
         
     
     compTime=int((time.time()-allStart))
-    print 'All done in just '+str(compTime)+' s!'  
-    print 'Write output.csv file'
+    logger.info('All done in just '+str(compTime)+' s!')
+    logger.info('Write output.csv file')
+    io.startStage('output')
     r=len(allCrown)
     if r==0: r=len(allCrown)
     for i in range(r):
         allPara[i][9]=compTime
         io.writeFile(allPara[i], allCrown[i],traitDict,int(options[10][1]))
+    io.startStage('done')
+    io.setProfiler(None)
     return 0
 
+def terminate(signum,frame):
+    '''
+    The watchdog of runOnFolder.py stops an image with SIGTERM, the pending outputs are still written
+    '''
+    raise SystemExit(1)
+
 if __name__ == '__main__':
+    logConfig.configure()
+    signal.signal(signal.SIGTERM,terminate)
     sys.exit(main())
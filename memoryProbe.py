@@ -0,0 +1,182 @@
+'''
+memoryProbe.py
+
+Memory accounting per pipeline stage. At the end of every stage the probe records the
+change of the resident set size, the peak resident set size during the stage and, if
+the tracemalloc module is available (python 3 or pytracemalloc for python 2.7), the
+source lines that allocated most of the memory of the stage. The results are stored
+with the stage spans in the trace of the image (see Trace.py).
+
+The probe is switched on with the environment variable DIRT_MEMORY_PROBE=1, which
+runOnFolder.py sets with --memory-probe. DIRT_STAGE_MEMORY holds optional budgets in
+MB as stage=MB pairs separated by ';'. A warning is printed for every stage whose
+peak resident set size exceeds its budget.
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# standard python imports
+'''
+import os
+import resource
+from collections import OrderedDict
+import logging
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc=None
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+MB=1024.*1024.
+
+def fromEnvironment():
+    '''
+    Returns the probe selected by DIRT_MEMORY_PROBE or None
+    '''
+    if os.environ.get('DIRT_MEMORY_PROBE','0')!='1': return None
+    return MemoryProbe(parseBudgets(os.environ.get('DIRT_STAGE_MEMORY','')))
+
+def parseBudgets(text):
+    '''
+    'masking=500;RTP=2000' -> {'masking':500.,'RTP':2000.}
+    '''
+    budgets={}
+    for i in text.split(';'):
+        if i.strip()=='': continue
+        try:
+            name,mb=i.rsplit('=',1)
+            budgets[name]=float(mb)
+        except ValueError:
+            logger.warning('invalid stage memory budget: '+i)
+    return budgets
+
+def readStatus(field):
+    '''
+    Reads a memory field of /proc/self/status in bytes, None on systems without /proc
+    '''
+    try:
+        with open('/proc/self/status','r') as fin:
+            for line in fin:
+                if line.startswith(field+':'): return int(line.split()[1])*1024
+    except IOError:
+        pass
+    return None
+
+def currentRSS():
+    return readStatus('VmRSS')
+
+def resetPeakRSS():
+    '''
+    Linux resets the peak resident set size when 5 is written to clear_refs
+    '''
+    try:
+        with open('/proc/self/clear_refs','w') as fout:
+            fout.write('5')
+        return True
+    except IOError:
+        return False
+
+def peakRSS():
+    peak=readStatus('VmHWM')
+    if peak is None: peak=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*1024
+    return peak
+
+class MemoryProbe(object):
+    '''
+    classdocs
+    '''
+
+    def __init__(self,budgets=None,topSites=5):
+        '''
+        Constructor
+        
+        budgets maps stage names to MB
+        '''
+        self.__budgets={} if budgets is None else budgets
+        self.__topSites=topSites
+        self.__stage=None
+        self.__rss=None
+        self.__snapshot=None
+        if tracemalloc is not None and tracemalloc.is_tracing()==False: tracemalloc.start()
+
+    def startStage(self,name):
+        '''
+        Ends the running stage and returns its memory record, None if no stage was running
+        '''
+        record=None
+        if self.__stage is not None: record=self.measure()
+        self.__stage=name if name!='done' else None
+        if self.__stage is not None: self.begin()
+        return record
+
+    def begin(self):
+        self.__resetPeak=resetPeakRSS()
+        self.__rss=currentRSS()
+        if tracemalloc is not None: self.__snapshot=tracemalloc.take_snapshot()
+
+    def measure(self):
+        rss=currentRSS()
+        record=OrderedDict()
+        if rss is not None and self.__rss is not None: record['rss delta MB']=(rss-self.__rss)/MB
+        if rss is not None: record['rss MB']=rss/MB
+        # without the reset the peak covers all previous stages
+        record['peak rss MB']=peakRSS()/MB
+        record['peak rss of stage']=self.__resetPeak
+        if tracemalloc is not None and self.__snapshot is not None:
+            diff=tracemalloc.take_snapshot().compare_to(self.__snapshot,'lineno')
+            record['top allocations']=[[str(i.traceback),i.size_diff/MB] for i in diff[:self.__topSites]]
+        budget=self.__budgets.get(self.__stage)
+        if budget is not None and record['peak rss MB']>budget:
+            logger.warning('stage '+self.__stage+' used '+str(int(record['peak rss MB']))+' MB, the budget is '+str(int(budget))+' MB')
+            record['over budget']=True
+        return record
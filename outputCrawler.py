@@ -4,11 +4,22 @@ Created on May 21, 2013
 @author: Alexander Bucksch
 '''
 
+'''
+# internal library imports
+'''
+import logConfig
+
 '''
 # standard python imports
 '''
 import os
 import csv
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
 
 def combineOutput(dirName):
 
@@ -59,7 +70,8 @@ def combineOutput(dirName):
     fo.write( str(countOK)+' images are processed and '+str(countBAD)+' images failed: \n'+str(badFolder))
     # Close opend file
     fo.close()
-    print str(countOK)+' images are processed and '+str(countBAD)+' images failed: \n'+str(badFolder)
+    logger.info(str(countOK)+' images are processed and '+str(countBAD)+' images failed: '+str(badFolder))
             
 if __name__ == '__main__':
+    logConfig.configure()
     combineOutput('/Users/koalaspirit/Documents/DIRTTestset/')
\ No newline at end of file
@@ -0,0 +1,162 @@
+'''
+profiler.py
+
+Profiling of a run without changes to the code. The profiler is selected with the
+environment variable DIRT_PROFILE, which runOnFolder.py sets with --profile:
+
+cprofile - deterministic profile of every stage, written as <stage>.pstats to the
+           profile folder next to output.csv (python -m pstats <file> to inspect)
+sample   - statistical profile with a SIGPROF timer every DIRT_PROFILE_INTERVAL seconds
+           (default 0.01). The low overhead allows to use it in production batches.
+           The stacks are written to profile/stacks.folded, one line per stack with the
+           number of samples, which is the input format of flamegraph.pl.
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# standard python imports
+'''
+import os
+import signal
+import cProfile
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+
+def fromEnvironment(outDir):
+    '''
+    Returns the profiler selected by DIRT_PROFILE or None
+    '''
+    kind=os.environ.get('DIRT_PROFILE','')
+    if kind=='': return None
+    outDir=os.path.join(os.path.abspath(outDir),'profile')
+    if kind=='cprofile': return StageProfiler(outDir)
+    if kind=='sample': return SamplingProfiler(outDir,float(os.environ.get('DIRT_PROFILE_INTERVAL',0.01)))
+    logger.warning('unknown profiler '+kind)
+    return None
+
+def fileName(stage):
+    return stage.replace(' ','_').replace('/','_')
+
+class StageProfiler(object):
+    '''
+    One cProfile profile per stage. Stages that run several times, e.g. once per
+    excised root, accumulate into the same profile.
+    '''
+
+    def __init__(self,outDir):
+        '''
+        Constructor
+        '''
+        self.__outDir=outDir
+        self.__profiles={}
+        self.__active=None
+
+    def startStage(self,name):
+        if self.__active is not None: self.__active.disable()
+        self.__active=None
+        if name=='done': return
+        if name not in self.__profiles: self.__profiles[name]=cProfile.Profile()
+        self.__active=self.__profiles[name]
+        self.__active.enable()
+
+    def close(self):
+        self.startStage('done')
+        if os.path.exists(self.__outDir)==False: os.makedirs(self.__outDir)
+        for name,profile in self.__profiles.items():
+            profile.dump_stats(os.path.join(self.__outDir,fileName(name)+'.pstats'))
+        self.__profiles={}
+
+class SamplingProfiler(object):
+    '''
+    Samples the stack of the main thread on every SIGPROF, which is sent after interval
+    seconds of cpu time. The current stage is the root of every stack.
+    Must be created in the main thread.
+    '''
+
+    def __init__(self,outDir,interval=0.01):
+        '''
+        Constructor
+        '''
+        self.__outDir=outDir
+        self.__interval=interval
+        self.__stacks={}
+        self.__stage='startup'
+        self.__old=signal.signal(signal.SIGPROF,self.sample)
+        # python 2 does not retry system calls, blocking reads and writes must not fail with EINTR on every sample
+        signal.siginterrupt(signal.SIGPROF,False)
+        signal.setitimer(signal.ITIMER_PROF,interval,interval)
+
+    def sample(self,signum,frame):
+        stack=[]
+        while frame is not None:
+            code=frame.f_code
+            stack.append(os.path.basename(code.co_filename)+':'+code.co_name)
+            frame=frame.f_back
+        stack.append(self.__stage)
+        key=';'.join(reversed(stack))
+        self.__stacks[key]=self.__stacks.get(key,0)+1
+
+    def startStage(self,name):
+        self.__stage=name
+
+    def close(self):
+        signal.setitimer(signal.ITIMER_PROF,0,0)
+        signal.signal(signal.SIGPROF,self.__old)
+        # the setting of a python handler before the profiler was installed
+        signal.siginterrupt(signal.SIGPROF,True)
+        if os.path.exists(self.__outDir)==False: os.makedirs(self.__outDir)
+        with open(os.path.join(self.__outDir,'stacks.folded'),'w') as fout:
+            for key,n in sorted(self.__stacks.items()):
+                fout.write(key.replace(' ','_')+' '+str(n)+'\n')
+        self.__stacks={}
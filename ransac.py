@@ -1,7 +1,6 @@
 import numpy
 import scipy # use numpy if scipy unavailable
 import scipy.linalg # use numpy if scipy unavailable
-import pylab
 
 ## Copyright (c) 2004-2007, Andrew D. Straw. All rights reserved.
 
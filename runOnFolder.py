@@ -8,38 +8,249 @@ Created on Feb 12, 2014
 # external library imports
 '''
 import outputCrawler as oc
+import batchManifest as bm
+import workQueue as wq
+import scheduler as sch
+import watchdog as wd
+import Trace
+import logConfig
 import time
 '''
 # python standard imports
 '''
 import os
-import sys
+import argparse
 import multiprocessing
-import subprocess
+import logging
 
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
 
-def calculate(args):
+
+def calculateEntry(entry):
+    '''
+    Runs main.py for one image under the watchdog and returns the return code and a report
+    with the stage durations, the stage that timed out and the trace file of the image
+    '''
+    key,args,stageFile,limits=entry
+    timeout=None
     try:
-        return subprocess.call(args)
+        returnCode,timeout=wd.Watchdog(stageFile,**limits).run(args)
     except:
-        print "ERROR in File: "+str(args[2])
+        logger.error("ERROR in File: "+str(args[2]))
+        returnCode=1
+    report={'stages':wd.stageDurations(wd.readStages(stageFile)),'timeout':timeout,'trace':os.path.join(os.path.dirname(stageFile),'trace.json')}
+    return [(key,returnCode,report)]
+
+def calculateChunk(chunk):
+    '''
+    Pipeline mode: one worker computes a chunk of images in-process (see Pipeline.py)
+    '''
+    import Pipeline
+    return Pipeline.runImages(chunk)
+
+def runOptions(dir,seg):
+    '''
+    All options of main.py except the image path and the image ID. They are part of the manifest key.
+    '''
+    return [seg, '1', '1', '1', '0.0', '0', '0', '0', dir, './traits.csv']
+
+def makeJob(args,key,fileName,imgID,opts):
+    if args.pipeline: return (key,args.dir+fileName,imgID,opts)
+    limits={'imageTimeout':args.image_timeout,'stageTimeouts':args.stage_limits,'defaultStageTimeout':args.stage_timeout}
+    stageFile=args.dir+str(imgID)+'/tmp/stages.csv'
+    return (key,['python', os.getcwd()+'/main.py', args.dir+fileName,str(imgID)]+opts,stageFile,limits)
+
+def submit(args,dispatcher,entries):
+    '''
+    entries are (file name, key, job) tuples computed by one worker. In pipeline mode the
+    worker computes them in-process, otherwise there is one main.py process per image.
+    '''
+    paths=[args.dir+fileName for fileName,_,_ in entries]
+    cost=sch.estimateMemory(paths,bytesPerPixel=args.bytes_per_pixel)
+    tag=[(fileName,key) for fileName,key,_ in entries]
+    if args.pipeline: dispatcher.submit(calculateChunk,[job for _,_,job in entries],cost,tag)
+    else: dispatcher.submit(calculateEntry,entries[0][2],cost,tag)
+
+def returnCodes(tag,results):
+    '''
+    Images without a result failed together with their worker
+    '''
+    codes={}
+    if results is not None:
+        for key,returnCode,report in results: codes[key]=(returnCode,report)
+    return [(fileName,key)+codes.get(key,(1,{})) for fileName,key in tag]
+
+def manifestNote(report,trace):
+    '''
+    trace is the trace of the image as read by Trace.readTrace
+    '''
+    if report.get('timeout') is not None: return 'timeout in stage '+report['timeout']
+    if trace is not None and len(trace.get('errors',[]))>0: return str(len(trace['errors']))+' outputs not saved'
+    return ''
+
+def readArguments():
+    parser=argparse.ArgumentParser(description='Runs DIRT on all images in a folder.')
+    parser.add_argument('dir',help='full path to the image folder, ending with /')
+    parser.add_argument('seg',help='multiplier for the automatically determined mask threshold')
+    parser.add_argument('--processes',type=int,default=sch.defaultProcesses(),help='number of workers, default is the number of cores')
+    parser.add_argument('--memory-budget',type=float,default=None,help='memory in MB that all running images together may use, default is 80%% of the physical memory')
+    parser.add_argument('--bytes-per-pixel',type=float,default=sch.defaultBytesPerPixel,help='estimated peak memory per image pixel')
+    parser.add_argument('--pipeline',action='store_true',help='compute chunks of images in-process with overlapped decoding and writing')
+    parser.add_argument('--chunk',type=int,default=8,help='number of images per worker in pipeline mode')
+    parser.add_argument('--image-timeout',type=float,default=None,help='seconds an image may take before it is killed')
+    parser.add_argument('--stage-timeout',type=float,default=None,help='seconds any pipeline stage of an image may take before it is killed')
+    parser.add_argument('--stage-limit',action='append',default=[],metavar='STAGE=SECONDS',help='budget of a single stage (see watchdog.py for the names), can be repeated')
+    parser.add_argument('--shared',action='store_true',help='pull images from a work queue in the image folder that is shared with other nodes')
+    parser.add_argument('--lease-expiry',type=float,default=600.,help='seconds after which the lease of a silent node is reclaimed')
+    parser.add_argument('--profile',choices=['cprofile','sample'],default=None,help='profile every image, see profiler.py')
+    parser.add_argument('--memory-probe',action='store_true',help='record rss and peak rss of every stage in the trace of the image')
+    parser.add_argument('--stage-memory',action='append',default=[],metavar='STAGE=MB',help='warn if the peak rss during a stage exceeds MB, implies --memory-probe, can be repeated')
+    parser.add_argument('--artifacts',choices=['none','minimal','full'],default=None,help='outputs besides output.csv: none, the masks only, or all images and plot data (default)')
+    parser.add_argument('--compression',type=int,choices=range(10),default=None,help='png and gzip compression level of the outputs, default 1 for minimal, library defaults for full')
+    parser.add_argument('--stage-cache',default=None,help='folder for cached medial axes, skeleton graphs and root tip paths, see stageCache.py')
+    parser.add_argument('--prune-spurs',type=float,default=None,metavar='FACTOR',help='remove skeleton spurs up to FACTOR times the root radius at their junction long, see Skeleton.pruneSpurs')
+    parser.add_argument('--graph-backend',choices=['auto','graph_tool','scipy'],default=None,help='library of the skeleton graph, default is DIRT_GRAPH_BACKEND or graph_tool if installed, see graphBackend.py')
+    parser.add_argument('--log-level',choices=['DEBUG','INFO','WARNING','ERROR'],default=None,help='log level of runOnFolder.py and main.py, default is DIRT_LOG_LEVEL or INFO')
+    parser.add_argument('--sample-interval',type=float,default=0.01,help='seconds of cpu time between two samples of the sampling profiler')
+    args=parser.parse_args()
+    if args.memory_budget is None: args.memory_budget=sch.defaultBudget()
+    else: args.memory_budget=int(args.memory_budget*1024*1024)
+    args.stage_limits={}
+    for i in args.stage_limit:
+        try:
+            name,seconds=i.rsplit('=',1)
+            args.stage_limits[name]=float(seconds)
+        except ValueError:
+            parser.error('invalid stage limit: '+i)
+    if args.log_level is not None:
+        os.environ['DIRT_LOG_LEVEL']=args.log_level
+    logConfig.configure()
+    if args.stage_cache is not None:
+        os.environ['DIRT_STAGE_CACHE']=os.path.abspath(args.stage_cache)
+    if args.prune_spurs is not None:
+        os.environ['DIRT_SPUR_PRUNING']=str(args.prune_spurs)
+    if args.graph_backend is not None:
+        os.environ['DIRT_GRAPH_BACKEND']=args.graph_backend
+    if args.artifacts is not None:
+        os.environ['DIRT_ARTIFACTS']=args.artifacts
+    if args.compression is not None:
+        os.environ['DIRT_COMPRESSION']=str(args.compression)
+    if args.profile is not None:
+        # inherited by the workers and the main.py processes
+        os.environ['DIRT_PROFILE']=args.profile
+        os.environ['DIRT_PROFILE_INTERVAL']=str(args.sample_interval)
+    if args.memory_probe or len(args.stage_memory)>0:
+        os.environ['DIRT_MEMORY_PROBE']='1'
+        os.environ['DIRT_STAGE_MEMORY']=';'.join(args.stage_memory)
+    if args.pipeline and (args.image_timeout or args.stage_timeout or args.stage_limits):
+        parser.error('timeouts need one process per image and cannot be used with --pipeline')
+    return args
+
+def listImages(dir):
+    return [i for i in sorted(os.listdir(dir)) if os.path.isfile(dir+i) and bm.isImage(i)]
+
+def runLocal(args,pool,latency,profile):
+    manifest=bm.BatchManifest(args.dir)
+    entries=[]
+    skipped=0
+    for i in listImages(args.dir): 
+        opts=runOptions(args.dir,args.seg)
+        key,imgID,state=manifest.register(i,opts)
+        if state=='todo': entries.append((i,key,makeJob(args,key,i,imgID,opts)))
+        else: skipped+=1
+    logger.info(str(len(entries))+' images to compute, '+str(skipped)+' images are already done or duplicates')
+    failed=[]
+    
+    def onDone(tag,results):
+        for fileName,key,returnCode,report in returnCodes(tag,results):
+            latency.add(report)
+            trace=Trace.readTrace(report.get('trace'))
+            if returnCode==0: profile.add(trace)
+            if manifest.complete(key,returnCode,manifestNote(report,trace))!='done': failed.append(fileName)
+            
+    dispatcher=sch.Dispatcher(pool,args.processes,sch.MemoryScheduler(args.memory_budget),onDone)
+    chunk=args.chunk if args.pipeline else 1
+    for i in range(0,len(entries),chunk):
+        submit(args,dispatcher,entries[i:i+chunk])
+    dispatcher.join()
+    logger.info(str(len(failed))+' images failed and will be retried in the next run')
+
+def collectResults(dir):
+    logger.info('Collecting results')
+    oc.combineOutput(dir) 
+    logger.info('Results written to '+dir+'outputAll.csv')
+
+def runShared(args,pool,latency,profile):
+    '''
+    Every node leases one image at a time per worker, so fast nodes pull more images.
+    Manifest reads and writes are serialized by a cluster wide lock in the queue folder.
+    The node that finds no image running anymore collects the results.
+    '''
+    manifest=bm.BatchManifest(args.dir)
+    queue=wq.SharedQueue(args.dir,expiry=args.lease_expiry)
+    files=listImages(args.dir)
+    opts=runOptions(args.dir,args.seg)
+    logger.info('node '+queue.getNode()+' joined the queue')
+    finished=[]
+    
+    def onDone(tag,results):
+        for fileName,key,returnCode,report in returnCodes(tag,results):
+            latency.add(report)
+            trace=Trace.readTrace(report.get('trace'))
+            if returnCode==0: profile.add(trace)
+            queue.lock()
+            manifest.load()
+            status=manifest.complete(key,returnCode,manifestNote(report,trace))
+            queue.unlock()
+            if status=='done': queue.markDone(fileName,key)
+            queue.release(fileName)
+            finished.append(status)
+    
+    dispatcher=sch.Dispatcher(pool,args.processes,sch.MemoryScheduler(args.memory_budget),onDone)
+    for i in queue.nodeOrder(files):
+        dispatcher.collect()
+        if queue.isDone(i,manifest.jobKey(i,opts)) or queue.acquire(i)==False: continue
+        queue.lock()
+        manifest.load()
+        key,imgID,state=manifest.register(i,opts,cleanup=False)
+        queue.unlock()
+        if state!='todo':
+            queue.markDone(i,key)
+            queue.release(i)
+            continue
+        manifest.removeOutput(imgID)
+        submit(args,dispatcher,[(i,key,makeJob(args,key,i,imgID,opts))])
+    dispatcher.join()
+    logger.info('node '+queue.getNode()+' computed '+str(len(finished))+' images, '+str(len(finished)-finished.count('done'))+' failed')
+    latency.write(args.dir+'latency-'+queue.getNode()+'.csv')
+    profile.write(args.dir+'profile-'+queue.getNode()+'.json')
+    for i in files:
+        if queue.isDone(i,manifest.jobKey(i,opts))==False and queue.isLeased(i):
+            logger.info('images of other nodes are still running, results are collected by the last node')
+            return
+    queue.lock()
+    collectResults(args.dir)
+    queue.unlock()
 
 if __name__ == '__main__':
-    print os.getcwd()
     startT=time.time()
-    dir=sys.argv[1]  
-    seg=sys.argv[2]  
-    files=os.listdir(dir)
-    pool = multiprocessing.Pool(processes=8)
-    args=[]
-    for idx,i in enumerate(files): 
-        if i !='.DS_Store':
-            if os.path.isfile(dir+i):
-                if os.path.isdir(dir+str(idx))==False:
-                    args.append(['python', os.getcwd()+'/main.py', dir+str(i),str(idx),seg, '1', '1', '1', '0.0', '0', '0', '0', dir, './traits.csv'])
-    r = pool.map_async(calculate, args)
-    r.wait() # Wait on the results
-    print 'All files done in '+str(time.time()-startT)+'s !'
-    print 'Collecting results'
-    oc.combineOutput(dir) 
-    print 'Results written to '+dir+'outputAll.csv'
+    args=readArguments()
+    logger.debug(os.getcwd())
+    logger.info(str(args.processes)+' workers, memory budget: '+str(args.memory_budget)+' bytes')
+    pool = multiprocessing.Pool(processes=args.processes)
+    latency=wd.LatencyReport()
+    profile=Trace.BatchProfile()
+    if args.shared: 
+        runShared(args,pool,latency,profile)
+    else:
+        runLocal(args,pool,latency,profile)
+        latency.write(args.dir+'latency.csv')
+        profile.write(args.dir+'profile.json')
+    pool.close()
+    pool.join()
+    logger.info('All files done in '+str(time.time()-startT)+'s !')
+    latency.printReport()
+    if args.shared==False: collectResults(args.dir)
@@ -0,0 +1,189 @@
+'''
+scheduler.py
+
+Memory-aware admission control for the batch runs of runOnFolder.py. The peak memory
+of an image is estimated from its pixel dimensions, which are read from the image
+header without decoding the image. A job is only started while the estimated memory
+of all running jobs stays below the memory budget.
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# internal library imports
+'''
+import imageLoader
+
+'''
+# standard python imports
+'''
+import os
+import time
+import multiprocessing
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+# grey image and its copy, masks and the in-memory copies of the int32 label image
+# dominate the peak memory; measured before the strip labelling (see stripLabel.py)
+# removed the per pixel component lists, so the estimate is conservative
+defaultBytesPerPixel=150
+# python interpreter with numpy, scipy, mahotas and graph_tool loaded
+defaultBaseMemory=400*1024*1024
+
+def physicalMemory():
+    try:
+        return os.sysconf('SC_PAGE_SIZE')*os.sysconf('SC_PHYS_PAGES')
+    except (ValueError,OSError,AttributeError):
+        return None
+
+def defaultProcesses():
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+def defaultBudget():
+    mem=physicalMemory()
+    if mem is None: return None
+    return int(mem*0.8)
+
+def estimateMemory(paths,bytesPerPixel=defaultBytesPerPixel,baseMemory=defaultBaseMemory):
+    '''
+    paths are the images computed one after another by one worker. While one image is
+    analysed the next one is already decoded, so the two largest images count.
+    '''
+    pixels=[]
+    for p in paths:
+        try:
+            w,h=imageLoader.dimensions(p)
+            pixels.append(w*h)
+        except:
+            logger.warning('no image dimensions for '+str(p))
+            pixels.append(0)
+    pixels.sort(reverse=True)
+    return baseMemory+sum(pixels[:2])*bytesPerPixel
+
+class MemoryScheduler(object):
+    '''
+    classdocs
+    '''
+
+    def __init__(self,budget=None):
+        '''
+        Constructor
+        
+        budget in bytes, None means no memory limit
+        '''
+        self.__budget=budget
+        self.__used=0
+
+    def admits(self,cost):
+        '''
+        A job larger than the whole budget is admitted when nothing else runs
+        '''
+        if self.__budget is None or self.__used==0: return True
+        return self.__used+cost<=self.__budget
+
+    def acquire(self,cost):
+        self.__used+=cost
+
+    def release(self,cost):
+        self.__used-=cost
+
+    def getUsed(self):
+        return self.__used
+
+class Dispatcher(object):
+    '''
+    Submits jobs to a multiprocessing pool as long as a worker is free and the
+    memory scheduler admits them. onDone(tag,results) is called for every finished job,
+    results is None if the job raised an exception.
+    '''
+
+    def __init__(self,pool,processes,scheduler,onDone,poll=0.5):
+        '''
+        Constructor
+        '''
+        self.__pool=pool
+        self.__processes=processes
+        self.__scheduler=scheduler
+        self.__onDone=onDone
+        self.__poll=poll
+        self.__running=[]
+
+    def collect(self):
+        stillRunning=[]
+        finished=[]
+        for tag,cost,r in self.__running:
+            if r.ready():
+                self.__scheduler.release(cost)
+                finished.append((tag,r))
+            else: stillRunning.append((tag,cost,r))
+        self.__running=stillRunning
+        for tag,r in finished:
+            try: results=r.get()
+            except: results=None
+            self.__onDone(tag,results)
+        return len(finished)
+
+    def isBlocked(self,cost):
+        return len(self.__running)>=self.__processes or self.__scheduler.admits(cost)==False
+
+    def submit(self,func,job,cost,tag):
+        while self.isBlocked(cost):
+            if self.collect()==0: time.sleep(self.__poll)
+        self.__scheduler.acquire(cost)
+        self.__running.append((tag,cost,self.__pool.apply_async(func,(job,))))
+
+    def join(self):
+        while len(self.__running)>0:
+            if self.collect()==0: time.sleep(self.__poll)
@@ -0,0 +1,226 @@
+'''
+stageCache.py
+
+On-disk cache of the intermediate results of the crown analysis: the medial axis with
+its distance map, the skeleton graph in the format of its backend with the thickest
+path, and the root tip paths. Entries are keyed by a hash of their input arrays, so
+the analysis of an unchanged crop is not repeated when only the trait selection or
+the marker diameter changes. All entries are stored in pixel units, the graph is
+scaled after loading (see Segmentation.scaleGraph).
+
+The environment variable DIRT_STAGE_CACHE sets the cache folder, there is no cache
+without it.
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# external library imports
+'''
+import numpy as np
+
+'''
+# internal library imports
+'''
+import Trace
+import graphBackend
+
+'''
+# standard python imports
+'''
+import os
+import pickle
+import hashlib
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+# part of every key, to be raised when the cached stages change their results
+cacheVersion='1'
+
+def fromEnvironment():
+    root=os.environ.get('DIRT_STAGE_CACHE','')
+    if root=='': return None
+    return StageCache(root)
+
+class StageCache(object):
+    '''
+    classdocs
+    '''
+
+    def __init__(self,root):
+        '''
+        Constructor
+        '''
+        self.__root=os.path.abspath(root)+'/'
+        
+    def key(self,stage,arrays,params=''):
+        h=hashlib.sha1(cacheVersion+'|'+stage+'|'+str(params))
+        for a in arrays:
+            a=np.ascontiguousarray(a)
+            h.update(str(a.dtype)+str(a.shape))
+            h.update(a.tostring())
+        return h.hexdigest()
+    
+    def path(self,stage,key,ext):
+        folder=self.__root+stage.replace(' ','_')+'/'+key[:2]+'/'
+        if os.path.isdir(folder)==False:
+            try: os.makedirs(folder)
+            except OSError: pass
+        return folder+key+ext
+    
+    def commit(self,tmp,path):
+        '''
+        Entries appear atomically, so concurrent runs never read a partial file
+        '''
+        os.rename(tmp,path)
+        
+    def tmpName(self,path,ext):
+        return path+'.'+str(os.getpid())+ext
+    
+    def hit(self,stage,found):
+        Trace.count('stage cache hits' if found else 'stage cache misses')
+        if found: logger.info('using cached '+stage)
+        return found
+        
+    def load(self,stage,key):
+        try:
+            with open(self.path(stage,key,'.pkl'),'rb') as fin:
+                return pickle.load(fin)
+        except (IOError,EOFError,pickle.UnpicklingError):
+            return None
+        
+    def store(self,stage,key,obj):
+        path=self.path(stage,key,'.pkl')
+        tmp=self.tmpName(path,'.pkl')
+        with open(tmp,'wb') as fout:
+            pickle.dump(obj,fout,pickle.HIGHEST_PROTOCOL)
+        self.commit(tmp,path)
+        
+    def loadArrays(self,stage,key):
+        try:
+            f=np.load(self.path(stage,key,'.npz'))
+        except IOError:
+            return None
+        try:
+            return dict((k,f[k]) for k in f.files)
+        finally:
+            f.close()
+        
+    def storeArrays(self,stage,key,**arrays):
+        path=self.path(stage,key,'.npz')
+        tmp=self.tmpName(path,'.npz')
+        np.savez(tmp,**arrays)
+        self.commit(tmp,path)
+        
+    def loadGraph(self,stage,key):
+        path=self.path(stage,key,graphBackend.extension())
+        if os.path.isfile(path)==False: return None
+        return graphBackend.load(path)
+        
+    def storeGraph(self,stage,key,G):
+        ext=graphBackend.extension(G)
+        path=self.path(stage,key,ext)
+        tmp=self.tmpName(path,ext)
+        graphBackend.save(G,tmp)
+        self.commit(tmp,path)
+
+def medialAxis(cache,skel,imgL):
+    '''
+    Returns skeleton and distance map of the labelled crop as Skeleton.skel
+    '''
+    if cache is None: return skel.skel(imgL)
+    key=cache.key('medial axis',[imgL])
+    arrays=cache.loadArrays('medial axis',key)
+    if cache.hit('medial axis',arrays is not None): return arrays['skel'],arrays['dia']
+    skelImg,dia=skel.skel(imgL)
+    cache.storeArrays('medial axis',key,skel=skelImg,dia=dia)
+    return skelImg,dia
+
+def thickestPath(cache,seg,skelImg,skelDia,xScale,yScale):
+    '''
+    Returns the results of Segmentation.findThickestPath and the key of the graph. With a cache the
+    graph is built in pixel units, stored with its thickest path and scaled to xScale and yScale.
+    '''
+    if cache is None: return seg.findThickestPath(skelImg,skelDia,xScale,yScale)+(None,)
+    # the vertex order of both graph backends is the same, but their files are not
+    key=cache.key('graph',[skelImg,skelDia],graphBackend.backend())
+    stored=cache.load('graph',key)
+    G=None
+    if stored is not None: G=cache.loadGraph('graph',key)
+    if cache.hit('graph',G is not None):
+        indices,fail=stored
+        path=[G.vertex(i) for i in indices]
+        seg.setFail(fail)
+        Trace.count('skeleton vertices',G.num_vertices())
+        Trace.count('skeleton edges',G.num_edges())
+    else:
+        with Trace.span('graph build'):
+            u,_=seg.makeGraphFast(skelImg,skelDia,1.,1.)
+            # a compact copy of the largest component, as it is stored
+            G=graphBackend.prune(u)
+        path=seg.findThickestPathInGraph(G)
+        cache.storeGraph('graph',key,G)
+        cache.store('graph',key,([int(G.vertex_index[v]) for v in path],seg.getFail()))
+    seg.scaleGraph(G,xScale,yScale)
+    maxDia10=np.max(skelDia[0:len(skelDia)*0.1])
+    return path,G,maxDia10,G.num_vertices(),key
+
+def rtpSkeleton(cache,graphKey,rtp,path,G):
+    '''
+    Returns the results of RootTipPaths.getRTPSkeleton, the root tip paths are taken from the cache if possible
+    '''
+    if cache is None or graphKey is None: return rtp.getRTPSkeleton(path,G,True)
+    key=cache.key('rtp',[],graphKey)
+    cached=cache.load('rtp',key)
+    result=rtp.getRTPSkeleton(path,G,True,cached)
+    if cache.hit('rtp',cached is not None)==False: cache.store('rtp',key,rtp.getPathState(G))
+    return result
@@ -0,0 +1,238 @@
+'''
+stripLabel.py
+
+Out-of-core labelling of the connected components of a binary mask. The mask is read
+in strips of rows, every strip is labelled with ndimage.label, and components that touch
+across a strip boundary are merged with union-find. The int32 label image is a memory map
+on disk, so the peak memory depends on the strip size and not on the image size. The
+components are numbered in raster order of their first pixel, the result is the same as
+that of ndimage.label on the whole mask.
+
+A statistics table (area, bounding box, centroid) of every component, the background is
+entry 0, is computed in the same pass and replaces per pixel component lists.
+
+Example: python stripLabel.py mask.npy labels.npy stats.csv [--rows 1024] [--connectivity 8]
+         (the mask is a .npy file and is memory mapped)
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# external library imports
+'''
+import numpy as np
+from scipy import ndimage
+
+'''
+# standard python imports
+'''
+import os
+import csv
+import logging
+import argparse
+import tempfile
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+stripPixels=1<<22
+statsFields=[('label',np.int64),('area',np.int64),('rowMin',np.int64),('rowMax',np.int64),
+             ('colMin',np.int64),('colMax',np.int64),('rowMean',np.float64),('colMean',np.float64)]
+
+def stripRows(width,pixels=stripPixels):
+    return max(1,pixels//max(width,1))
+
+def openLabels(path,shape):
+    '''
+    Without path the label image is an anonymous scratch file that disappears with the memory map
+    '''
+    if path is not None:
+        return np.lib.format.open_memmap(path,mode='w+',dtype=np.int32,shape=shape)
+    fd,tmp=tempfile.mkstemp(suffix='.npy',prefix='dirtlabels')
+    os.close(fd)
+    try:
+        return np.lib.format.open_memmap(tmp,mode='w+',dtype=np.int32,shape=shape)
+    finally:
+        os.remove(tmp)
+
+def boundaryPairs(upper,lower,structure):
+    '''
+    Returns the label pairs of the last row of a strip (upper) and the first row of the next
+    strip (lower) that are connected by structure
+    '''
+    pairs=[]
+    for dx in (-1,0,1):
+        if structure[0,1+dx]==False: continue
+        if dx==0: a,b=upper,lower
+        elif dx==1: a,b=upper[1:],lower[:-1]
+        else: a,b=upper[:-1],lower[1:]
+        sel=(a>0)&(b>0)
+        pairs.append(np.vstack((a[sel],b[sel])))
+    if len(pairs)==0: return np.zeros((2,0),dtype=np.int64)
+    return np.hstack(pairs).astype(np.int64)
+
+def find(parent,a):
+    root=a
+    while parent[root]!=root: root=parent[root]
+    while parent[a]!=root:
+        nxt=parent[a]
+        parent[a]=root
+        a=nxt
+    return root
+
+def resolve(total,pairs):
+    '''
+    Returns the lookup table from the provisional labels of the strips to the final labels. The
+    smaller label becomes the root of a merged set, so the final labels keep the raster order.
+    '''
+    parent=np.arange(total+1,dtype=np.int64)
+    if pairs.shape[1]>0:
+        keys=np.unique(pairs[0]*(total+1)+pairs[1])
+        for a,b in zip((keys//(total+1)).tolist(),(keys%(total+1)).tolist()):
+            ra=find(parent,a)
+            rb=find(parent,b)
+            if ra<rb: parent[rb]=ra
+            elif rb<ra: parent[ra]=rb
+    while True:
+        grand=parent[parent]
+        if np.array_equal(grand,parent): break
+        parent=grand
+    rank=np.cumsum(parent==np.arange(total+1))-1
+    return rank[parent].astype(np.int32)
+
+def emptyStats(n,shape):
+    stats=np.zeros(n,dtype=statsFields)
+    stats['label']=np.arange(n)
+    stats['rowMin']=shape[0]
+    stats['colMin']=shape[1]
+    stats['rowMax']=-1
+    stats['colMax']=-1
+    return stats
+
+def addStrip(stats,lab,r0,sums):
+    '''
+    Adds the pixels of a strip of the final label image starting at row r0 to the table
+    '''
+    h,w=np.shape(lab)
+    n=len(stats)
+    flat=lab.ravel()
+    stats['area']+=np.bincount(flat,minlength=n)
+    sums[0]+=np.bincount(flat,weights=np.repeat(np.arange(r0,r0+h,dtype=np.float64),w),minlength=n)
+    sums[1]+=np.bincount(flat,weights=np.tile(np.arange(w,dtype=np.float64),h),minlength=n)
+    # first and last occurrence in row and in column order give the bounding box
+    labs,first=np.unique(flat,return_index=True)
+    stats['rowMin'][labs]=np.minimum(stats['rowMin'][labs],first//w+r0)
+    labs,last=np.unique(flat[::-1],return_index=True)
+    stats['rowMax'][labs]=np.maximum(stats['rowMax'][labs],(len(flat)-1-last)//w+r0)
+    flat=lab.T.ravel()
+    labs,first=np.unique(flat,return_index=True)
+    stats['colMin'][labs]=np.minimum(stats['colMin'][labs],first//h)
+    labs,last=np.unique(flat[::-1],return_index=True)
+    stats['colMax'][labs]=np.maximum(stats['colMax'][labs],(len(flat)-1-last)//h)
+
+def label(mask,path=None,rows=None,structure=None):
+    '''
+    Labels the nonzero pixels of mask, which can be a memory map. structure is that of ndimage.label,
+    the default connects the 4-neighbours. path is a .npy file for the label image.
+    Returns the label image as int32 memory map, the number of components and the statistics table.
+    '''
+    h,w=np.shape(mask)
+    if structure is None: structure=ndimage.generate_binary_structure(2,1)
+    structure=np.asarray(structure,dtype=bool)
+    if rows is None: rows=stripRows(w)
+    labels=openLabels(path,(h,w))
+    total=0
+    pairs=[np.zeros((2,0),dtype=np.int64)]
+    lastRow=None
+    for r0 in xrange(0,h,rows):
+        r1=min(h,r0+rows)
+        band=np.asarray(mask[r0:r1])>0
+        lab=np.zeros(band.shape,dtype=np.int32)
+        n=ndimage.label(band,structure,output=lab)
+        lab[band]+=total
+        if lastRow is not None: pairs.append(boundaryPairs(lastRow,lab[0],structure))
+        lastRow=lab[-1].copy()
+        labels[r0:r1]=lab
+        total+=n
+    lut=resolve(total,np.hstack(pairs))
+    nr=int(lut.max()) if len(lut)>0 else 0
+    stats=emptyStats(nr+1,(h,w))
+    sums=np.zeros((2,nr+1))
+    for r0 in xrange(0,h,rows):
+        r1=min(h,r0+rows)
+        lab=lut[labels[r0:r1]]
+        labels[r0:r1]=lab
+        addStrip(stats,lab,r0,sums)
+    labels.flush()
+    found=stats['area']>0
+    stats['rowMean'][found]=sums[0][found]/stats['area'][found]
+    stats['colMean'][found]=sums[1][found]/stats['area'][found]
+    logger.debug('labelled '+str(nr)+' components in strips of '+str(rows)+' rows, '+str(total)+' before merging')
+    return labels,nr,stats
+
+def writeStats(stats,path):
+    with open(path,'w') as fout:
+        writer=csv.writer(fout)
+        writer.writerow([name for name,_ in statsFields])
+        for row in stats:
+            writer.writerow(list(row))
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description='Labels the components of a large binary mask strip by strip.')
+    parser.add_argument('mask',help='.npy file of the mask, nonzero is foreground')
+    parser.add_argument('labels',help='.npy file for the int32 label image')
+    parser.add_argument('stats',help='csv file for the component statistics')
+    parser.add_argument('--rows',type=int,default=None,help='rows per strip, default '+str(stripPixels)+' pixels per strip')
+    parser.add_argument('--connectivity',type=int,choices=[4,8],default=4,help='neighbourhood of the components')
+    args=parser.parse_args()
+    structure=ndimage.generate_binary_structure(2,1 if args.connectivity==4 else 2)
+    _,nr,stats=label(np.load(args.mask,mmap_mode='r'),args.labels,args.rows,structure)
+    writeStats(stats,args.stats)
+    print str(nr)+' components'
@@ -0,0 +1,200 @@
+'''
+syntheticRoots.py
+
+Draws synthetic root crown images with known ground truth for benchmarks and regression
+tests. A crown is a tap root with laterals that branch off alternately to the left and
+to the right at a known angle. The image also holds a circle marker in the upper right,
+a rectangular tag in the upper left and optionally excised roots at the bottom. The
+roots are bright on a dark background, as in the images taken with the DIRT imaging
+protocol. All sizes are relative to the image height, so one corpus can be drawn at
+several resolutions.
+
+Example: python syntheticRoots.py <output folder> [--megapixels 1 4 16] [--seeds 0 1 2] [--excised 1]
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# external library imports
+'''
+import numpy as np
+from PIL import Image, ImageDraw
+
+'''
+# standard python imports
+'''
+import os
+import json
+import math
+import argparse
+from collections import OrderedDict
+
+'''
+# global defs
+'''
+background=40
+foreground=200
+noise=8.
+
+def imageSize(megapixels,aspect=4./3.):
+    w=int(math.sqrt(megapixels*1e6*aspect))
+    return w,int(w/aspect)
+
+def drawRoot(draw,x,y,angle,length,diameter):
+    '''
+    Straight root segment from (x,y) with angle in degrees from the vertical downwards,
+    positive angles point to the right. Returns the end point.
+    '''
+    a=math.radians(angle)
+    x2=x+length*math.sin(a)
+    y2=y+length*math.cos(a)
+    draw.line([(x,y),(x2,y2)],fill=foreground,width=int(round(diameter)))
+    r=diameter/2.
+    draw.ellipse([x2-r,y2-r,x2+r,y2+r],fill=foreground)
+    return x2,y2
+
+def drawRootCrown(megapixels=1.,seed=0,nrLaterals=10,branchAngle=50.,stemDiameter=0.025,lateralDiameter=0.01,nrExcised=0,markerDiameter=25.4):
+    '''
+    Returns the grey image as uint8 array and the ground truth. Diameters are fractions of
+    the image height, markerDiameter is the diameter of the circle marker in mm.
+    '''
+    rng=np.random.RandomState(seed)
+    w,h=imageSize(megapixels)
+    img=Image.new('L',(w,h),background)
+    draw=ImageDraw.Draw(img)
+    
+    # tag in the upper left, its text is not part of the ground truth
+    draw.rectangle([0.05*w,0.05*h,0.23*w,0.10*h],fill=foreground)
+    draw.text((0.06*w,0.06*h),'DIRT '+str(seed),fill=background)
+    
+    # circle marker in the upper right
+    markerPx=0.12*h
+    cx,cy=0.85*w,0.15*h
+    draw.ellipse([cx-markerPx/2,cy-markerPx/2,cx+markerPx/2,cy+markerPx/2],fill=foreground)
+    
+    # tap root
+    stemPx=stemDiameter*h
+    lateralPx=lateralDiameter*h
+    x0,y0=0.5*w,0.18*h
+    tapLength=0.6*h
+    draw.ellipse([x0-stemPx/2,y0-stemPx/2,x0+stemPx/2,y0+stemPx/2],fill=foreground)
+    drawRoot(draw,x0,y0,0.,tapLength,stemPx)
+    
+    # laterals start below the top 10% of the crown, where DIRT measures the stem diameter
+    angles=[]
+    for i in range(nrLaterals):
+        f=0.15+0.75*float(i)/max(nrLaterals-1,1)
+        side=1 if i%2==0 else -1
+        angle=branchAngle+rng.uniform(-5.,5.)
+        length=0.37*h*(1.-0.6*f)*rng.uniform(0.85,1.15)
+        drawRoot(draw,x0,y0+f*tapLength,side*angle,length,lateralPx)
+        angles.append(angle)
+    
+    # excised roots in the bottom corners with two short laterals each
+    excisedPx=0.006*h
+    for i in range(nrExcised):
+        side=1 if i%2==0 else -1
+        ex=0.5*w-side*0.38*w-side*0.06*w*(i/2)
+        ey=0.82*h+0.05*h*(i/2)
+        x2,y2=drawRoot(draw,ex,ey,side*80.,0.18*h,excisedPx)
+        for f in [0.35,0.7]:
+            drawRoot(draw,ex+f*(x2-ex),ey+f*(y2-ey),side*120.,0.04*h,excisedPx*0.7)
+    
+    arr=np.asarray(img,dtype=np.float64)
+    arr=arr+rng.normal(0.,noise,arr.shape)
+    arr=np.clip(arr,0,255).astype(np.uint8)
+    
+    mmPerPixel=markerDiameter/markerPx
+    truth=OrderedDict()
+    truth['seed']=seed
+    truth['width']=w
+    truth['height']=h
+    truth['tips']=nrLaterals+1
+    truth['branch angle']=float(np.median(angles))
+    truth['stem diameter px']=stemPx
+    truth['lateral diameter px']=lateralPx
+    truth['lateral diameter mm']=lateralPx*mmPerPixel
+    truth['marker diameter px']=markerPx
+    truth['marker diameter mm']=markerDiameter
+    truth['excised roots']=nrExcised
+    return arr,truth
+
+def writeCorpus(outDir,megapixels=[1.],seeds=[0],**kwargs):
+    '''
+    Writes <name>.png and the ground truth <name>.json for every resolution and seed.
+    Returns the image paths.
+    '''
+    if os.path.exists(outDir)==False: os.makedirs(outDir)
+    paths=[]
+    for mp in megapixels:
+        for seed in seeds:
+            arr,truth=drawRootCrown(mp,seed,**kwargs)
+            truth['megapixels']=mp
+            name=os.path.join(outDir,'synthetic_%gMP_%d'%(mp,seed))
+            Image.fromarray(arr).save(name+'.png')
+            with open(name+'.json','w') as fout:
+                json.dump(truth,fout,indent=1)
+            paths.append(name+'.png')
+    return paths
+
+def readTruth(imgPath):
+    with open(os.path.splitext(imgPath)[0]+'.json','r') as fin:
+        return json.load(fin)
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description='Draws synthetic root crown images with ground truth.')
+    parser.add_argument('dir',help='output folder')
+    parser.add_argument('--megapixels',type=float,nargs='+',default=[1.],help='image resolutions')
+    parser.add_argument('--seeds',type=int,nargs='+',default=[0],help='one image per seed and resolution')
+    parser.add_argument('--laterals',type=int,default=10,help='number of laterals of the tap root')
+    parser.add_argument('--angle',type=float,default=50.,help='branching angle of the laterals in degrees')
+    parser.add_argument('--excised',type=int,default=0,help='number of excised roots')
+    args=parser.parse_args()
+    for p in writeCorpus(args.dir,args.megapixels,args.seeds,nrLaterals=args.laterals,branchAngle=args.angle,nrExcised=args.excised):
+        print p
@@ -0,0 +1,233 @@
+'''
+watchdog.py
+
+Wall-clock budgets for the images of a batch run. main.py appends the name and start
+time of every pipeline stage to <working directory>/<ID>/tmp/stages.csv (see
+IO.startStage). The watchdog reads the current stage while main.py runs and kills the
+process when the image or the current stage overruns its budget. The stage durations
+of all images are summarized in a p50/p95/p99 latency report.
+
+Stage names: decode, masking, labelling, marker detection, tag detection, root detection,
+excised root detection, segmentation output, crown labelling, mask traits, medial axis,
+central path, RTP, symmetry, root classes, laterals, angles, excised root analysis, output
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# standard python imports
+'''
+import os
+import csv
+import math
+import time
+import signal
+import subprocess
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+
+def readStages(stageFile):
+    stages=[]
+    try:
+        with open(stageFile,'r') as fin:
+            for line in fin:
+                try:
+                    name,start=line.rstrip('\n').rsplit(',',1)
+                    stages.append((name,float(start)))
+                except ValueError:
+                    pass
+    except IOError:
+        pass
+    return stages
+
+def stageDurations(stages,now=None):
+    '''
+    The last stage of an unfinished image is measured until now
+    '''
+    if now is None: now=time.time()
+    durations=[]
+    for i,(name,start) in enumerate(stages):
+        if name=='done': break
+        if i+1<len(stages): end=stages[i+1][1]
+        else: end=now
+        durations.append((name,end-start))
+    return durations
+
+def percentile(values,p):
+    '''
+    nearest-rank percentile, p in [0,100]
+    '''
+    if len(values)==0: return float('nan')
+    values=sorted(values)
+    idx=max(0,int(math.ceil(p/100.*len(values)))-1)
+    return values[idx]
+
+def killProcess(proc,grace=10.):
+    '''
+    main.py runs in its own process group, so tesseract and zbarimg are stopped as well
+    '''
+    try:
+        os.killpg(proc.pid,signal.SIGTERM)
+        end=time.time()+grace
+        while proc.poll() is None and time.time()<end:
+            time.sleep(0.1)
+        if proc.poll() is None: os.killpg(proc.pid,signal.SIGKILL)
+    except OSError:
+        pass
+    proc.wait()
+
+class Watchdog(object):
+    '''
+    classdocs
+    '''
+
+    def __init__(self,stageFile,imageTimeout=None,stageTimeouts=None,defaultStageTimeout=None):
+        '''
+        Constructor
+        
+        all timeouts in seconds, None means no limit
+        '''
+        self.__stageFile=stageFile
+        self.__imageTimeout=imageTimeout
+        self.__stageTimeouts=stageTimeouts if stageTimeouts is not None else {}
+        self.__defaultStageTimeout=defaultStageTimeout
+        self.__start=time.time()
+
+    def getStageFile(self):
+        return self.__stageFile
+
+    def check(self):
+        '''
+        Returns the name of the stage that overran its budget or None
+        '''
+        now=time.time()
+        stages=readStages(self.__stageFile)
+        if len(stages)>0: name,start=stages[-1]
+        else: name,start='startup',self.__start
+        if self.__imageTimeout is not None and now-self.__start>self.__imageTimeout:
+            return name
+        limit=self.__stageTimeouts.get(name,self.__defaultStageTimeout)
+        if limit is not None and now-start>limit:
+            return name
+        return None
+
+    def run(self,args,poll=1.):
+        '''
+        Runs the command and returns its return code and the stage that timed out or None
+        '''
+        self.__start=time.time()
+        proc=subprocess.Popen(args,preexec_fn=os.setsid)
+        while proc.poll() is None:
+            time.sleep(poll)
+            stage=self.check()
+            if stage is not None and proc.poll() is None:
+                logger.warning('TIMEOUT in stage '+stage+': '+str(args[2]))
+                killProcess(proc)
+                return proc.returncode,stage
+        return proc.returncode,None
+
+class LatencyReport(object):
+    '''
+    classdocs
+    '''
+
+    def __init__(self):
+        '''
+        Constructor
+        '''
+        self.__stages={}
+        self.__order=[]
+        self.__timeouts={}
+
+    def add(self,report):
+        '''
+        report is a dictionary with the stage durations and the timed out stage of one image.
+        Stages that run several times per image, e.g. once per excised root, count with their sum.
+        '''
+        total=0.
+        perImage={}
+        for name,seconds in report.get('stages',[]):
+            if name not in perImage:
+                perImage[name]=0.
+                if name not in self.__stages:
+                    self.__stages[name]=[]
+                    self.__order.append(name)
+            perImage[name]+=seconds
+            total+=seconds
+        for name,seconds in perImage.items():
+            self.__stages[name].append(seconds)
+        if len(report.get('stages',[]))>0:
+            if 'image' not in self.__stages: self.__stages['image']=[]
+            self.__stages['image'].append(total)
+        if report.get('timeout') is not None:
+            self.__timeouts[report['timeout']]=self.__timeouts.get(report['timeout'],0)+1
+
+    def rows(self):
+        rows=[]
+        for name in self.__order+['image']:
+            if name not in self.__stages: continue
+            v=self.__stages[name]
+            rows.append([name,len(v),percentile(v,50),percentile(v,95),percentile(v,99),max(v),self.__timeouts.get(name,0)])
+        return rows
+
+    def write(self,path):
+        with open(path,'w') as fout:
+            writer=csv.writer(fout)
+            writer.writerow(['stage','images','p50 [s]','p95 [s]','p99 [s]','max [s]','timeouts'])
+            for row in self.rows():
+                writer.writerow(row)
+
+    def printReport(self):
+        print '%-24s %6s %9s %9s %9s %9s %9s'%('stage','images','p50 [s]','p95 [s]','p99 [s]','max [s]','timeouts')
+        for name,n,p50,p95,p99,mx,t in self.rows():
+            print '%-24s %6d %9.2f %9.2f %9.2f %9.2f %9d'%(name,n,p50,p95,p99,mx,t)
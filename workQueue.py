@@ -0,0 +1,207 @@
+'''
+workQueue.py
+
+Coordination of several compute nodes that work on the same image folder through a
+shared file system only. A node leases an image by hard-linking a lease file into the
+queue folder, which is atomic also on NFS. A heartbeat thread refreshes the leases of
+running images; leases of dead nodes expire and are reclaimed by the other nodes.
+Finished images are published as marker files in the done folder.
+
+The code is free for non-commercial use.
+Please contact the author for commercial use.
+
+Please cite the DIRT Paper if you use the code for your scientific project.
+
+Bucksch et al., 2014 "Image-based high-throughput field phenotyping of crop roots", Plant Physiology
+
+-------------------------------------------------------------------------------------------
+Author: Alexander Bucksch
+School of Biology and Interactive computing
+Georgia Institute of Technology
+
+Mail: bucksch@gatech.edu
+Web: http://www.bucksch.nl
+-------------------------------------------------------------------------------------------
+
+Copyright (c) 2014 Alexander Bucksch
+All rights reserved.
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions are
+met:
+
+  * Redistributions of source code must retain the above copyright
+    notice, this list of conditions and the following disclaimer.
+
+  * Redistributions in binary form must reproduce the above
+    copyright notice, this list of conditions and the following
+    disclaimer in the documentation and/or other materials provided
+    with the distribution.
+
+  * Neither the name of the DIRT Developers nor the names of its
+    contributors may be used to endorse or promote products derived
+    from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+'''
+
+'''
+# standard python imports
+'''
+import os
+import time
+import socket
+import random
+import hashlib
+import threading
+import logging
+
+'''
+# global defs
+'''
+logger=logging.getLogger(__name__)
+
+class SharedQueue(object):
+    '''
+    classdocs
+    '''
+
+    def __init__(self,dirName,expiry=600.,heartbeat=60.):
+        '''
+        Constructor
+        
+        expiry has to be much larger than heartbeat and covers clock differences between the nodes
+        '''
+        self.__root=dirName+'queue/'
+        self.__node=socket.gethostname()+'-'+str(os.getpid())
+        self.__expiry=expiry
+        self.__heartbeat=heartbeat
+        self.__held=set()
+        self.__heldLock=threading.Lock()
+        for i in ['leases/','done/']:
+            try: os.makedirs(self.__root+i)
+            except OSError: pass
+        t=threading.Thread(target=self.beat)
+        t.daemon=True
+        t.start()
+        
+    def getNode(self):
+        return self.__node
+    
+    def taskName(self,name):
+        return hashlib.sha1(name).hexdigest()
+    
+    def leasePath(self,name):
+        return self.__root+'leases/'+self.taskName(name)
+    
+    def donePath(self,name):
+        return self.__root+'done/'+self.taskName(name)
+    
+    def isExpired(self,path):
+        try:
+            return time.time()-os.stat(path).st_mtime > self.__expiry
+        except OSError:
+            return False
+        
+    def acquire(self,name):
+        '''
+        Returns True if this node holds the lease on name. An expired lease is moved
+        aside with an atomic rename, so only one node can reclaim it.
+        '''
+        lease=self.leasePath(name)
+        tmp=lease+'.'+self.__node
+        with open(tmp,'w') as fout:
+            fout.write(self.__node+','+name)
+        try:
+            try: os.link(tmp,lease)
+            except OSError: pass
+            if os.stat(tmp).st_nlink!=2 and self.isExpired(lease):
+                stale=lease+'.stale.'+self.__node
+                try:
+                    os.rename(lease,stale)
+                    if self.isExpired(stale):
+                        logger.info('reclaiming expired lease of '+name)
+                        os.remove(stale)
+                        os.link(tmp,lease)
+                    else:
+                        # another node reclaimed the lease in the meantime, give it back
+                        os.link(stale,lease)
+                        os.remove(stale)
+                except OSError:
+                    pass
+            got=os.stat(tmp).st_nlink==2
+        finally:
+            os.remove(tmp)
+        if got:
+            with self.__heldLock: self.__held.add(name)
+        return got
+    
+    def isLeased(self,name):
+        return os.path.exists(self.leasePath(name)) and self.isExpired(self.leasePath(name))==False
+    
+    def owns(self,name):
+        try:
+            with open(self.leasePath(name),'r') as fin:
+                return fin.read()==self.__node+','+name
+        except IOError:
+            return False
+    
+    def release(self,name):
+        with self.__heldLock: self.__held.discard(name)
+        if self.owns(name):
+            try: os.remove(self.leasePath(name))
+            except OSError: pass
+            
+    def lock(self,name='manifest.lock',wait=1.):
+        '''
+        Blocks until the lease on name is acquired. Used as a cluster wide mutex.
+        '''
+        while self.acquire(name)==False:
+            time.sleep(wait*(1.+random.random()))
+    
+    def unlock(self,name='manifest.lock'):
+        self.release(name)
+        
+    def beat(self):
+        while True:
+            time.sleep(self.__heartbeat)
+            with self.__heldLock: held=list(self.__held)
+            for name in held:
+                try: os.utime(self.leasePath(name),None)
+                except OSError: logger.warning('lost lease of '+name)
+            
+    def markDone(self,name,key):
+        '''
+        Publishes the completion of name. The marker stores the manifest key (content hash
+        and run options), so a replaced image or a run with other options is computed again.
+        '''
+        tmp=self.donePath(name)+'.'+self.__node
+        with open(tmp,'w') as fout:
+            fout.write(key)
+        os.rename(tmp,self.donePath(name))
+        
+    def isDone(self,name,key):
+        try:
+            with open(self.donePath(name),'r') as fin:
+                return fin.read()==key
+        except (IOError,OSError):
+            return False
+        
+    def nodeOrder(self,names):
+        '''
+        Every node starts at a different position of the list to avoid contention on the same leases
+        '''
+        if len(names)==0: return names
+        start=int(hashlib.sha1(self.__node).hexdigest(),16)%len(names)
+        return names[start:]+names[:start]